@@ -1,14 +1,50 @@
-from openai import OpenAI
-from typing import Optional
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from abc import ABC, abstractmethod
+from typing import List, Optional
 import os
+import json
+import random
+import time
+import asyncio
 from dotenv import load_dotenv
 
+from comment_cache import CommentCache
+from metrics import REGISTRY
+
 # Load environment variables
 load_dotenv()
 
-class AICommenter:
-    def __init__(self, api_key: Optional[str] = None):
-        self.client = OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+FALLBACK_COMMENT = "Great post! Thanks for sharing."
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'ai_request_seconds', 'Chat completion latency', ['kind', 'outcome'])
+TOKENS = REGISTRY.counter('ai_tokens_total', 'Tokens used by chat completions', ['kind'])
+FALLBACKS = REGISTRY.counter(
+    'ai_fallbacks_total', 'Batches retried one by one, and generic fallback comments', ['reason'])
+CACHE_LOOKUPS = REGISTRY.counter('ai_cache_lookups_total', 'Comment cache lookups', ['result'])
+
+
+class BaseAICommenter(ABC):
+    """Prompts, request arguments, caching and response parsing shared by
+    AICommenter and AsyncAICommenter; subclasses create the client and make
+    the API calls.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 batch_size: int = 5, cache: Optional[CommentCache] = None):
+        # base_url lets the client talk to any OpenAI-compatible endpoint (e.g. a local stub)
+        self.client = self._create_client(api_key or os.getenv('OPENAI_API_KEY'),
+                                          base_url or os.getenv('OPENAI_BASE_URL') or None)
+        self.model = "gpt-3.5-turbo"
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
         self.prompt_template = """
         You are a fitness and wellness expert creating engaging Instagram comments for fitness-related posts. 
         Write a friendly, authentic, and relevant comment for this fitness post.
@@ -31,29 +67,131 @@ class AICommenter:
         4. Progress: Acknowledge visible progress
         
         Comment:"""
+        self.batch_prompt_template = """
+        You are a fitness and wellness expert creating engaging Instagram comments for fitness-related posts.
+        Write one friendly, authentic and relevant comment for EACH post below.
+        
+        Posts (JSON list of objects with "id" and "caption"):
+        {posts}
+        
+        Guidelines for every comment:
+        - Keep it under 200 characters
+        - Sound natural and human-like
+        - Be positive and engaging
+        - Ask a question or add value when possible
+        - Don't use emojis in every comment
+        - Make each comment different from the others
+        - Focus on fitness/motivation aspects
+        
+        Respond with JSON only, in exactly this shape:
+        {{"comments": [{{"id": <post id>, "comment": "<comment text>"}}]}}"""
     
-    def generate_comment(self, post_caption: str) -> str:
-        """Generate a comment using OpenAI's API"""
+    @abstractmethod
+    def _create_client(self, api_key: Optional[str], base_url: Optional[str]):
+        """The OpenAI client the subclass makes its calls with"""
+    
+    @staticmethod
+    def _clean_comment(comment: str) -> str:
+        return comment.strip().strip('"\'').strip()
+    
+    def _comment_request(self, post_caption: str) -> dict:
+        """Arguments for a single-caption chat completion"""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that generates engaging Instagram comments."},
+                {"role": "user", "content": self.prompt_template.format(caption=post_caption)}
+            ],
+            max_tokens=100,
+            temperature=0.7,
+        )
+    
+    def _batch_request(self, captions: List[str]) -> dict:
+        """Arguments for a multi-caption chat completion with JSON output"""
+        posts = json.dumps([{"id": idx, "caption": caption} for idx, caption in enumerate(captions)],
+                           ensure_ascii=False)
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that generates engaging Instagram comments. You always answer with valid JSON."},
+                {"role": "user", "content": self.batch_prompt_template.format(posts=posts)}
+            ],
+            max_tokens=100 * len(captions),
+            temperature=0.7,
+            response_format={"type": "json_object"},
+        )
+    
+    def _cache_key(self, post_caption: str, kind: str) -> str:
+        """Key of a comment produced by a 'single' or 'batch' request.
+        
+        Built from the arguments the request is actually sent with, so editing
+        a prompt template, the system prompt or any model parameter misses.
+        Batched comments use the arguments of a one-caption batch, so their key
+        doesn't depend on which other captions shared the request.
+        """
+        if kind == 'batch':
+            template, request = self.batch_prompt_template, self._batch_request([post_caption])
+        else:
+            template, request = self.prompt_template, self._comment_request(post_caption)
+        params = {name: value for name, value in request.items() if name != 'messages'}
+        params['system'] = request['messages'][0]['content']
+        return CommentCache.make_key(post_caption, template, params)
+    
+    def _cached_comment(self, post_caption: str) -> Optional[str]:
+        """A cached comment from either kind of request"""
+        if self.cache is None:
+            return None
+        comment = self.cache.get_first([self._cache_key(post_caption, 'single'),
+                                        self._cache_key(post_caption, 'batch')])
+        CACHE_LOOKUPS.inc(result='hit' if comment else 'miss')
+        return comment
+    
+    def _remember(self, post_caption: str, comment: str, tokens: int = 0, kind: str = 'single'):
+        if self.cache is not None and comment:
+            self.cache.put(self._cache_key(post_caption, kind), comment, tokens)
+    
+    @staticmethod
+    def _usage_tokens(response) -> int:
+        usage = getattr(response, 'usage', None)
+        return getattr(usage, 'total_tokens', 0) or 0
+    
+    def _record_request(self, kind: str, started: float, response=None):
+        """Record latency and token usage of one API call (response None = failed)"""
+        REQUEST_SECONDS.observe(time.perf_counter() - started, kind=kind,
+                                outcome='error' if response is None else 'ok')
+        if response is not None:
+            TOKENS.inc(self._usage_tokens(response), kind=kind)
+    
+    def _remember_batch(self, captions: List[str], batch: dict, tokens: int):
+        """Cache batched comments, splitting the request's tokens evenly"""
+        share = tokens // len(captions) if captions else 0
+        for idx, comment in batch.items():
+            self._remember(captions[idx], comment, share, kind='batch')
+    
+    def _parse_batch(self, content: str, expected: int) -> dict:
+        """Parse {"comments": [{"id": ..., "comment": ...}]} into {index: comment}"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that generates engaging Instagram comments."},
-                    {"role": "user", "content": self.prompt_template.format(caption=post_caption)}
-                ],
-                max_tokens=100,
-                temperature=0.7,
-            )
-            
-            comment = response.choices[0].message.content.strip()
-            # Clean up the comment
-            comment = comment.strip('"\'').strip()
-            return comment
-            
-        except Exception as e:
-            print(f"Error generating comment: {e}")
-            # Fallback to a generic comment if API fails
-            return "Great post! Thanks for sharing."
+            data = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            print("Batched response was not valid JSON")
+            return {}
+        
+        items = data.get('comments', []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {}
+        
+        comments = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                idx = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            comment = item.get('comment')
+            if 0 <= idx < expected and isinstance(comment, str) and comment.strip():
+                comments[idx] = self._clean_comment(comment)
+        return comments
     
     def is_comment_appropriate(self, comment: str) -> bool:
         """Check if the generated comment is appropriate to post"""
@@ -67,3 +205,208 @@ class AICommenter:
             return False
             
         return True
+
+
+class AICommenter(BaseAICommenter):
+    """Generates comments with the synchronous ``OpenAI`` client"""
+    
+    def _create_client(self, api_key: Optional[str], base_url: Optional[str]):
+        return OpenAI(api_key=api_key, base_url=base_url)
+    
+    def generate_comment(self, post_caption: str) -> str:
+        """Generate a comment using OpenAI's API (or the comment cache)"""
+        cached = self._cached_comment(post_caption)
+        if cached:
+            return cached
+        return self._request_comment(post_caption)
+    
+    def _request_comment(self, post_caption: str) -> str:
+        """Call the API for a single caption, bypassing the cache lookup"""
+        started, response = time.perf_counter(), None
+        try:
+            response = self.client.chat.completions.create(**self._comment_request(post_caption))
+            self._record_request('single', started, response)
+            
+            # Clean up the comment
+            comment = self._clean_comment(response.choices[0].message.content)
+            self._remember(post_caption, comment, self._usage_tokens(response))
+            return comment
+            
+        except Exception as e:
+            print(f"Error generating comment: {e}")
+            if response is None:
+                self._record_request('single', started)
+            # Fallback to a generic comment if API fails
+            FALLBACKS.inc(reason='generic_comment')
+            return FALLBACK_COMMENT
+    
+    def generate_comments(self, captions: List[str]) -> List[str]:
+        """Generate one comment per caption, packing several captions into each request.
+        
+        Captions are sent in chunks of ``batch_size``. If a batched response
+        can't be parsed, or is missing some ids, those captions fall back to
+        individual calls. Captions found in the comment cache are not sent.
+        
+        Returns:
+            List of comments in the same order as ``captions``
+        """
+        comments = [self._cached_comment(caption) for caption in captions]
+        pending = [idx for idx, comment in enumerate(comments) if not comment]
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            if len(chunk) == 1:
+                comments[chunk[0]] = self._request_comment(captions[chunk[0]])
+                continue
+            
+            batch = self._generate_batch([captions[idx] for idx in chunk])
+            for pos, idx in enumerate(chunk):
+                comments[idx] = batch.get(pos) or self._request_comment(captions[idx])
+        return comments
+    
+    def _generate_batch(self, captions: List[str]) -> dict:
+        """Request comments for several captions at once; returns {index: comment}"""
+        started, response = time.perf_counter(), None
+        try:
+            response = self.client.chat.completions.create(**self._batch_request(captions))
+            self._record_request('batch', started, response)
+            batch = self._parse_batch(response.choices[0].message.content, len(captions))
+        except Exception as e:
+            print(f"Error generating batched comments, falling back to single requests: {e}")
+            if response is None:
+                self._record_request('batch', started)
+            FALLBACKS.inc(reason='batch_failed')
+            return {}
+        self._remember_batch(captions, batch, self._usage_tokens(response))
+        return batch
+
+
+class AsyncAICommenter(BaseAICommenter):
+    """Non-blocking variant of AICommenter built on ``AsyncOpenAI``.
+    
+    One client (and therefore one keep-alive connection pool) is shared by all
+    calls. At most ``max_concurrency`` requests are in flight at once; each
+    request has its own timeout and is retried with jittered exponential
+    backoff on 429, 5xx, timeouts and connection errors.
+    
+    Its generate methods are coroutines, so it is deliberately not an
+    AICommenter. It is not wired into the bot: CommentPipeline already runs
+    generation on its own thread with the synchronous AICommenter.
+    """
+    
+    RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 batch_size: int = 5, cache: Optional[CommentCache] = None,
+                 max_concurrency: int = 4, request_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_cap: float = 30.0):
+        super().__init__(api_key=api_key, base_url=base_url, batch_size=batch_size, cache=cache)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = None  # created lazily inside the running event loop
+    
+    def _create_client(self, api_key: Optional[str], base_url: Optional[str]):
+        # Retries are handled here so that they respect the concurrency limit
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter: somewhere in [0.5, 1.5) x base * 2^attempt"""
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+    
+    async def _create(self, request: dict):
+        """Run one chat completion under the semaphore, retrying transient errors"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await self.client.chat.completions.create(
+                        timeout=self.request_timeout, **request
+                    )
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+    
+    async def generate_comment(self, post_caption: str) -> str:
+        """Generate a comment using OpenAI's API (or the comment cache)"""
+        cached = self._cached_comment(post_caption)
+        if cached:
+            return cached
+        return await self._request_comment(post_caption)
+    
+    async def _request_comment(self, post_caption: str) -> str:
+        """Call the API for a single caption, bypassing the cache lookup"""
+        started, response = time.perf_counter(), None
+        try:
+            response = await self._create(self._comment_request(post_caption))
+            self._record_request('single', started, response)
+            comment = self._clean_comment(response.choices[0].message.content)
+            self._remember(post_caption, comment, self._usage_tokens(response))
+            return comment
+        except Exception as e:
+            print(f"Error generating comment: {e}")
+            if response is None:
+                self._record_request('single', started)
+            FALLBACKS.inc(reason='generic_comment')
+            return FALLBACK_COMMENT
+    
+    async def generate_comments(self, captions: List[str]) -> List[str]:
+        """Generate one comment per caption; batches run concurrently.
+        
+        Returns:
+            List of comments in the same order as ``captions``
+        """
+        comments = [self._cached_comment(caption) for caption in captions]
+        pending = [idx for idx, comment in enumerate(comments) if not comment]
+        chunks = [pending[start:start + self.batch_size]
+                  for start in range(0, len(pending), self.batch_size)]
+        results = await asyncio.gather(
+            *(self._generate_chunk([captions[idx] for idx in chunk]) for chunk in chunks)
+        )
+        for chunk, generated in zip(chunks, results):
+            for idx, comment in zip(chunk, generated):
+                comments[idx] = comment
+        return comments
+    
+    async def _generate_chunk(self, captions: List[str]) -> List[str]:
+        if len(captions) == 1:
+            return [await self._request_comment(captions[0])]
+        
+        batch = await self._generate_batch(captions)
+        missing = [idx for idx in range(len(captions)) if not batch.get(idx)]
+        fallbacks = await asyncio.gather(*(self._request_comment(captions[idx]) for idx in missing))
+        batch.update(zip(missing, fallbacks))
+        return [batch[idx] for idx in range(len(captions))]
+    
+    async def _generate_batch(self, captions: List[str]) -> dict:
+        """Request comments for several captions at once; returns {index: comment}"""
+        started, response = time.perf_counter(), None
+        try:
+            response = await self._create(self._batch_request(captions))
+            self._record_request('batch', started, response)
+            batch = self._parse_batch(response.choices[0].message.content, len(captions))
+        except Exception as e:
+            print(f"Error generating batched comments, falling back to single requests: {e}")
+            if response is None:
+                self._record_request('batch', started)
+            FALLBACKS.inc(reason='batch_failed')
+            return {}
+        self._remember_batch(captions, batch, self._usage_tokens(response))
+        return batch
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool"""
+        await self.client.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,114 @@
+"""Comment generation latency: AICommenter vs. AsyncAICommenter against a local mock endpoint.
+
+Starts an OpenAI-compatible chat completions server on localhost that answers
+every request after an injected delay, then times generating comments for N
+captions:
+
+- one request per caption with AICommenter (sequential)
+- one request per caption with AsyncAICommenter at several concurrency limits
+- batched requests (generate_comments) with both
+
+    python bench/bench_ai_commenter.py [--captions 8] [--delay 0.2] [--concurrency 1 4 8]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_commenter import AICommenter, AsyncAICommenter
+
+
+def start_mock_server(delay: float) -> ThreadingHTTPServer:
+    """Chat completions endpoint that sleeps ``delay`` seconds per request"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(delay)
+            prompt = request['messages'][-1]['content']
+            if request.get('response_format'):
+                posts, _ = json.JSONDecoder().raw_decode(prompt, prompt.index('[{"id"'))
+                content = json.dumps({'comments': [{'id': post['id'], 'comment': f"Great session #{post['id']}!"}
+                                                   for post in posts]})
+            else:
+                content = 'Great session, what does your warm-up look like?'
+            body = json.dumps({
+                'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': request['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': {'prompt_tokens': 50, 'completion_tokens': 20, 'total_tokens': 70},
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--captions', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.2, help='Injected seconds per request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_mock_server(args.delay)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    captions = [f"Leg day number {i}: squats, lunges and a lot of sweat #fitness" for i in range(args.captions)]
+    print(f"{args.captions} captions, {args.delay * 1000:.0f}ms per request")
+
+    sync = AICommenter(api_key='bench', base_url=base_url, batch_size=args.batch_size)
+    rows = [('AICommenter, one request each', timed(lambda: [sync.generate_comment(c) for c in captions]))]
+
+    async def single(commenter):
+        await asyncio.gather(*(commenter.generate_comment(c) for c in captions))
+
+    async def batched(commenter):
+        await commenter.generate_comments(captions)
+
+    for concurrency in args.concurrency:
+        async def run():
+            async with AsyncAICommenter(api_key='bench', base_url=base_url, batch_size=args.batch_size,
+                                        max_concurrency=concurrency) as commenter:
+                await single(commenter)
+        rows.append((f"AsyncAICommenter, concurrency {concurrency}", timed(lambda: asyncio.run(run()))))
+
+    rows.append((f"AICommenter, batches of {args.batch_size}", timed(lambda: sync.generate_comments(captions))))
+
+    async def run_batched():
+        async with AsyncAICommenter(api_key='bench', base_url=base_url, batch_size=args.batch_size,
+                                    max_concurrency=max(args.concurrency)) as commenter:
+            await batched(commenter)
+    rows.append((f"AsyncAICommenter, batches of {args.batch_size}", timed(lambda: asyncio.run(run_batched()))))
+
+    baseline = rows[0][1]
+    for label, seconds in rows:
+        print(f"  {label:<38} {seconds:>6.2f}s {baseline / seconds:>5.1f}x")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Page load time and bandwidth per post page: BROWSER_PROFILE=full vs. lean.
+
+Serves bench/fixtures/post_page.html from a local HTTP server, with
+generated images, a video clip, web fonts and a script of realistic sizes,
+then opens a fresh "post" per iteration with InstagramPoster's driver and
+waits for the comment box, the same way post_comment does. The server counts
+the bytes it sends, so blocked resources show up as saved bandwidth.
+
+Needs Chrome (see browser_discovery.py for how it is found).
+
+    python bench/bench_browser_profile.py [--posts 10] [--profiles full lean] [--headful]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FIXTURE = Path(__file__).resolve().parent / 'fixtures' / 'post_page.html'
+
+# (content type, size in bytes) per file extension
+ASSETS = {
+    '.jpg': ('image/jpeg', 180 * 1024),
+    '.mp4': ('video/mp4', 2 * 1024 * 1024),
+    '.woff2': ('font/woff2', 60 * 1024),
+    '.js': ('application/javascript', 400 * 1024),
+}
+
+
+class FixtureServer:
+    """Serves the post page fixture and counts bytes sent per asset type"""
+
+    def __init__(self):
+        self.bytes_sent: Counter = Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path.startswith('/p/'):
+                    post = path.strip('/').split('/')[1]
+                    body = FIXTURE.read_text(encoding='utf-8').replace('{post}', post).replace('{version}', '1')
+                    body = body.encode('utf-8')
+                    content_type, kind = 'text/html; charset=utf-8', 'html'
+                    cache = 'no-cache'
+                else:
+                    extension = os.path.splitext(path)[1]
+                    if extension not in ASSETS:
+                        self.send_error(404)
+                        return
+                    content_type, size = ASSETS[extension]
+                    body = (b'\0' * size) if extension != '.js' else b'/*' + b' ' * (size - 4) + b'*/'
+                    kind = extension.lstrip('.')
+                    # Static assets are versioned and cacheable, post media is new per post
+                    cache = 'public, max-age=31536000' if path.startswith('/static/') else 'no-cache'
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', cache)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # the browser aborted a blocked or unneeded download
+                with server._lock:
+                    server.bytes_sent[kind] += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def take(self) -> Counter:
+        with self._lock:
+            sent, self.bytes_sent = self.bytes_sent, Counter()
+        return sent
+
+
+def run_profile(profile: str, server: FixtureServer, posts: int, headless: bool) -> list:
+    from instagram_poster import InstagramPoster
+    from session_broker import SessionBroker
+
+    poster = InstagramPoster(headless=headless, profile=profile,
+                             session_broker=SessionBroker(Path('cookies.json')))
+    results = []
+    try:
+        for index in range(posts):
+            server.take()
+            started = time.perf_counter()
+            poster.driver.get(f"{server.url}/p/{profile}{index}/")
+            poster.wait.until(poster.selectors.condition('comment_box'))
+            elapsed = time.perf_counter() - started
+            # Let in-flight downloads (video, lazy images) finish before counting
+            time.sleep(0.5)
+            results.append((elapsed, server.take()))
+    finally:
+        poster.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=10, help='Post pages opened per profile')
+    parser.add_argument('--profiles', nargs='+', default=['full', 'lean'])
+    parser.add_argument('--headful', action='store_true', help='Show the browser window')
+    args = parser.parse_args()
+
+    server = FixtureServer()
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        os.environ['CHROME_USER_DATA_DIR'] = str(Path(workdir) / 'chrome-profile')
+        try:
+            print(f"{'profile':<8} {'first load':>11} {'median load':>12} {'KiB/post':>9}  by type (KiB/post, after the first)")
+            for profile in args.profiles:
+                results = run_profile(profile, server, args.posts, not args.headful)
+                first, rest = results[0], results[1:] or results
+                median = statistics.median(elapsed for elapsed, _ in rest)
+                totals = Counter()
+                for _, sent in rest:
+                    totals.update(sent)
+                per_post = {kind: sent / len(rest) / 1024 for kind, sent in totals.items()}
+                kib = sum(per_post.values())
+                by_type = ', '.join(f"{kind}={value:.0f}" for kind, value in sorted(per_post.items()))
+                print(f"{profile:<8} {first[0]:>10.2f}s {median:>11.2f}s {kib:>9.0f}  {by_type}")
+        finally:
+            os.chdir(cwd)
+            server.httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Wall-clock time of InstagramScraper.get_new_posts vs. number of target accounts.
+
+Runs the real scraper against a stubbed instaloader context (see
+stub_instaloader.py) that answers every request after a fixed latency, once
+sequentially (FETCH_WORKERS=1) and once with a thread pool.
+
+    python bench/bench_fetch.py [--accounts 1 2 4 8 16] [--latency 0.2] [--workers 4]
+
+The request budget is raised so the token bucket doesn't dominate; pass
+--rpm 30 to see the default budget instead.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_instaloader import StubContext
+
+
+def run(accounts: int, workers: int, latency: float, rpm: float) -> tuple:
+    from instagram_scraper import InstagramScraper
+
+    os.environ['TARGET_ACCOUNTS'] = ','.join(f"account{i}" for i in range(accounts))
+    os.environ['FITNESS_KEYWORDS'] = 'gym,workout'
+    os.environ['FETCH_WORKERS'] = str(workers)
+    os.environ['FETCH_REQUESTS_PER_MINUTE'] = str(rpm)
+    os.environ['FETCH_BURST'] = str(max(5, accounts * 2))
+    os.environ['PROFILE_CACHE_TTL_HOURS'] = '0'
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            scraper = InstagramScraper()
+            scraper.logged_in = True
+            scraper.loader.context = StubContext(latency=latency)
+            started = time.perf_counter()
+            posts = scraper.get_new_posts()
+            elapsed = time.perf_counter() - started
+            requests = scraper.loader.context.total()
+            scraper.close()
+        finally:
+            os.chdir(cwd)
+    return elapsed, len(posts), requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per stubbed request')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rpm', type=float, default=6000, help='FETCH_REQUESTS_PER_MINUTE')
+    args = parser.parse_args()
+
+    # get_new_posts logs every account and post; keep the table readable
+    logging.disable(logging.CRITICAL)
+    print(f"latency {args.latency * 1000:.0f}ms/request, {args.rpm:g} requests/minute")
+    print(f"{'accounts':>8} {'requests':>9} {'sequential':>11} {f'{args.workers} workers':>11} {'speedup':>8}")
+    for accounts in args.accounts:
+        sequential, posts, requests = run(accounts, 1, args.latency, args.rpm)
+        concurrent, concurrent_posts, _ = run(accounts, args.workers, args.latency, args.rpm)
+        assert posts == concurrent_posts, "both modes must find the same posts"
+        print(f"{accounts:>8} {requests:>9} {sequential:>10.2f}s {concurrent:>10.2f}s "
+              f"{sequential / concurrent:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Caption matching throughput: the old per-keyword loop vs. KeywordMatcher.
+
+Generates a fixed corpus of Instagram-length captions (about 60 words with
+hashtags and emoji) and a keyword list of 500+ entries, then times:
+
+- the old ``any(keyword.lower() in caption.lower() ...)`` loop
+- a flat ``a|b|c`` alternation regex
+- KeywordMatcher (prefix-trie regex), substring and word-boundary modes
+
+    python bench/bench_keyword_matcher.py [--keywords 600] [--captions 2000] [--repeat 3]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from keyword_matcher import KeywordMatcher
+
+FITNESS_WORDS = ['fitness', 'workout', 'gym', 'training', 'gains', 'protein', 'cardio', 'squat',
+                 'deadlift', 'bench', 'hiit', 'yoga', 'running', 'marathon', 'crossfit', 'bulking',
+                 'cutting', 'macros', 'mobility', 'stretching', 'legday', 'pushups', 'pullups']
+FILLER_WORDS = ['today', 'feeling', 'amazing', 'morning', 'with', 'the', 'team', 'new', 'week',
+                'love', 'this', 'coffee', 'sunset', 'weekend', 'vibes', 'family', 'friends',
+                'travel', 'beach', 'food', 'dinner', 'link', 'in', 'bio', 'check', 'out', 'my',
+                'latest', 'post', 'thank', 'you', 'all', 'for', 'support', 'so', 'grateful']
+EMOJI = ['💪', '🔥', '🏋️', '✨', '🙌', '❤️']
+
+
+def make_keywords(count: int, rng: random.Random) -> list:
+    keywords = list(FITNESS_WORDS)
+    while len(keywords) < count:
+        base = rng.choice(FITNESS_WORDS)
+        keywords.append(base + rng.choice(['coach', 'life', 'goals', 'motivation', 'journey', 'tips',
+                                           'plan', 'club', 'girl', 'guy', 'daily', 'fam']) + str(len(keywords)))
+    return keywords
+
+
+def make_caption(rng: random.Random, words: int = 60) -> str:
+    parts = []
+    for _ in range(words):
+        roll = rng.random()
+        if roll < 0.05:
+            parts.append('#' + rng.choice(FITNESS_WORDS) + rng.choice(['', 'motivation', 'life']))
+        elif roll < 0.08:
+            parts.append(rng.choice(EMOJI))
+        elif roll < 0.10:
+            parts.append(rng.choice(FITNESS_WORDS).title())
+        else:
+            parts.append(rng.choice(FILLER_WORDS))
+    return ' '.join(parts)
+
+
+def old_loop(keywords):
+    def matches(caption):
+        caption_lower = caption.lower()
+        return any(keyword.lower() in caption_lower for keyword in keywords)
+    return matches
+
+
+def flat_regex(keywords):
+    pattern = re.compile('|'.join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)))
+    return lambda caption: bool(pattern.search(caption.lower()))
+
+
+def timed(matches, captions, repeat: int) -> tuple:
+    best = float('inf')
+    hits = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hits = sum(1 for caption in captions if matches(caption))
+        best = min(best, time.perf_counter() - started)
+    return best, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keywords', type=int, default=600)
+    parser.add_argument('--captions', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3, help='Best of N runs')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = make_keywords(args.keywords, rng)
+    # Most captions should not match, like most posts of a general account
+    captions = [make_caption(rng) if rng.random() < 0.3 else
+                ' '.join(rng.choice(FILLER_WORDS) for _ in range(60)) for _ in range(args.captions)]
+    average = sum(map(len, captions)) / len(captions)
+    print(f"{len(keywords)} keywords, {len(captions)} captions (avg {average:.0f} chars), best of {args.repeat}")
+
+    candidates = [
+        ('old any() loop', old_loop(keywords)),
+        ('flat alternation', flat_regex(keywords)),
+        ('KeywordMatcher', KeywordMatcher(keywords).matches),
+        ('KeywordMatcher word_boundary', KeywordMatcher(keywords, word_boundary=True).matches),
+    ]
+    baseline = None
+    print(f"{'matcher':<30} {'seconds':>8} {'captions/s':>11} {'matched':>8} {'vs old':>7}")
+    for label, matches in candidates:
+        seconds, hits = timed(matches, captions, args.repeat)
+        baseline = baseline or seconds
+        print(f"{label:<30} {seconds:>8.3f} {len(captions) / seconds:>11.0f} {hits:>8} {baseline / seconds:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Requests per account with and without the profile cache (PROFILE_CACHE_TTL_HOURS).
+
+Runs InstagramScraper._fetch_account_posts twice against a stubbed instaloader
+context (see stub_instaloader.py) that counts requests: a cold cycle (cache
+misses) and a warm one (cache hits). For reference it also counts what a hit
+would cost through ``Profile.from_id``. Both the logged-in and the anonymous
+code paths of the installed instaloader are measured.
+
+    python bench/bench_profile_cache.py
+"""
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import instaloader
+
+from stub_instaloader import StubContext
+
+ACCOUNT = 'account0'
+# Only the profile and post pages differ between the paths; matched posts
+# cost the same post_metadata requests in all of them
+KINDS = ('profile', 'metadata', 'user_info', 'posts')
+
+
+def _count(context: StubContext) -> str:
+    counted = {kind: context.requests[kind] for kind in KINDS}
+    total = sum(counted.values())
+    return f"{total:>5}  " + ' '.join(f"{kind}={n}" for kind, n in counted.items() if n)
+
+
+def measure(logged_in: bool) -> list:
+    from instagram_scraper import InstagramScraper
+
+    os.environ['TARGET_ACCOUNTS'] = ACCOUNT
+    os.environ['FITNESS_KEYWORDS'] = 'gym'
+    os.environ['PROFILE_CACHE_TTL_HOURS'] = '24'
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            scraper = InstagramScraper()
+            context = StubContext(logged_in=logged_in)
+            scraper.loader.context = context
+
+            scraper._fetch_account_posts(ACCOUNT, 24)
+            rows.append(('miss (Profile.from_username)', _count(context)))
+
+            context.reset()
+            scraper._fetch_account_posts(ACCOUNT, 24)
+            rows.append(('hit (cached id, no lookup)', _count(context)))
+
+            context.reset()
+            userid = scraper.state.get_cached_profile(ACCOUNT, 3600)['userid']
+            profile = instaloader.Profile.from_id(context, userid)
+            next(iter(profile.get_posts()), None)
+            rows.append(('hit via Profile.from_id', _count(context)))
+            scraper.close()
+        finally:
+            os.chdir(cwd)
+    return rows
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"instaloader {instaloader.__version__}, requests to resolve a profile and read its first page of posts")
+    for logged_in in (True, False):
+        print(f"\n{'logged in' if logged_in else 'anonymous'}")
+        for label, counts in measure(logged_in):
+            print(f"  {label:<30}{counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Offline stand-in for instaloader's InstaloaderContext.
+
+Answers the profile, post-page and user-info requests that instaloader's
+Profile/NodeIterator make, after an optional simulated network latency, and
+counts them by kind. Plug it into a scraper with
+``scraper.loader.context = StubContext(...)``.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+POSTS_PER_PAGE = 12
+
+
+class StubContext:
+    """Counts requests per kind: 'profile', 'metadata', 'posts', 'post_metadata', 'user_info', 'other'"""
+
+    def __init__(self, latency: float = 0.0, logged_in: bool = True, posts_per_account: int = 12,
+                 caption: str = "leg day at the gym #fitness"):
+        self.latency = latency
+        self.is_logged_in = logged_in
+        self.username = 'stub_user' if logged_in else None
+        self.posts_per_account = posts_per_account
+        self.caption = caption
+        self.requests: Counter = Counter()
+        self.profile_id_cache: Dict[int, Any] = {}
+        self._names: Dict[int, str] = {}
+        self.iphone_support = False
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    # Bookkeeping
+
+    def _request(self, kind: str):
+        with self._lock:
+            self.requests[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total(self) -> int:
+        return sum(self.requests.values())
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+
+    def log(self, *msg, **kwargs):
+        pass
+
+    def error(self, msg, repeat_at_end=True):
+        pass
+
+    # Canned data
+
+    @staticmethod
+    def _userid(username: str) -> int:
+        return 1000 + sum(ord(c) for c in username)
+
+    def _username(self, userid: int) -> str:
+        return self._names.get(userid, f"account{userid}")
+
+    def _user(self, username: str) -> dict:
+        self._names[self._userid(username)] = username
+        return {'id': str(self._userid(username)), 'pk': str(self._userid(username)),
+                'username': username, 'full_name': username.title(),
+                'edge_followed_by': {'count': 1234}, 'follower_count': 1234,
+                'edge_owner_to_timeline_media': self._graph_page(username)}
+
+    def _timestamps(self) -> List[int]:
+        # One post an hour, newest first
+        return [int(self._started) - 3600 * (i + 1) for i in range(self.posts_per_account)]
+
+    def _graph_page(self, username: str) -> dict:
+        edges = [{'node': {
+            'shortcode': f"{username}_{i}", 'id': str(i), '__typename': 'GraphImage',
+            'taken_at_timestamp': ts,
+            'edge_media_to_caption': {'edges': [{'node': {'text': self.caption}}]},
+            'edge_media_preview_like': {'count': 10}, 'edge_media_to_comment': {'count': 1},
+        }} for i, ts in enumerate(self._timestamps()[:POSTS_PER_PAGE])]
+        return {'count': self.posts_per_account, 'edges': edges,
+                'page_info': {'has_next_page': False, 'end_cursor': None}}
+
+    def _iphone_media(self, username: str, index: int) -> dict:
+        return {'code': f"{username}_{index}", 'pk': str(index), 'media_type': 1,
+                'taken_at': self._timestamps()[index], 'caption': {'text': self.caption},
+                'has_liked': False, 'like_count': 10, 'comment_count': 1}
+
+    def _iphone_page(self, username: str) -> dict:
+        edges = [{'node': self._iphone_media(username, i)}
+                 for i in range(min(POSTS_PER_PAGE, self.posts_per_account))]
+        return {'edges': edges, 'page_info': {'has_next_page': False, 'end_cursor': None}}
+
+    # InstaloaderContext API
+
+    def get_page_data(self, path: str, *args, **kwargs) -> list:
+        self._request('profile')
+        username = path.strip('/').split('/')[0]
+        return [{'xig_user_by_username': self._user(username)}]
+
+    def get_json(self, path: str, params: dict, *args, **kwargs) -> dict:
+        if 'web_profile_info' in path:
+            self._request('metadata')
+            return {'data': {'user': self._user(params['username'])}}
+        if path.startswith('api/v1/users/') and path.endswith('/info/'):
+            self._request('user_info')
+            return {'user': {'username': self._username(int(path.split('/')[3]))}}
+        self._request('other')
+        return {}
+
+    def graphql_query(self, query_hash: str, variables: dict, referer=None, *args, **kwargs) -> dict:
+        # Older instaloader releases page posts by user id with a query hash
+        self._request('posts')
+        return {'data': {'user': {'edge_owner_to_timeline_media':
+                                  self._graph_page(self._username(int(variables['id'])))}}}
+
+    def doc_id_graphql_query(self, doc_id: str, variables: dict, referer=None, *args, **kwargs) -> dict:
+        if 'shortcode' in variables:
+            # Full metadata of one post, e.g. for Post.comments when logged in
+            self._request('post_metadata')
+            username, _, index = variables['shortcode'].rpartition('_')
+            media = dict(self._iphone_media(username, int(index)),
+                         user={'pk': str(self._userid(username)), 'username': username})
+            return {'data': {'xdt_api__v1__media__shortcode__web_info': {'items': [media]}}}
+        if 'render_surface' in variables:
+            self._request('metadata')
+            return {'data': {'user': self._user(self._username(int(variables['id'])))}}
+        self._request('posts')
+        if 'username' in variables:
+            return {'data': {'xdt_api__v1__feed__user_timeline_graphql_connection':
+                             self._iphone_page(variables['username'])}}
+        username = self._username(int(variables['id']))
+        return {'data': {'user': {'edge_owner_to_timeline_media': self._graph_page(username)}}}
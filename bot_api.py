@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import urlopen
+
+from metrics import CONTENT_TYPE, REGISTRY, MetricsRegistry
+
+# path -> handler taking the query parameters (first value of each) and returning JSON-able data
+Routes = Dict[str, Callable[[Dict[str, str]], object]]
+
+
+def bot_api_url() -> Optional[str]:
+    """Where the bot process serves its API, from $BOT_API_PORT (None if disabled)"""
+    port = int(os.getenv('BOT_API_PORT', 0))
+    return f"http://127.0.0.1:{port}" if port else None
+
+
+# Longest a /logs?wait= request is held open
+MAX_WAIT_SECONDS = 30
+
+
+def start_bot_api_server(port: int, scheduler, log_buffer=None,
+                         metrics_registry: MetricsRegistry = REGISTRY,
+                         host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve the bot's in-memory state to the dashboard from a daemon thread.
+
+    The dashboard runs in the web app's process while the bot runs in its own
+    (``main.py --continuous``), so this is how it reads the scheduler's stats
+    and recent log lines without going through files:
+
+    - ``GET /stats``: ``scheduler.get_stats()``
+    - ``GET /status``: ``scheduler.get_status()``, the stats plus the status,
+      last_run and next_run fields the dashboard page shows
+    - ``GET /logs?after=<seq>&limit=<n>&wait=<seconds>``: lines of
+      ``log_buffer`` (a log_handlers.RingBufferHandler) after a sequence
+      number, waiting up to ``wait`` seconds for one; without ``after``, the
+      newest ``limit`` lines
+    - ``GET /metrics``: ``metrics_registry`` in the Prometheus text format
+    """
+    routes: Routes = {
+        '/stats': lambda query: scheduler.get_stats(),
+        '/status': lambda query: scheduler.get_status(),
+    }
+
+    def logs(query: Dict[str, str]) -> dict:
+        limit = int(query['limit']) if 'limit' in query else None
+        missed = False
+        if 'after' not in query:
+            entries = log_buffer.tail(log_buffer.capacity if limit is None else limit)
+        else:
+            after = int(query['after'])
+            if after > log_buffer.last_seq:
+                # The cursor is from before the bot restarted: start over
+                after, missed = 0, True
+            elif float(query.get('wait', 0)) > 0:
+                log_buffer.wait(after, min(float(query['wait']), MAX_WAIT_SECONDS))
+            entries, dropped = log_buffer.after(after, limit)
+            missed = missed or dropped
+        return {'logs': entries, 'missed': missed,
+                'first_seq': log_buffer.first_seq, 'last_seq': log_buffer.last_seq}
+
+    if log_buffer is not None:
+        routes['/logs'] = logs
+
+    # path -> (content type, callable returning the body as text)
+    text_routes = {'/metrics': (CONTENT_TYPE, metrics_registry.render)}
+
+    class BotAPIHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in text_routes:
+                content_type, render = text_routes[url.path]
+                self._send(render().encode('utf-8'), content_type)
+                return
+            handler = routes.get(url.path)
+            if handler is None:
+                self.send_error(404)
+                return
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                body = json.dumps(handler(query)).encode('utf-8')
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            self._send(body, 'application/json')
+
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # The dashboard polls; don't log every request
+            pass
+
+    server = ThreadingHTTPServer((host, port), BotAPIHandler)
+    thread = threading.Thread(target=server.serve_forever, name='bot-api-http', daemon=True)
+    thread.start()
+    return server
+
+
+class BotAPIClient:
+    """Dashboard side of the bot API; raises OSError when the bot isn't running"""
+
+    def __init__(self, base_url: str, timeout: float = 2.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _open(self, path: str, timeout: Optional[float] = None, **params):
+        url = self.base_url + path
+        if params:
+            url += '?' + urlencode({key: value for key, value in params.items() if value is not None})
+        return urlopen(url, timeout=self.timeout if timeout is None else timeout)
+
+    def get(self, path: str, timeout: Optional[float] = None, **params):
+        with self._open(path, timeout, **params) as response:
+            return json.load(response)
+
+    def stats(self) -> dict:
+        return self.get('/stats')
+
+    def status(self) -> dict:
+        return self.get('/status')
+
+    def metrics(self) -> str:
+        """The bot's metrics in the Prometheus text format"""
+        with self._open('/metrics') as response:
+            return response.read().decode('utf-8')
+
+
+class RemoteLogBuffer:
+    """The bot's log ring buffer, read through its API.
+
+    Has the read side of log_handlers.RingBufferHandler (``after``, ``tail``,
+    ``wait``, ``first_seq``, ``last_seq``), so the dashboard serves the bot's
+    lines the same way it serves an in-process buffer. Every call raises
+    OSError while the bot isn't running.
+    """
+
+    def __init__(self, client: BotAPIClient):
+        self.client = client
+
+    def _logs(self, timeout: Optional[float] = None, **params) -> dict:
+        return self.client.get('/logs', timeout=timeout, **params)
+
+    @property
+    def last_seq(self) -> int:
+        return self._logs(limit=0)['last_seq']
+
+    @property
+    def first_seq(self) -> int:
+        return self._logs(limit=0)['first_seq']
+
+    def after(self, seq: int, limit: Optional[int] = None) -> Tuple[List[Tuple[int, str]], bool]:
+        result = self._logs(after=seq, limit=limit)
+        return [tuple(entry) for entry in result['logs']], result['missed']
+
+    def tail(self, count: int) -> List[Tuple[int, str]]:
+        return [tuple(entry) for entry in self._logs(limit=count)['logs']]
+
+    def wait(self, seq: int, timeout: Optional[float] = None) -> bool:
+        wait = MAX_WAIT_SECONDS if timeout is None else min(timeout, MAX_WAIT_SECONDS)
+        result = self._logs(timeout=self.client.timeout + wait, after=seq, limit=0, wait=wait)
+        return result['last_seq'] > seq or result['missed']
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path("data/browser_resolution.json")
+
+CHROME_NAMES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+
+CHROME_LOCATIONS = [
+    # Linux
+    '/usr/bin/google-chrome',
+    '/usr/bin/google-chrome-stable',
+    '/opt/google/chrome/chrome',
+    '/usr/bin/chromium',
+    '/usr/bin/chromium-browser',
+    '/usr/lib/chromium/chromium',
+    '/usr/lib/chromium-browser/chromium-browser',
+    '/snap/bin/chromium',
+    # macOS
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    '/Applications/Chromium.app/Contents/MacOS/Chromium',
+    # Windows
+    os.path.expanduser("~" + os.sep + "AppData/Local/Google/Chrome/Application/chrome.exe"),
+    os.path.expandvars("$PROGRAMFILES/Google/Chrome/Application/chrome.exe"),
+    os.path.expandvars("$PROGRAMFILES(x86)/Google/Chrome/Application/chrome.exe"),
+]
+
+CHROMEDRIVER_LOCATIONS = [
+    '/usr/bin/chromedriver',
+    '/usr/local/bin/chromedriver',
+    '/usr/lib/chromium/chromedriver',
+    '/usr/lib/chromium-browser/chromedriver',
+    '/snap/bin/chromium.chromedriver',
+]
+
+
+def _is_executable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def find_chrome() -> Optional[str]:
+    """Locate a Chrome/Chromium binary: $CHROME_BINARY, then PATH, then standard locations"""
+    env_path = os.getenv('CHROME_BINARY')
+    if env_path:
+        if _is_executable(env_path):
+            return env_path
+        logger.warning("CHROME_BINARY=%s is not an executable file, probing instead", env_path)
+
+    for name in CHROME_NAMES:
+        found = shutil.which(name)
+        if found:
+            return found
+
+    for path in CHROME_LOCATIONS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_chromedriver() -> Optional[str]:
+    """Locate chromedriver: $CHROMEDRIVER, PATH, standard locations, then webdriver_manager.
+
+    Returns None if nothing was found; Selenium Manager then gets a chance at
+    launch time.
+    """
+    env_path = os.getenv('CHROMEDRIVER')
+    if _is_executable(env_path):
+        return env_path
+
+    found = shutil.which('chromedriver')
+    if found:
+        return found
+
+    for path in CHROMEDRIVER_LOCATIONS:
+        if _is_executable(path):
+            return path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        return ChromeDriverManager().install()
+    except Exception as e:
+        logger.warning("webdriver_manager could not provide chromedriver: %s", e)
+        return None
+
+
+def chrome_version(chrome_path: str) -> Optional[str]:
+    if sys.platform == 'win32':
+        # chrome.exe --version opens a browser window instead of printing
+        return None
+    try:
+        output = subprocess.run([chrome_path, '--version'], capture_output=True,
+                                text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+(?:\.\d+)+)', output)
+    return match.group(1) if match else None
+
+
+def _load_cache(cache_path: Path) -> Optional[dict]:
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    chrome = cached.get('chrome')
+    driver = cached.get('chromedriver')
+    if not chrome or not os.path.exists(chrome):
+        return None
+    if driver and not os.path.exists(driver):
+        return None
+    # A browser update invalidates the cached driver/version pairing
+    if cached.get('chrome_mtime') != os.path.getmtime(chrome):
+        return None
+    env_chrome = os.getenv('CHROME_BINARY')
+    if env_chrome and env_chrome != chrome:
+        return None
+    return cached
+
+
+def resolve_browser(cache_path: Path = CACHE_PATH, refresh: bool = False) -> Optional[dict]:
+    """Resolve the Chrome binary, matching chromedriver and Chrome version.
+
+    The result is cached in ``cache_path`` so later startups skip probing
+    until the browser binary changes.
+
+    Returns:
+        dict with 'chrome', 'chromedriver' (may be None) and 'version', or None
+        if no browser could be found
+    """
+    if not refresh:
+        cached = _load_cache(cache_path)
+        if cached:
+            cached['cached'] = True
+            return cached
+
+    chrome = find_chrome()
+    if not chrome:
+        return None
+
+    resolved = {
+        'chrome': chrome,
+        'chromedriver': find_chromedriver(),
+        'version': chrome_version(chrome),
+        'chrome_mtime': os.path.getmtime(chrome),
+    }
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(resolved, f, indent=2)
+    except OSError as e:
+        logger.warning("Could not cache browser resolution: %s", e)
+    resolved['cached'] = False
+    return resolved
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_caption(caption: str) -> str:
+    """Lowercase and collapse whitespace so trivially different reposts share a key"""
+    return re.sub(r'\s+', ' ', (caption or '').lower()).strip()
+
+
+class CommentCache:
+    """Persistent, content-addressed cache of generated comments.
+
+    Entries are keyed by a hash of the normalized caption, the prompt template
+    and the model parameters, so a change to any of them naturally misses.
+    Up to ``variants`` different comments are kept per key: until a key has
+    that many, lookups miss so a fresh variant gets generated; after that the
+    least recently used variant is handed out.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: float = 72 * 3600,
+                 max_entries: int = 1000, variants: int = 1):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS comments (
+                key TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                comment TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (key, variant)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_comments_last_used ON comments (last_used);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(caption: str, prompt_template: str, model_params: dict) -> str:
+        payload = '\0'.join([
+            normalize_caption(caption),
+            prompt_template,
+            json.dumps(model_params, sort_keys=True),
+        ])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached comment for ``key``, or None if a new one should be generated"""
+        return self.get_first([key])
+
+    def get_first(self, keys: Sequence[str]) -> Optional[str]:
+        """Like get(), trying each key in turn; counts as a single lookup"""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                rows = self._conn.execute(
+                    "SELECT variant, comment, tokens FROM comments "
+                    "WHERE key = ? AND created_at > ? ORDER BY last_used ASC",
+                    (key, now - self.ttl_seconds)
+                ).fetchall()
+                if len(rows) >= self.variants:
+                    break
+            else:
+                self.misses += 1
+                return None
+            variant, comment, tokens = rows[0]
+            self._conn.execute(
+                "UPDATE comments SET last_used = ? WHERE key = ? AND variant = ?",
+                (now, key, variant)
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.saved_tokens += tokens
+        return comment
+
+    def put(self, key: str, comment: str, tokens: int = 0):
+        """Store a newly generated comment as another variant of ``key``"""
+        now = time.time()
+        with self._lock:
+            # Expired variants are replaced rather than added to
+            self._conn.execute(
+                "DELETE FROM comments WHERE created_at <= ?", (now - self.ttl_seconds,)
+            )
+            rows = self._conn.execute(
+                "SELECT variant FROM comments WHERE key = ? ORDER BY last_used ASC", (key,)
+            ).fetchall()
+            if len(rows) >= self.variants:
+                variant = rows[0][0]
+            else:
+                used = {row[0] for row in rows}
+                variant = next(idx for idx in range(self.variants) if idx not in used)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO comments (key, variant, comment, tokens, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, variant, comment, int(tokens or 0), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used rows beyond ``max_entries``"""
+        self._conn.execute(
+            "DELETE FROM comments WHERE (key, variant) IN ("
+            "SELECT key, variant FROM comments ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'saved_tokens': self.saved_tokens,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
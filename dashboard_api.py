@@ -0,0 +1,230 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from bot_api import BotAPIClient, RemoteLogBuffer, bot_api_url
+from log_handlers import RingBufferHandler
+from log_stream import LogTailer
+from metrics import CONTENT_TYPE
+
+
+def sse_event(data, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Format one Server-Sent Events message"""
+    message = ''
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    payload = data if isinstance(data, str) else json.dumps(data)
+    for line in payload.splitlines() or ['']:
+        message += f"data: {line}\n"
+    return message + "\n"
+
+
+def stats_file_status(stats_file: Path = Path("data/bot_stats.json")) -> Callable[[], dict]:
+    """Status provider reading the scheduler's stats file, re-parsed only when it changes"""
+    cache = {'mtime': None, 'status': {}}
+
+    def provider() -> dict:
+        try:
+            mtime = os.path.getmtime(stats_file)
+        except OSError:
+            return cache['status']
+        if mtime != cache['mtime']:
+            try:
+                with open(stats_file, 'r') as f:
+                    status = json.load(f)
+                status.pop('comment_events', None)
+                cache['status'], cache['mtime'] = status, mtime
+            except (OSError, json.JSONDecodeError):
+                pass
+        return cache['status']
+    return provider
+
+
+def bot_api_status(client: BotAPIClient,
+                   fallback: Optional[Callable[[], dict]] = None) -> Callable[[], dict]:
+    """Status provider asking the running bot for its status and in-memory stats.
+
+    Returns the fields the dashboard page renders (``status``, ``last_run``,
+    ``next_run``) along with the stats. While the bot doesn't answer it is
+    reported as stopped, with the stats read through ``fallback``.
+    """
+    fallback = fallback or stats_file_status()
+
+    def provider() -> dict:
+        try:
+            status = client.status()
+        except (OSError, ValueError):
+            status = dict(fallback(), status='stopped', next_run=None)
+        status.pop('comment_events', None)
+        return status
+    return provider
+
+
+def status_delta(previous: dict, current: dict) -> dict:
+    """Keys of ``current`` that are new or changed since ``previous``"""
+    return {key: value for key, value in current.items()
+            if key not in previous or previous[key] != value}
+
+
+def create_dashboard_blueprint(log_tailer: Optional[LogTailer] = None,
+                               status_provider: Optional[Callable[[], dict]] = None,
+                               log_buffer: Optional[RingBufferHandler] = None,
+                               bot_api: Optional[BotAPIClient] = None,
+                               poll_interval: float = 1.0,
+                               heartbeat_seconds: float = 15.0) -> Blueprint:
+    """Blueprint with the dashboard's log and push endpoints.
+
+    ``GET /stream`` is a Server-Sent Events stream with two event types:
+    ``log`` (a JSON list of new log lines) and ``status`` (a JSON object of the
+    status fields that changed). Log events carry a cursor as their id, so a
+    reconnecting EventSource resumes from ``Last-Event-ID``; a ``?cursor=``
+    query parameter does the same for other clients.
+
+    ``GET /logs?after=<seq>`` returns the lines logged after a sequence number
+    (the oldest ``limit`` of them; ``next`` is the cursor for the rest). If some
+    were already dropped from memory, ``truncated`` is true and the lines
+    start at the oldest one kept. ``?before=<cursor>`` pages back through the
+    log file instead, as does any request while no buffer is reachable.
+
+    ``GET /metrics`` relays the bot's metrics (Prometheus text format) from
+    ``bot_api``; it answers 503 while the bot isn't reachable.
+
+    Args:
+        log_tailer: Log file reader (defaults to following logs/bot_*.log)
+        status_provider: Callable returning the current status dict (defaults
+            to the bot's stats through ``bot_api``, or the stats file)
+        log_buffer: Ring buffer of log lines; when given, they are served from
+            memory and pushed as soon as they are logged. Defaults to the
+            bot's buffer through ``bot_api`` (bot_api.RemoteLogBuffer)
+        bot_api: Client for the bot process's API (defaults to $BOT_API_PORT
+            on localhost, see bot_api.start_bot_api_server)
+        poll_interval: Seconds between checks for new lines/status changes
+        heartbeat_seconds: Idle seconds before a keep-alive comment is sent
+    """
+    log_tailer = log_tailer or LogTailer()
+    if bot_api is None and bot_api_url():
+        bot_api = BotAPIClient(bot_api_url())
+    if log_buffer is None and bot_api is not None:
+        log_buffer = RemoteLogBuffer(bot_api)
+    if status_provider is None:
+        status_provider = bot_api_status(bot_api) if bot_api is not None else stats_file_status()
+    bp = Blueprint('dashboard_api', __name__)
+
+    def buffered_lines(cursor: Optional[str]):
+        """New lines from the ring buffer; cursors are sequence numbers"""
+        try:
+            seq = int(cursor)
+        except (TypeError, ValueError):
+            entries = log_buffer.tail(log_tailer.initial_lines)
+            seq = entries[0][0] - 1 if entries else log_buffer.last_seq
+        else:
+            entries, missed = log_buffer.after(seq)
+            if not entries and missed:
+                # The bot restarted and hasn't logged anything yet
+                seq = log_buffer.last_seq
+        if entries:
+            seq = entries[-1][0]
+        return [line for _, line in entries], str(seq)
+
+    @bp.route('/logs')
+    def logs():
+        limit = max(1, min(request.args.get('limit', 200, type=int), 1000))
+        after = request.args.get('after', type=int)
+        before = request.args.get('before')
+
+        next_seq = None
+        if log_buffer is not None:
+            try:
+                if before is None:
+                    missed = False
+                    if after is None:
+                        entries = log_buffer.tail(limit)
+                    else:
+                        entries, missed = log_buffer.after(after, limit)
+                    if entries:
+                        next_seq = entries[-1][0]
+                    else:
+                        next_seq = after if after is not None and not missed else log_buffer.last_seq
+                    # When lines after ``after`` were already dropped, the oldest
+                    # ones still in memory follow and ``truncated`` says so; the
+                    # gap can be read from the file with ?before=
+                    return jsonify(logs=[line for _, line in entries], next=next_seq, truncated=missed)
+                next_seq = log_buffer.last_seq
+            except (OSError, ValueError):
+                pass  # the bot isn't running; its log file has everything
+
+        # Paging back through history: read the end of the log file
+        lines, cursor = log_tailer.history(limit, before)
+        return jsonify(logs=lines, before=cursor, next=next_seq)
+
+    @bp.route('/metrics')
+    def metrics():
+        # The counters live in the bot's process; this one has nothing to report
+        if bot_api is None:
+            return Response("BOT_API_PORT is not set\n", status=503, content_type='text/plain')
+        try:
+            return Response(bot_api.metrics(), content_type=CONTENT_TYPE)
+        except OSError:
+            return Response("The bot is not running\n", status=503, content_type='text/plain')
+
+    @bp.route('/stream')
+    def stream():
+        cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+
+        def events():
+            nonlocal cursor
+            last_status = {}
+            last_sent = time.monotonic()
+            history_sent = False
+            # Tell the browser how long to wait before reconnecting
+            yield f"retry: {int(max(poll_interval, 1) * 1000)}\n\n"
+            while True:
+                sent = False
+                if log_buffer is not None:
+                    try:
+                        lines, cursor = buffered_lines(cursor)
+                    except (OSError, ValueError):
+                        # The bot isn't running, so nothing new is logged; a new
+                        # client still gets the end of its last log file
+                        lines = []
+                        if cursor is None and not history_sent:
+                            lines, _ = log_tailer.history(log_tailer.initial_lines)
+                            history_sent = True
+                else:
+                    lines, cursor = log_tailer.read(cursor)
+                if lines:
+                    yield sse_event(lines, 'log', cursor)
+                    sent = True
+
+                status = status_provider() or {}
+                delta = status_delta(last_status, status)
+                if delta:
+                    last_status = dict(status)
+                    yield sse_event(delta, 'status')
+                    sent = True
+
+                now = time.monotonic()
+                if sent:
+                    last_sent = now
+                elif now - last_sent >= heartbeat_seconds:
+                    yield ": keep-alive\n\n"
+                    last_sent = now
+
+                try:
+                    if log_buffer is None or cursor is None:
+                        raise OSError
+                    # Returns as soon as something is logged
+                    log_buffer.wait(int(cursor), timeout=poll_interval)
+                except (OSError, ValueError):
+                    time.sleep(poll_interval)
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    return bp
@@ -0,0 +1,86 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DebugCapture:
+    """Opt-in capture of screenshots and page source for debugging the poster.
+
+    Disabled by default, in which case ``capture`` returns immediately. When
+    enabled, the screenshot/DOM is grabbed from the driver and written by a
+    background thread to timestamped, per-post files in ``directory``. The
+    directory is kept under ``max_bytes`` and ``max_files`` by deleting the
+    oldest captures.
+    """
+
+    def __init__(self, enabled: bool = False, directory: Path = Path("data/debug"),
+                 max_bytes: int = 50 * 1024 * 1024, max_files: int = 200):
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'DebugCapture':
+        return cls(
+            enabled=os.getenv('DEBUG_CAPTURE', 'false').lower() == 'true',
+            directory=Path(os.getenv('DEBUG_CAPTURE_DIR', 'data/debug')),
+            max_bytes=int(float(os.getenv('DEBUG_CAPTURE_MAX_MB', 50)) * 1024 * 1024),
+            max_files=int(os.getenv('DEBUG_CAPTURE_MAX_FILES', 200)),
+        )
+
+    def capture(self, driver, label: str, post_id: Optional[str] = None, dom: bool = False):
+        """Capture a screenshot (and optionally the page source) if enabled"""
+        if not self.enabled or driver is None:
+            return
+        try:
+            # Talking to the driver has to happen on the caller's thread
+            png = driver.get_screenshot_as_png()
+            page_source = driver.page_source if dom else None
+        except Exception as e:
+            logger.warning("Debug capture '%s' failed: %s", label, e)
+            return
+
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        safe_post = re.sub(r'[^A-Za-z0-9_-]', '', post_id or '') or 'nopost'
+        base = f"{stamp}_{safe_post}_{label}"
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-capture")
+            self._executor.submit(self._write, base, png, page_source)
+
+    def _write(self, base: str, png: bytes, page_source: Optional[str]):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / f"{base}.png").write_bytes(png)
+            if page_source is not None:
+                (self.directory / f"{base}.html").write_text(page_source, encoding='utf-8')
+            self._rotate()
+        except Exception as e:
+            logger.error("Error writing debug capture %s: %s", base, e)
+
+    def _rotate(self):
+        """Delete the oldest captures until the directory fits the size/count caps"""
+        files = sorted((f for f in self.directory.iterdir() if f.is_file()),
+                       key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        while files and (total > self.max_bytes or len(files) > self.max_files):
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+
+    def close(self):
+        """Wait for pending writes to finish"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -2,22 +2,34 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    WebDriverException,
+)
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 
+import logging
 import os
 import time
 from pathlib import Path
-import json
+from typing import Optional
 
 from dotenv import load_dotenv
 
+from browser_discovery import resolve_browser
+from debug_capture import DebugCapture
+from metrics import REGISTRY
+from selector_registry import SelectorRegistry
+from session_broker import SessionBroker
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def remove_non_bmp_chars(text: str) -> str:
     """Remove non-BMP (Basic Multilingual Plane) characters from text.
@@ -31,23 +43,74 @@ def remove_non_bmp_chars(text: str) -> str:
     return ''.join(c for c in text if ord(c) <= 0xFFFF)
 
 
+# Candidate locators; SelectorRegistry learns which one to try first
+COMMENT_BOX_SELECTORS = [
+    (By.XPATH, "//textarea[contains(@placeholder, 'Add a comment')]"),
+    (By.XPATH, "//textarea[@aria-label='Add a comment…']"),
+    (By.CSS_SELECTOR, "textarea[aria-label^='Add a comment']"),
+    (By.CSS_SELECTOR, "textarea[placeholder^='Add a comment']")
+]
+
+POST_BUTTON_SELECTORS = [
+    (By.XPATH, "//div[contains(@role, 'button')][contains(., 'Post')][not(@disabled)]"),
+    (By.XPATH, "//button[contains(., 'Post')][not(@disabled)]"),
+    (By.XPATH, "//div[contains(text(), 'Post')]/ancestor-or-self::button[not(@disabled)]"),
+    (By.CSS_SELECTOR, "button[type='submit']:not([disabled])"),
+    (By.CSS_SELECTOR, "div[role='button'][type='submit']:not([disabled])")
+]
+
+
+INPUT_MODES = ('cdp', 'single', 'chunked', 'per_char')
+
+# Resources the "lean" profile never downloads; we only need the comment form
+BLOCKED_URL_PATTERNS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.heic*', '*.svg*',
+    '*.mp4*', '*.m4a*', '*.m4v*', '*.webm*',
+    '*.woff*', '*.ttf*', '*.otf*',
+]
+
+
+PHASE_SECONDS = REGISTRY.histogram(
+    'poster_phase_seconds', 'Duration of each post_comment phase', ['phase'])
+COMMENTS = REGISTRY.counter('poster_comments_total', 'Comment attempts in the browser', ['result'])
+
+
 class InstagramPoster:
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, input_mode: Optional[str] = None,
+                 profile: Optional[str] = None, session_broker: Optional[SessionBroker] = None):
         self.base_url = "https://www.instagram.com"
-        # Try cookies in data/ first, then project root
-        self.cookies_path = None
-        for path in [Path("data/instagram_cookies.json"), Path("instagram_cookies.json")]:
-            if path.exists():
-                self.cookies_path = path
-                break
-        if not self.cookies_path:
-            self.cookies_path = Path("data/instagram_cookies.json")  # Default to data/
+        # Cookies are shared with the scraper through the session broker; when the
+        # other side re-authenticates the browser picks the new session up lazily
+        self.session_broker = session_broker or SessionBroker.default()
+        self.cookies_path = self.session_broker.path
+        self._session_stale = False
         
         # Initialize WebDriver
         self.driver = None
         self.wait = None
+        self.last_timings = {}
+        self.startup_timings = {'discovery': None, 'launch': None, 'first_navigation': None}
+        self.debug = DebugCapture.from_env()
+        self.selectors = SelectorRegistry(Path("data/selector_order.json"), {
+            'comment_box': COMMENT_BOX_SELECTORS,
+            'post_button': POST_BUTTON_SELECTORS,
+        })
+        
+        # How comment text is entered: one CDP insertText call (default), a single
+        # send_keys, chunked send_keys, or the legacy per-character typing
+        self.input_mode = (input_mode or os.getenv('COMMENT_INPUT_MODE', 'cdp')).lower()
+        if self.input_mode not in INPUT_MODES:
+            logger.warning("Unknown input mode '%s', using 'cdp'", self.input_mode)
+            self.input_mode = 'cdp'
+        self.input_chunk_size = max(1, int(os.getenv('COMMENT_INPUT_CHUNK_SIZE', 20)))
+        
+        # "full" is a regular desktop Chrome; "lean" blocks images/media/fonts and
+        # keeps its HTTP cache and cookies in a persistent user-data-dir
+        self.profile = (profile or os.getenv('BROWSER_PROFILE', 'full')).lower()
+        self.user_data_dir = Path(os.getenv('CHROME_USER_DATA_DIR', 'data/chrome-profile'))
         if not self.setup_driver(headless):
             raise RuntimeError("Failed to initialize WebDriver")
+        self.session_broker.subscribe(self._on_session_refreshed)
 
     def setup_driver(self, headless: bool = True):
         """Set up the Selenium WebDriver with system Chrome installation"""
@@ -56,7 +119,7 @@ class InstagramPoster:
             from selenium.webdriver.chrome.service import Service
             import os
             
-            print("Setting up Chrome WebDriver using system Chrome...")
+            logger.info("Setting up Chrome WebDriver using system Chrome...")
             
             # Set up Chrome options
             options = Options()
@@ -77,8 +140,11 @@ class InstagramPoster:
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
             options.add_experimental_option('useAutomationExtension', False)
             
-            # Set window size
-            options.add_argument('--window-size=1920,1080')
+            if self.profile == 'lean':
+                self._apply_lean_options(options)
+            else:
+                # Set window size
+                options.add_argument('--window-size=1920,1080')
             
             # Set headless mode if specified
             if headless:
@@ -87,86 +153,126 @@ class InstagramPoster:
                 options.add_argument('--start-maximized')
                 options.add_argument('--disable-notifications')
             
-            # Find Chrome binary path
-            chrome_paths = [
-                os.path.expanduser("~" + os.sep + "AppData/Local/Google/Chrome/Application/chrome.exe"),
-                os.path.expandvars("$PROGRAMFILES/Google/Chrome/Application/chrome.exe"),
-                os.path.expandvars("$PROGRAMFILES(x86)/Google/Chrome/Application/chrome.exe")
-            ]
-            
-            chrome_path = None
-            for path in chrome_paths:
-                if os.path.exists(path):
-                    chrome_path = path
-                    break
+            # Find Chrome (and chromedriver); the result is cached between runs
+            discovery_start = time.perf_counter()
+            browser = resolve_browser()
+            self.startup_timings['discovery'] = time.perf_counter() - discovery_start
                     
-            if not chrome_path:
-                print("Error: Chrome browser not found in standard locations.")
+            if not browser:
+                logger.error("Chrome browser not found. Set CHROME_BINARY or install google-chrome/chromium.")
                 return False
-                
-            options.binary_location = chrome_path
             
-            # Initialize WebDriver without service
+            logger.info("Using Chrome %s at %s%s", browser.get('version') or '(unknown version)', browser['chrome'],
+                        ' (cached)' if browser.get('cached') else '')
+            options.binary_location = browser['chrome']
+            
+            # Use the resolved chromedriver, or let Selenium Manager find one
+            launch_start = time.perf_counter()
             try:
-                self.driver = webdriver.Chrome(options=options)
+                if browser.get('chromedriver'):
+                    self.driver = webdriver.Chrome(service=Service(executable_path=browser['chromedriver']),
+                                                   options=options)
+                else:
+                    self.driver = webdriver.Chrome(options=options)
             except Exception as e:
-                print(f"Error initializing WebDriver: {str(e)}")
-                print("Please ensure you have Chrome browser installed and it's up to date.")
+                logger.error("Error initializing WebDriver: %s", e)
+                logger.error("Please ensure you have Chrome browser installed and it's up to date.")
                 return False
+            self.startup_timings['launch'] = time.perf_counter() - launch_start
             
-            # Set up wait
-            self.wait = WebDriverWait(self.driver, 15)
+            # Set up wait; poll often so conditions resolve as soon as the page is ready
+            self.wait = WebDriverWait(self.driver, 15, poll_frequency=0.1,
+                                      ignored_exceptions=(NoSuchElementException, StaleElementReferenceException))
             
             # Set script timeout
             self.driver.set_script_timeout(30)
             
-            print("Test Chrome WebDriver initialized successfully")
+            if self.profile == 'lean':
+                self._block_heavy_resources()
+            
+            logger.info("Test Chrome WebDriver initialized successfully")
             return True
             
         except Exception as e:
-            print(f"Failed to initialize WebDriver: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Failed to initialize WebDriver: %s", e, exc_info=True)
             return False
 
+    def _apply_lean_options(self, options: Options):
+        """Chrome options for the lean profile"""
+        options.add_argument('--window-size=1280,900')
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-background-networking')
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-component-update')
+        options.add_argument('--disable-default-apps')
+        options.add_argument('--disable-sync')
+        options.add_argument('--metrics-recording-only')
+        options.add_argument('--mute-audio')
+        options.add_argument('--autoplay-policy=user-gesture-required')
+        options.add_argument('--no-first-run')
+        
+        # Persistent profile so the HTTP cache and cookies survive restarts
+        self.user_data_dir.mkdir(parents=True, exist_ok=True)
+        options.add_argument(f'--user-data-dir={self.user_data_dir.resolve()}')
+        
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+
+    def _block_heavy_resources(self):
+        """Tell Chrome to drop image, media and font requests (lean profile)"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.warning("Could not enable resource blocking: %s", e)
+
+    def _get(self, url: str):
+        """Navigate, recording how long the very first navigation takes"""
+        if self.startup_timings['first_navigation'] is not None:
+            self.driver.get(url)
+            return
+        start = time.perf_counter()
+        self.driver.get(url)
+        self.startup_timings['first_navigation'] = time.perf_counter() - start
+        logger.info("Startup timings: %s", ", ".join(
+            f"{phase}={seconds:.2f}s" for phase, seconds in self.startup_timings.items() if seconds is not None
+        ))
+
+    def _on_session_refreshed(self, cookies):
+        # Called from whichever thread re-authenticated; the driver is only
+        # touched from our own thread, before the next navigation
+        self._session_stale = True
+
     def load_cookies(self):
-        if self.cookies_path.exists():
-            self.driver.get(self.base_url)
-            with open(self.cookies_path, 'r') as f:
-                cookies = json.load(f)
-            for cookie in cookies:
-                # Remove 'sameSite' if present, as it's not accepted by Selenium
-                cookie.pop('sameSite', None)
-                # Adjust domain if needed
-                if 'domain' in cookie and cookie['domain'].startswith('.instagram.'):
-                    cookie['domain'] = 'instagram.com'
-                try:
-                    self.driver.add_cookie(cookie)
-                except Exception:
-                    pass
-            self.driver.refresh()
-            return True
-        return False
+        if not self.session_broker.cookies():
+            return False
+        self._get(self.base_url)
+        self.session_broker.apply_to_driver(self.driver)
+        self.driver.refresh()
+        self._session_stale = False
+        return True
 
     def save_cookies(self):
-        cookies = self.driver.get_cookies()
-        with open(self.cookies_path, 'w') as f:
-            json.dump(cookies, f, indent=2)
+        self.session_broker.publish_from_driver(self.driver, source=self._on_session_refreshed)
 
     def login(self, username: str, password: str) -> bool:
         try:
-            print("Trying cookie-based login...")
+            logger.info("Trying cookie-based login...")
             if self.load_cookies():
                 self.driver.get(f"{self.base_url}/")
                 time.sleep(3)
 
                 if "/accounts/login" not in self.driver.current_url:
-                    print("Logged in with cookies!")
+                    logger.info("Logged in with cookies!")
+                    # Instagram may have rotated some cookies
+                    self.save_cookies()
                     return True
                 else:
-                    print("Cookie login failed, falling back to username/password.")
+                    logger.info("Cookie login failed, falling back to username/password.")
             
-            self.driver.get(f"{self.base_url}/accounts/login/")
+            self._get(f"{self.base_url}/accounts/login/")
 
             try:
                 accept_cookies = self.wait.until(
@@ -196,154 +302,166 @@ class InstagramPoster:
                 self.wait.until(
                     EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Not Now')]"))
                 )
-                print("Successfully logged in!")
+                logger.info("Successfully logged in!")
                 # Save cookies for future runs
                 self.save_cookies()
                 return True
             except TimeoutException:
-                print("Login might have failed. Check your credentials.")
+                logger.warning("Login might have failed. Check your credentials.")
                 return False
 
         except Exception as e:
-            print(f"Error during login: {e}")
+            logger.error("Error during login: %s", e)
             return False
 
+    @staticmethod
+    def _comment_posted(comment_text: str):
+        """Wait condition: the textarea was cleared or the comment shows up in the list"""
+        def condition(driver):
+            return driver.execute_script("""
+                const text = arguments[0].trim();
+                const box = document.querySelector("textarea");
+                if (box && !box.disabled && box.value.trim() === "") {
+                    return true;
+                }
+                for (const el of document.querySelectorAll("ul li span, ul li div")) {
+                    if (el.textContent.trim() === text) {
+                        return true;
+                    }
+                }
+                return false;
+            """, comment_text)
+        return condition
+
+    def _type_comment(self, comment_box, comment_text: str) -> str:
+        """Enter the comment text according to ``self.input_mode``.
+        
+        Returns:
+            str: The text that was actually entered
+        """
+        if self.input_mode == 'cdp':
+            try:
+                # Input.insertText sends the whole string in one call, emoji included
+                self.driver.execute_script("arguments[0].focus();", comment_box)
+                self.driver.execute_cdp_cmd('Input.insertText', {'text': comment_text})
+                return comment_text
+            except (AttributeError, WebDriverException) as e:
+                logger.warning("CDP text insertion unavailable (%s), falling back to send_keys", e)
+        
+        # chromedriver's send_keys can't handle characters outside the BMP
+        sanitized_comment = remove_non_bmp_chars(comment_text)
+        if sanitized_comment != comment_text:
+            logger.warning("Comment contained non-BMP characters that were removed")
+        
+        if self.input_mode == 'per_char':
+            for char in sanitized_comment:
+                comment_box.send_keys(char)
+                time.sleep(0.05)  # Slight delay to mimic human typing
+        elif self.input_mode == 'chunked':
+            for start in range(0, len(sanitized_comment), self.input_chunk_size):
+                comment_box.send_keys(sanitized_comment[start:start + self.input_chunk_size])
+        else:
+            comment_box.send_keys(sanitized_comment)
+        return sanitized_comment
+
     def post_comment(self, post_url: str, comment_text: str) -> bool:
+        """Post a comment and wait until Instagram confirms it.
+        
+        Every step waits on an explicit condition instead of a fixed sleep.
+        Per-phase durations are kept in ``self.last_timings`` and recorded
+        in the ``poster_phase_seconds`` histogram.
+        """
+        posted = self._post_comment(post_url, comment_text)
+        for phase, seconds in self.last_timings.items():
+            PHASE_SECONDS.observe(seconds, phase=phase)
+        COMMENTS.inc(result='posted' if posted else 'failed')
+        return posted
+
+    def _post_comment(self, post_url: str, comment_text: str) -> bool:
+        timings = {}
+        self.last_timings = timings
+        post_id = post_url.rstrip('/').split('/')[-1]
+        started = phase_start = time.perf_counter()
+        
+        def mark(phase):
+            nonlocal phase_start
+            now = time.perf_counter()
+            timings[phase] = now - phase_start
+            phase_start = now
+        
         try:
-            self.driver.get(post_url)
-            time.sleep(3)  # Allow full page render
+            if self._session_stale:
+                logger.info("Session was refreshed elsewhere, loading the new cookies...")
+                self.load_cookies()
+            self._get(post_url)
+            mark('navigate')
 
-            print(f"About to post comment: {comment_text}")
-           
-            # Wait for any textarea to be present
-            print("Waiting for comment box...")
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "textarea")))
-           
-            # Try multiple selectors for the comment box
-            selectors = [
-                (By.XPATH, "//textarea[contains(@placeholder, 'Add a comment')]"),
-                (By.XPATH, "//textarea[@aria-label='Add a comment…']"),
-                (By.CSS_SELECTOR, "textarea[aria-label^='Add a comment']"),
-                (By.CSS_SELECTOR, "textarea[placeholder^='Add a comment']")
-            ]
+            logger.info("About to post comment: %s", comment_text)
            
-            comment_box = None
-            for by, selector in selectors:
-                try:
-                    comment_box = self.driver.find_element(by, selector)
-                    if comment_box:
-                        print(f"Found comment box with {by}")
-                        break
-                except Exception as e:
-                    print(f"Selector {by}={selector} failed: {e}")
-           
-            if not comment_box:
-                print("Could not find comment box with any selector")
-                self.driver.save_screenshot('comment_box_not_found.png')
-                return False
+            # Wait for an interactable comment box
+            logger.debug("Waiting for comment box...")
+            comment_box = self.wait.until(self.selectors.condition('comment_box'))
+            logger.debug("Found comment box")
            
             # Scroll to the comment box and click it
-            print("Clicking comment box...")
+            logger.debug("Clicking comment box...")
             self.driver.execute_script("arguments[0].scrollIntoView();", comment_box)
-            time.sleep(0.5)
             comment_box.click()
-            time.sleep(0.5)
            
-            # Re-find the comment box to avoid stale element reference
-            comment_box = self.driver.find_element(By.XPATH, "//textarea[contains(@placeholder, 'Add a comment')]")
+            # Instagram re-renders the textarea on focus; wait for the new one
+            comment_box = self.wait.until(self.selectors.condition('comment_box'))
+            mark('comment_box')
            
-            # Sanitize and type the comment
-            print("Sanitizing and typing comment...")
-            # Remove non-BMP characters that might cause issues
-            sanitized_comment = remove_non_bmp_chars(comment_text)
-            if sanitized_comment != comment_text:
-                print("Warning: Comment contained non-BMP characters that were removed")
+            # Type the comment using the configured input strategy
+            logger.debug("Typing comment (%s)...", self.input_mode)
+            typed_comment = self._type_comment(comment_box, comment_text)
+            mark('typing')
            
-            # Type the sanitized comment
-            for char in sanitized_comment:
-                comment_box.send_keys(char)
-                time.sleep(0.05)  # Slight delay to mimic human typing
-           
-            time.sleep(0.5)  # Brief pause before posting
-           
-            # Find and click the Post button
-            print("Looking for Post button...")
-            post_button = None
+            # Find the Post button once it becomes enabled
+            logger.debug("Looking for Post button...")
            
-            # Take a screenshot before trying to find the button
-            self.driver.save_screenshot('before_post_button_search.png')
-           
-            # Try multiple selectors for the post button
-            post_button_selectors = [
-                (By.XPATH, "//div[contains(@role, 'button')][contains(., 'Post')][not(@disabled)]"),
-                (By.XPATH, "//button[contains(., 'Post')][not(@disabled)]"),
-                (By.XPATH, "//div[contains(text(), 'Post')]/ancestor-or-self::button[not(@disabled)]"),
-                (By.CSS_SELECTOR, "div[role='button']:not([disabled]) > div:contains('Post')"),
-                (By.CSS_SELECTOR, "button:not([disabled]) > div:contains('Post')"),
-                (By.CSS_SELECTOR, "button[type='submit']:not([disabled])"),
-                (By.CSS_SELECTOR, "div[role='button'][type='submit']:not([disabled])")
-            ]
-           
-            for attempt in range(3):  # Try up to 3 times
-                for by, selector in post_button_selectors:
-                    try:
-                        print(f"Attempt {attempt + 1}: Trying selector: {by} = {selector}")
-                        elements = self.driver.find_elements(by, selector)
-                        print(f"Found {len(elements)} elements with selector: {selector}")
-                       
-                        for element in elements:
-                            try:
-                                if element.is_displayed() and element.is_enabled():
-                                    post_button = element
-                                    print(f"Found visible and enabled post button with {by} = {selector}")
-                                    break
-                            except Exception as e:
-                                print(f"Error checking element: {e}")
-                       
-                        if post_button:
-                            break
-                           
-                    except Exception as e:
-                        print(f"Selector {by}={selector} failed: {e}")
-               
-                if post_button:
-                    break
-                   
-                # Wait a bit before retrying
-                time.sleep(1)
+            # Debug captures are no-ops unless DEBUG_CAPTURE=true
+            self.debug.capture(self.driver, 'before_post_button', post_id)
            
-            if not post_button:
-                print("Post button not found with any selector after multiple attempts")
-                # Save the page source for debugging
-                with open('page_source.html', 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                self.driver.save_screenshot('post_button_not_found.png')
-                return False
-               
-            if not post_button.is_enabled():
-                print("Post button found but not enabled")
-                self.driver.save_screenshot('post_button_disabled.png')
+            try:
+                post_button = self.wait.until(self.selectors.condition('post_button'))
+            except TimeoutException:
+                logger.warning("Post button not found or never enabled")
+                self.debug.capture(self.driver, 'post_button_not_found', post_id, dom=True)
                 return False
+            mark('post_button')
            
             # Click the post button
-            print("Clicking post button...")
+            logger.debug("Clicking post button...")
             self.driver.execute_script("arguments[0].click();", post_button)
            
-            # Wait for the comment to be posted
-            time.sleep(3)
-            print("Comment posted successfully!")
+            # Wait for Instagram to accept the comment
+            try:
+                WebDriverWait(self.driver, 10, poll_frequency=0.2).until(
+                    self._comment_posted(typed_comment)
+                )
+            except TimeoutException:
+                mark('confirm')
+                logger.warning("Comment was not confirmed by the page")
+                self.debug.capture(self.driver, 'comment_not_confirmed', post_id, dom=True)
+                return False
+            mark('confirm')
+            timings['total'] = time.perf_counter() - started
+            logger.info("Comment posted successfully! Timings: %s",
+                        ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items()))
             return True
            
         except Exception as e:
-            print(f"Error posting comment: {e}")
-            import traceback
-            traceback.print_exc()
-            # Take a screenshot for debugging
-            self.driver.save_screenshot('comment_error.png')
+            logger.error("Error posting comment: %s", e, exc_info=True)
+            self.debug.capture(self.driver, 'comment_error', post_id, dom=True)
             return False
 
     def close(self):
         """Close the WebDriver"""
+        if hasattr(self, 'session_broker'):
+            self.session_broker.unsubscribe(self._on_session_refreshed)
+        if hasattr(self, 'debug'):
+            self.debug.close()
         if hasattr(self, 'driver'):
             self.driver.quit()
-            print("Browser closed.")
+            logger.info("Browser closed.")
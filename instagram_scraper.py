@@ -1,25 +1,73 @@
 import instaloader
+from instaloader.exceptions import (
+    QueryReturnedBadRequestException,
+    QueryReturnedForbiddenException,
+    QueryReturnedNotFoundException,
+    ConnectionException,
+    TooManyRequestsException,
+)
 import os
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from pathlib import Path
-import json
 from dotenv import load_dotenv
 
+from keyword_matcher import KeywordMatcher
+from metrics import REGISTRY
+from rate_limiter import TokenBucket
+from session_broker import SessionBroker
+from state_store import StateStore
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+ACCOUNT_FETCH_SECONDS = REGISTRY.histogram(
+    'scraper_account_fetch_seconds', 'Time to fetch and filter one account', ['outcome'])
+POSTS_SCANNED = REGISTRY.counter('scraper_posts_scanned_total', 'Posts read from Instagram')
+POSTS_FILTERED = REGISTRY.counter('scraper_posts_filtered_total', 'Scanned posts that were skipped', ['reason'])
+POSTS_MATCHED = REGISTRY.counter('scraper_posts_matched_total', 'Posts passed on for commenting')
+
+class SharedRateController(instaloader.RateController):
+    """instaloader's RateController, made safe to share between fetch workers.
+
+    The stock controller keeps its query log in a plain dict of lists that
+    ``wait_before_query`` reads, sleeps on and appends to. Concurrent workers
+    could interleave those steps and under-count queries, so each step runs
+    under one lock; a worker that has to wait holds up the others, which would
+    have had to wait for the same budget anyway.
+    """
+
+    def __init__(self, context):
+        super().__init__(context)
+        self._lock = threading.RLock()
+
+    def wait_before_query(self, query_type: str) -> None:
+        with self._lock:
+            super().wait_before_query(query_type)
+
+    def handle_429(self, query_type: str) -> None:
+        with self._lock:
+            super().handle_429(query_type)
+
 class InstagramScraper:
-    def __init__(self):
+    def __init__(self, session_broker: Optional[SessionBroker] = None):
         # Reload environment variables to get the latest changes
         from dotenv import load_dotenv
         load_dotenv(override=True)
         
+        # One context (a requests.Session plus the rate controller) is shared by all
+        # FETCH_WORKERS threads. Concurrent GETs on a Session are safe in practice:
+        # connections come from urllib3's thread-safe pool and the cookie jar locks
+        # itself. The rate controller is not, hence SharedRateController.
         self.loader = instaloader.Instaloader(
+            rate_controller=SharedRateController,
             quiet=True,
             download_comments=False,
             download_geotags=False,
@@ -36,28 +84,49 @@ class InstagramScraper:
         
         self.target_accounts = [acc.strip() for acc in target_accounts.split(',') if acc.strip()]
         self.fitness_keywords = [kw.strip().lower() for kw in fitness_keywords.split(',') if kw.strip()]
+        self.keyword_matcher = KeywordMatcher(
+            self.fitness_keywords,
+            word_boundary=os.getenv('KEYWORD_WORD_BOUNDARY', 'false').lower() == 'true'
+        )
         
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
         self.state_file = self.data_dir / "last_checked.json"
-        self.processed_posts = set()
+        self.state = StateStore(self.data_dir / "scraper_state.db")
+        self.processed_posts = self.state
         self.load_processed_posts()
         self.logged_in = False
+        self.username = None
+        
+        # Login cookies shared with the poster
+        self.session_broker = session_broker
+        if self.session_broker:
+            self.session_broker.subscribe(self._on_session_refreshed)
+        
+        # Concurrent fetching: all workers share one request budget
+        self.fetch_workers = max(1, int(os.getenv('FETCH_WORKERS', 4)))
+        self.max_posts_scanned = int(os.getenv('MAX_POSTS_SCANNED', 10))
         
-        logger.info(f"Scraper initialized with {len(self.target_accounts)} target accounts and "
-                  f"{len(self.fitness_keywords)} fitness keywords")
+        # Username -> user id cache, saves a full profile query per account per cycle
+        self.profile_cache_ttl = float(os.getenv('PROFILE_CACHE_TTL_HOURS', 24)) * 3600
+        self.profile_cache_size = int(os.getenv('PROFILE_CACHE_SIZE', 500))
+        self.profile_cache_stats = {'hits': 0, 'misses': 0}
+        self._profile_cache_lock = threading.Lock()
+        self.rate_limiter = TokenBucket.per_minute(
+            float(os.getenv('FETCH_REQUESTS_PER_MINUTE', 30)),
+            burst=float(os.getenv('FETCH_BURST', 5))
+        )
+        
+        logger.info("Scraper initialized with %s target accounts and %s fitness keywords",
+                    len(self.target_accounts), len(self.fitness_keywords))
 
     def load_processed_posts(self):
-        try:
-            with open(self.state_file, 'r') as f:
-                data = json.load(f)
-                self.processed_posts = set(data.get('processed_posts', []))
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
+        """Import the legacy JSON state file into the state store (one time only)"""
+        self.state.migrate_from_json(self.state_file)
 
     def save_processed_posts(self):
-        with open(self.state_file, 'w') as f:
-            json.dump({'processed_posts': list(self.processed_posts)}, f)
+        """Commit any pending state store writes"""
+        self.state.flush()
 
     def is_fitness_related(self, caption: str) -> bool:
         """Check if the caption contains any fitness-related keywords.
@@ -71,42 +140,53 @@ class InstagramScraper:
         if not caption or not caption.strip():
             return False
             
-        if not self.fitness_keywords or not any(self.fitness_keywords):
+        if not self.keyword_matcher:
             return True
             
-        caption_lower = caption.lower()
-        return any(keyword.lower() in caption_lower for keyword in self.fitness_keywords)
+        return self.keyword_matcher.matches(caption)
+
+    def match_keywords(self, caption: str) -> list:
+        """Return the fitness keywords found in the caption, in order of appearance"""
+        return self.keyword_matcher.find_all(caption)
 
     def get_new_posts(self, hours: int = 24):
         """
         Fetch new posts from target Instagram accounts that match fitness keywords.
         
+        Accounts are fetched concurrently by up to ``self.fetch_workers`` threads
+        that share one token-bucket rate limiter. Results are merged in the order
+        of ``self.target_accounts`` regardless of which account finishes first.
+        
         Args:
             hours: Maximum age of posts to fetch in hours (default: 24)
             
         Returns:
             List of post dictionaries containing post details
         """
-        import logging
-        import time
-        from itertools import islice
-        from instaloader.exceptions import (
-            QueryReturnedBadRequestException, 
-            QueryReturnedForbiddenException,
-            QueryReturnedNotFoundException,
-            ConnectionException,
-            TooManyRequestsException,
-            LoginRequiredException
-        )
+        return list(self.iter_new_posts(hours))
+
+    def iter_new_posts(self, hours: int = 24):
+        """
+        Yield new posts as soon as they are available, in ``get_new_posts`` order.
         
-        logger = logging.getLogger(__name__)
-        new_posts = []
+        An account's posts are yielded once that account and every account
+        before it in ``self.target_accounts`` have been fetched, so consumers
+        can start working while later accounts are still being paged.
         
-        if not self.target_accounts or not any(self.target_accounts):
+        Args:
+            hours: Maximum age of posts to fetch in hours (default: 24)
+            
+        Yields:
+            Post dictionaries containing post details
+        """
+        found = 0
+        accounts = [acc.strip() for acc in self.target_accounts if acc.strip()]
+        
+        if not accounts:
             logger.warning("No target accounts specified in TARGET_ACCOUNTS")
-            return new_posts
+            return
             
-        logger.info(f"Checking {len(self.target_accounts)} target accounts for new posts...")
+        logger.info("Checking %s target accounts for new posts...", len(accounts))
         
         # Login if not already logged in
         if not self.logged_in:
@@ -115,124 +195,319 @@ class InstagramScraper:
             if username and password:
                 if not self.login(username, password):
                     logger.error("Failed to log in to Instagram. Some features may be limited.")
-                    return new_posts
+                    return
         
-        for account in self.target_accounts:
-            account = account.strip()
-            if not account:
-                continue
-                
-            logger.info(f"\n👤 Checking account: @{account}")
-            
-            # Try to get profile with retries
-            max_retries = 3
-            profile = None
+        self.profile_cache_stats = {'hits': 0, 'misses': 0}
+        workers = min(self.fetch_workers, len(accounts))
+        if workers <= 1:
+            for account in accounts:
+                for post in self._fetch_account_posts(account, hours):
+                    found += 1
+                    yield post
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+                futures = [pool.submit(self._fetch_account_posts, account, hours) for account in accounts]
+                # Consume futures in submission order, so the merge is deterministic
+                for future in futures:
+                    for post in future.result():
+                        found += 1
+                        yield post
+        
+        lookups = self.profile_cache_stats['hits'] + self.profile_cache_stats['misses']
+        if lookups:
+            logger.info("Profile cache: %s hits / %s misses (%.0f%% hit rate)",
+                        self.profile_cache_stats['hits'], self.profile_cache_stats['misses'],
+                        100 * self.profile_cache_stats['hits'] / lookups)
+        logger.info("\nFound %s new posts from %s accounts", found, len(accounts))
+
+    def _fetch_profile(self, account: str, max_retries: int = 3):
+        """Look up a profile, retrying with backoff on transient errors.
+        
+        Backoff sleeps only block the calling worker. A 429 additionally pauses
+        the shared rate limiter, since Instagram throttles the whole session.
+        
+        A cached user id (see PROFILE_CACHE_TTL_HOURS) skips the profile query
+        altogether: see _cached_profile. Nothing is written to the state store
+        here; the caller stores the profile together with the account's other
+        state (see _save_account_state).
+        
+        Returns:
+            tuple: (profile or None, True if it came from the cache)
+        """
+        cached = self.state.get_cached_profile(account, self.profile_cache_ttl)
+        self._record_profile_cache(hit=cached is not None)
+        if cached:
+            logger.info("  ✅ @%s: profile id %s from cache: %s (%s followers)", account, cached['userid'], cached['full_name'] or 'N/A', cached['followers'])
+            return self._cached_profile(cached), True
+        
+        for attempt in range(max_retries):
+            try:
+                self.rate_limiter.acquire()
+                profile = instaloader.Profile.from_username(self.loader.context, account)
+                logger.info("  ✅ @%s: profile found: %s (%s followers)", account,
+                            getattr(profile, 'full_name', 'N/A'), getattr(profile, 'followers', 'N/A'))
+                return profile, False
+            except (QueryReturnedBadRequestException, QueryReturnedForbiddenException,
+                   QueryReturnedNotFoundException, ConnectionException, TooManyRequestsException) as e:
+                if isinstance(e, TooManyRequestsException):
+                    self.rate_limiter.penalize(30)
+                if attempt == max_retries - 1:  # Last attempt
+                    logger.error("  ❌ @%s: failed to fetch profile after %s attempts: %s", account, max_retries, str(e))
+                    return None, False
+                wait_time = (attempt + 1) * 5  # 5, 10, 15 seconds
+                logger.warning("  ⏳ @%s: error fetching profile. Retrying in %ss... (Attempt %s/%s)",
+                               account, wait_time, attempt + 1, max_retries)
+                time.sleep(wait_time)
+            except Exception as e:
+                logger.error("  ❗ @%s: unexpected error fetching profile: %s", account, str(e))
+                return None, False
+        return None, False
+
+    def _cached_profile(self, cached: dict) -> instaloader.Profile:
+        """Build a Profile from the cache without any request.
+        
+        ``Profile.from_id`` is no use here: it looks the username up by id and
+        then loads the full profile, which costs more than the lookup we are
+        trying to save. Instead the profile is marked as fully loaded, so
+        ``get_posts()`` pages posts straight away, and its first-page data is
+        left empty, so the iterator requests that page itself.
+        """
+        profile = instaloader.Profile(self.loader.context, {
+            'id': str(cached['userid']),
+            'username': cached['username'],
+            'full_name': cached['full_name'],
+            'edge_followed_by': {'count': cached['followers']},
+            'edge_owner_to_timeline_media': None,
+        })
+        profile._has_full_metadata = True
+        return profile
+
+    def _record_profile_cache(self, hit: bool):
+        with self._profile_cache_lock:
+            self.profile_cache_stats['hits' if hit else 'misses'] += 1
+
+    def _fetch_account_posts(self, account: str, hours: int) -> list:
+        """Fetch and filter the recent posts of a single account.
+        
+        Args:
+            account: Username of the target account
+            hours: Maximum age of posts to keep in hours
             
-            for attempt in range(max_retries):
+        Returns:
+            List of post dictionaries for this account (never raises)
+        """
+        new_posts = []
+        started = time.perf_counter()
+        logger.info("\n👤 Checking account: @%s", account)
+        
+        profile, from_cache = self._fetch_profile(account)
+        if not profile:
+            logger.error("  ❗ Could not fetch profile for @%s, skipping...", account)
+            ACCOUNT_FETCH_SECONDS.observe(time.perf_counter() - started, outcome='no_profile')
+            return new_posts
+        
+        high_water_mark = self.state.get_high_water_mark(account)
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        scan = {'stop': 'exhausted', 'scanned': 0, 'boundary': None}
+        seen = []  # (shortcode, date_utc, settled) of non-pinned posts, newest first
+        post_count = 0
+        
+        # Stream posts newest-first; paging stops at the cutoff or high-water mark
+        try:
+            self.rate_limiter.acquire()
+            for post in self._iter_recent_posts(profile, cutoff, high_water_mark, scan):
+                settled = True
                 try:
-                    profile = instaloader.Profile.from_username(self.loader.context, account)
-                    logger.info(f"  ✅ Profile found: {profile.full_name if hasattr(profile, 'full_name') else 'N/A'} ({getattr(profile, 'followers', 'N/A')} followers)")
-                    break
-                except (QueryReturnedBadRequestException, QueryReturnedForbiddenException,
-                       QueryReturnedNotFoundException, ConnectionException, TooManyRequestsException) as e:
-                    if attempt == max_retries - 1:  # Last attempt
-                        logger.error(f"  ❌ Failed to fetch profile after {max_retries} attempts: {str(e)}")
+                    post_id = post.shortcode
+                    
+                    # Skip if we've already processed this post
+                    if post_id in self.processed_posts:
+                        logger.debug("  ⏭ Already processed post %s", post_id)
+                        POSTS_FILTERED.inc(reason='processed')
+                        continue
+                    
+                    # Get post age
+                    post_date = getattr(post, 'date_utc', None) or datetime.utcnow()
+                    post_age_hours = (datetime.utcnow() - post_date).total_seconds() / 3600
+                    
+                    # Skip if post is too old (only pinned posts get this far)
+                    if post_age_hours > hours:
+                        logger.debug("  ⏭ Post %s is too old (%.1fh > %sh)", post_id, post_age_hours, hours)
+                        POSTS_FILTERED.inc(reason='too_old')
+                        continue
+                    
+                    # Get caption safely
+                    caption = (getattr(post, 'caption', '') or '').lower()
+                    
+                    # Skip if no caption (videos/reels often don't have captions)
+                    if not caption.strip():
+                        logger.debug("  Post %s has no caption", post_id)
+                        POSTS_FILTERED.inc(reason='no_caption')
+                        continue
+                    
+                    # Check if post is relevant to fitness
+                    matched_keywords = self.match_keywords(caption)
+                    if self.keyword_matcher and not matched_keywords:
+                        logger.debug("  Post %s is not fitness-related", post_id)
+                        POSTS_FILTERED.inc(reason='no_keyword')
+                        continue
+                    
+                    # Candidates stay unsettled until they are commented on
+                    settled = False
+                    
+                    # Create post data
+                    post_data = {
+                        'id': post_id,
+                        'shortcode': post_id,  # For backward compatibility
+                        'url': f"https://www.instagram.com/p/{post_id}",
+                        'account': account,
+                        'caption': caption,
+                        'likes': getattr(post, 'likes', 0),
+                        'comments': getattr(post, 'comments', 0),
+                        'timestamp': post_date.timestamp(),
+                        'date_utc': post_date,  # For backward compatibility
+                        'age_hours': post_age_hours,
+                        'matched_keywords': matched_keywords
+                    }
+                    
+                    new_posts.append(post_data)
+                    post_count += 1
+                    POSTS_MATCHED.inc()
+                    logger.info("  Found new post: %s (%.1fh old, %s likes)", post_id, post_age_hours, post_data['likes'])
+                    logger.debug("  Caption: %s...", caption[:150])
+                    
+                    # Limit number of posts per account to avoid rate limiting
+                    if post_count >= 3:  # Max 3 posts per account
+                        logger.info("  Reached maximum posts per account (3)")
+                        scan['stop'] = 'limit'
                         break
-                    wait_time = (attempt + 1) * 5  # 5, 10, 15 seconds
-                    logger.warning(f"  ⏳ Error fetching profile. Retrying in {wait_time}s... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                except Exception as e:
-                    logger.error(f"  ❗ Unexpected error fetching profile: {str(e)}")
-                    break
+                    
+                except Exception as post_error:
+                    settled = False
+                    logger.error("  Error processing post: %s", str(post_error), exc_info=True)
+                    POSTS_FILTERED.inc(reason='error')
+                    continue
+                finally:
+                    if not getattr(post, 'is_pinned', False):
+                        seen.append((post.shortcode, getattr(post, 'date_utc', None), settled))
             
-            if not profile:
-                logger.error(f"  ❗ Could not fetch profile for @{account}, skipping...")
-                continue
+        except (QueryReturnedBadRequestException, QueryReturnedForbiddenException,
+               QueryReturnedNotFoundException, ConnectionException, TooManyRequestsException) as e:
+            logger.error("  ❗ @%s: error fetching posts (rate limited?): %s", account, str(e))
+            if isinstance(e, TooManyRequestsException):
+                self.rate_limiter.penalize(30)
+            elif from_cache:
+                # The cached id may be stale (renamed or deleted account); look it up next time
+                from_cache = None
+            scan['stop'] = 'error'
+        except Exception as e:
+            logger.error("  Error processing posts for @%s: %s", account, str(e), exc_info=True)
+            if from_cache:
+                from_cache = None
+            scan['stop'] = 'error'
+        
+        logger.info("  📥 Scanned %s posts from @%s (stopped: %s)", scan['scanned'], account, scan['stop'])
+        self._save_account_state(account, profile, from_cache, seen, scan)
+        logger.info("  Found %s new posts from @%s", post_count, account)
+        POSTS_SCANNED.inc(scan['scanned'])
+        ACCOUNT_FETCH_SECONDS.observe(time.perf_counter() - started, outcome=scan['stop'])
+        return new_posts
+
+    def _iter_recent_posts(self, profile, cutoff: datetime, high_water_mark: Optional[dict], scan: dict):
+        """Lazily yield an account's posts, newest first.
+        
+        Iteration stops (and no further pages are requested) at the first
+        non-pinned post that is older than ``cutoff`` or not newer than the
+        account's high-water mark. Pinned posts are yielded without ending the
+        scan, since Instagram lists them first regardless of age.
+        
+        Args:
+            profile: instaloader Profile to page
+            cutoff: Oldest post date (UTC) worth looking at
+            high_water_mark: Stored mark for this account, or None
+            scan: Dict updated in place with 'scanned', 'stop' and 'boundary'
+        """
+        hwm_shortcode = high_water_mark['shortcode'] if high_water_mark else None
+        hwm_date = high_water_mark['posted_at'] if high_water_mark else None
+        
+        posts = iter(profile.get_posts())
+        while True:
+            # Check the limit before asking for another post, which may cost a page request
+            if scan['scanned'] >= self.max_posts_scanned:
+                scan['stop'] = 'scan_limit'
+                return
+            post = next(posts, None)
+            if post is None:
+                return
+            scan['scanned'] += 1
             
-            # Get recent posts with error handling
-            try:
-                posts = []
-                try:
-                    # Try to get up to 10 most recent posts
-                    posts = list(islice(profile.get_posts(), 10))
-                    logger.info(f"  📥 Fetched {len(posts)} recent posts from @{account}")
-                except (QueryReturnedBadRequestException, QueryReturnedForbiddenException,
-                       QueryReturnedNotFoundException, ConnectionException, TooManyRequestsException) as e:
-                    logger.error(f"  ❗ Error fetching posts (rate limited?): {str(e)}")
-                    time.sleep(30)  # Wait before continuing to next account
-                    continue
-                except Exception as e:
-                    logger.error(f"  ❗ Error fetching posts: {str(e)}")
-                    continue
-                
-                post_count = 0
-                for post in posts:
-                    try:
-                        post_id = post.shortcode
-                        
-                        # Skip if we've already processed this post
-                        if post_id in self.processed_posts:
-                            logger.debug(f"  ⏭ Already processed post {post_id}")
-                            continue
-                        
-                        # Get post age
-                        post_date = getattr(post, 'date_utc', None) or datetime.utcnow()
-                        post_age_hours = (datetime.utcnow() - post_date).total_seconds() / 3600
-                        
-                        # Skip if post is too old
-                        if post_age_hours > hours:
-                            logger.debug(f"  ⏭ Post {post_id} is too old ({post_age_hours:.1f}h > {hours}h)")
-                            continue
-                        
-                        # Get caption safely
-                        caption = (getattr(post, 'caption', '') or '').lower()
-                        
-                        # Skip if no caption (videos/reels often don't have captions)
-                        if not caption.strip():
-                            logger.debug(f"  Post {post_id} has no caption")
-                            continue
-                        
-                        # Check if post is relevant to fitness
-                        if not self.is_fitness_related(caption):
-                            logger.debug(f"  Post {post_id} is not fitness-related")
-                            continue
-                        
-                        # Create post data
-                        post_data = {
-                            'id': post_id,
-                            'shortcode': post_id,  # For backward compatibility
-                            'url': f"https://www.instagram.com/p/{post_id}",
-                            'account': account,
-                            'caption': caption,
-                            'likes': getattr(post, 'likes', 0),
-                            'comments': getattr(post, 'comments', 0),
-                            'timestamp': post_date.timestamp(),
-                            'date_utc': post_date,  # For backward compatibility
-                            'age_hours': post_age_hours
-                        }
-                        
-                        new_posts.append(post_data)
-                        post_count += 1
-                        logger.info(f"  Found new post: {post_id} ({post_age_hours:.1f}h old, {post_data['likes']} likes)")
-                        logger.debug(f"  Caption: {caption[:150]}...")
-                        
-                        # Limit number of posts per account to avoid rate limiting
-                        if post_count >= 3:  # Max 3 posts per account
-                            logger.info(f"  Reached maximum posts per account (3)")
-                            break
-                        
-                    except Exception as post_error:
-                        logger.error(f"  Error processing post: {str(post_error)}", exc_info=True)
-                        continue
-                
-                logger.info(f"  Found {post_count} new posts from @{account}")
-                
-            except Exception as e:
-                logger.error(f"  Error processing posts for @{account}: {str(e)}", exc_info=True)
+            if getattr(post, 'is_pinned', False):
+                yield post
                 continue
+            
+            post_date = getattr(post, 'date_utc', None)
+            if post.shortcode == hwm_shortcode or (post_date and hwm_date and post_date <= hwm_date):
+                scan['stop'] = 'high_water_mark'
+                return
+            if post_date and post_date < cutoff:
+                scan['stop'] = 'cutoff'
+                scan['boundary'] = post
+                return
+            yield post
+
+    def _save_account_state(self, account: str, profile, from_cache: Optional[bool], seen: list, scan: dict):
+        """Write the account's profile cache entry and high-water mark in one commit.
         
-        logger.info(f"\nFound {len(new_posts)} new posts from {len(self.target_accounts)} accounts")
-        return new_posts
+        ``from_cache`` is True for a cache hit, False for a fresh lookup and
+        None for a cache hit whose id turned out to be unusable.
+        """
+        try:
+            with self.state.batch():
+                if from_cache:
+                    self.state.touch_profile(account)
+                elif from_cache is None:
+                    self.state.invalidate_profile(account)
+                else:
+                    self.state.cache_profile(
+                        account, profile.userid,
+                        full_name=getattr(profile, 'full_name', None),
+                        followers=getattr(profile, 'followers', None),
+                        max_entries=self.profile_cache_size
+                    )
+                self._advance_high_water_mark(account, seen, scan)
+        except Exception as e:
+            logger.error("  Error saving state for @%s: %s", account, str(e), exc_info=True)
+
+    def _advance_high_water_mark(self, account: str, seen: list, scan: dict):
+        """Move the account's high-water mark past every settled post.
+        
+        The mark may only advance to a post when that post and everything older
+        than it have been settled (processed or filtered out), so candidates that
+        were not commented on yet are scanned again next cycle.
+        
+        Posts beyond ``MAX_POSTS_SCANNED`` count as settled: only the newest ones
+        are ever scanned, so they are out of reach in later cycles too. Without
+        this an account posting more often than that inside the window would
+        never advance its mark and be re-scanned every cycle.
+        """
+        if scan['stop'] in ('limit', 'error'):
+            return
+        
+        if scan['stop'] == 'cutoff' and scan['boundary'] is not None:
+            boundary = scan['boundary']
+            seen = seen + [(boundary.shortcode, boundary.date_utc, True)]
+        
+        # Find the start of the trailing run of settled posts
+        index = len(seen)
+        while index > 0 and seen[index - 1][2]:
+            index -= 1
+        if index == len(seen):
+            return
+        
+        shortcode, posted_at, _ = seen[index]
+        if posted_at is not None:
+            self.state.set_high_water_mark(account, shortcode, posted_at)
+            logger.debug("  High-water mark for @%s is now %s", account, shortcode)
 
     def process_post(self, post_data: dict) -> bool:
         """Mark a post as processed.
@@ -248,25 +523,32 @@ class InstagramScraper:
             logger.error("Cannot process post: No post ID found in post_data")
             return False
             
-        if post_id not in self.processed_posts:
-            self.processed_posts.add(post_id)
-            self.save_processed_posts()
-            logger.debug(f"✅ Marked post {post_id} as processed")
+        if self.state.mark_processed(post_id, post_data.get('account')):
+            logger.debug("✅ Marked post %s as processed", post_id)
             return True
             
-        logger.debug(f"ℹ️ Post {post_id} was already processed")
+        logger.debug("ℹ️ Post %s was already processed", post_id)
         return False
         
     def login(self, username: str, password: str) -> bool:
-        """Log in to Instagram"""
+        """Log in to Instagram, reusing the shared session if there is one"""
         if self.logged_in:
             return True
             
         try:
+            # A session the poster (or an earlier run) established costs no login request
+            if self.session_broker and self.session_broker.apply_to_instaloader(self.loader, username):
+                self.username = username
+                self.logged_in = True
+                print(f"Using shared session for {username}")
+                return True
+            
             # Try to load session first
             try:
                 self.loader.load_session_from_file(username)
+                self.username = username
                 self.logged_in = True
+                self._publish_session()
                 print(f"Successfully loaded session for {username}")
                 return True
             except FileNotFoundError:
@@ -280,7 +562,9 @@ class InstagramScraper:
                 self.loader.login(username, password)
                 # Save the session for future use
                 self.loader.save_session_to_file()
+                self.username = username
                 self.logged_in = True
+                self._publish_session()
                 print(f"Successfully logged in as {username}")
                 return True
             except Exception as e:
@@ -290,26 +574,32 @@ class InstagramScraper:
         except Exception as e:
             print(f"Error during login: {e}")
             return False
+
+    def _publish_session(self):
+        """Hand our session cookies to the poster"""
+        if self.session_broker:
+            self.session_broker.publish_from_instaloader(self.loader, source=self._on_session_refreshed)
+
+    def _on_session_refreshed(self, cookies):
+        """The poster re-authenticated; switch to its session if we're logged in"""
+        if self.logged_in and self.username:
+            if self.session_broker.apply_to_instaloader(self.loader, self.username):
+                logger.info("🔑 Scraper switched to the refreshed shared session")
     
     # Removed get_latest_post (single-account logic) as only multi-account logic is needed.
     
     def save_last_checked(self, post_shortcode: str):
         """Save the last checked post to avoid duplicates"""
-        data = {
-            'last_shortcode': post_shortcode,
-            'last_checked': datetime.now().isoformat()
-        }
-        with open(self.state_file, 'w') as f:
-            json.dump(data, f)
+        with self.state.batch():
+            self.state.set_meta('last_shortcode', post_shortcode)
+            self.state.set_meta('last_checked', datetime.now().isoformat())
     
     def was_post_processed(self, post_shortcode: str) -> bool:
         """Check if a post was already processed"""
-        if not self.state_file.exists():
-            return False
-            
-        try:
-            with open(self.state_file, 'r') as f:
-                data = json.load(f)
-                return data.get('last_shortcode') == post_shortcode
-        except (json.JSONDecodeError, FileNotFoundError):
-            return False
+        return self.state.get_meta('last_shortcode') == post_shortcode
+
+    def close(self):
+        """Flush and close the state store"""
+        if self.session_broker:
+            self.session_broker.unsubscribe(self._on_session_refreshed)
+        self.state.close()
@@ -0,0 +1,86 @@
+import re
+from typing import Iterable, List
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Build a regex alternation with shared prefixes factored out.
+
+    ``re`` tries every branch of a flat ``a|b|c`` alternation at each position;
+    nesting the keywords as a prefix trie lets it reject most positions after
+    looking at one or two characters.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = []
+        singles = []
+        for char in sorted(key for key in node if key):
+            child = node[char]
+            if list(child) == ['']:
+                singles.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + build(child))
+        if singles:
+            branches.append(singles[0] if len(singles) == 1 else '[' + ''.join(singles) + ']')
+        optional = '' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if optional else '')
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Match many keywords against a caption with a single precompiled regex.
+
+    The keywords are compiled once into a prefix-trie alternation (longer
+    keywords win over their prefixes) and each caption is lowercased and
+    scanned once, no matter how many keywords are configured.
+    """
+
+    def __init__(self, keywords: Iterable[str], word_boundary: bool = False, hashtags: bool = True):
+        """
+        Args:
+            keywords: Keywords to look for (case-insensitive)
+            word_boundary: Only match whole words ("gym" won't match "gymnastics")
+            hashtags: With ``word_boundary``, still match a keyword at the start of
+                a hashtag, e.g. "fitness" in "#fitnessmotivation"
+        """
+        self.keywords = sorted({kw.strip().lower() for kw in keywords if kw and kw.strip()},
+                               key=lambda kw: (-len(kw), kw))
+        self.word_boundary = word_boundary
+        self.hashtags = hashtags
+        self._pattern = self._compile() if self.keywords else None
+
+    def _compile(self):
+        alternation = _trie_regex(self.keywords)
+        if not self.word_boundary:
+            pattern = f'(?:{alternation})'
+        elif self.hashtags:
+            pattern = f'(?:(?<=#)(?:{alternation})|(?<!\\w)(?:{alternation})(?!\\w))'
+        else:
+            pattern = f'(?<!\\w)(?:{alternation})(?!\\w)'
+        return re.compile(pattern)
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def matches(self, text: str) -> bool:
+        """Return True if any keyword occurs in ``text``"""
+        return bool(self._pattern and text and self._pattern.search(text.lower()))
+
+    def find_all(self, text: str) -> List[str]:
+        """Return the distinct matched keywords, in order of first appearance"""
+        if not self._pattern or not text:
+            return []
+        found = []
+        for match in self._pattern.finditer(text.lower()):
+            keyword = match.group(0)
+            if keyword not in found:
+                found.append(keyword)
+        return found
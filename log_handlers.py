@@ -0,0 +1,122 @@
+import gzip
+import logging
+import logging.handlers
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last ``capacity`` formatted records in memory.
+
+    Every record gets a sequence number that only ever goes up, so a client
+    can ask for "everything after N" and get exactly the lines it hasn't
+    seen. Lookups walk back from the newest record, so they cost O(new lines)
+    regardless of the buffer size.
+    """
+
+    def __init__(self, capacity: int = 1000, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.capacity = capacity
+        self._records: Deque[Tuple[int, str]] = deque(maxlen=capacity)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._cond:
+            self._seq += 1
+            self._records.append((self._seq, line))
+            self._cond.notify_all()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def first_seq(self) -> int:
+        """Oldest sequence number still in the buffer (last_seq + 1 if empty)"""
+        with self._cond:
+            return self._records[0][0] if self._records else self._seq + 1
+
+    def after(self, seq: int, limit: Optional[int] = None) -> Tuple[List[Tuple[int, str]], bool]:
+        """Records with a sequence number above ``seq``, oldest first.
+
+        With a ``limit`` only the oldest ``limit`` of them are returned, so a
+        client can page forward from the last one it got.
+
+        Returns:
+            tuple: (list of (seq, line), True if records after ``seq`` were already dropped)
+        """
+        with self._cond:
+            newer = []
+            for entry in reversed(self._records):
+                if entry[0] <= seq:
+                    break
+                newer.append(entry)
+            missed = bool(self._records) and self._records[0][0] > seq + 1
+        newer.reverse()
+        if limit is not None and len(newer) > limit:
+            newer = newer[:limit]
+        return newer, missed
+
+    def tail(self, count: int) -> List[Tuple[int, str]]:
+        with self._cond:
+            start = max(0, len(self._records) - count)
+            return [self._records[i] for i in range(start, len(self._records))]
+
+    def wait(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until a record newer than ``seq`` exists (or the timeout passes)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > seq, timeout)
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated log file whose backups are gzipped and pruned by age.
+
+    Besides the usual ``backupCount`` limit, on every rollover any file in the
+    log directory matching ``prune_pattern`` that is older than
+    ``max_age_days`` is deleted, which also cleans up logs of old sessions.
+    """
+
+    def __init__(self, filename, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 max_age_days: Optional[float] = 14, prune_pattern: str = 'bot_*.log*',
+                 encoding: Optional[str] = 'utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=False)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = _gzip_rotator
+        self.max_age_days = max_age_days
+        self.prune_pattern = prune_pattern
+        self.prune()
+
+    def doRollover(self):
+        super().doRollover()
+        self.prune()
+
+    def prune(self):
+        """Delete log files older than ``max_age_days``"""
+        if not self.max_age_days:
+            return
+        cutoff = time.time() - self.max_age_days * 86400
+        current = Path(self.baseFilename)
+        for path in current.parent.glob(self.prune_pattern):
+            try:
+                if path != current and path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,126 @@
+import fnmatch
+import mmap
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+    """'bot_20240101_120000.log:1234' -> ('bot_20240101_120000.log', 1234)"""
+    if not cursor or ':' not in cursor:
+        return None, 0
+    name, _, offset = cursor.rpartition(':')
+    try:
+        return name, max(0, int(offset))
+    except ValueError:
+        return None, 0
+
+
+def tail_offset(path: Path, lines: int, end: Optional[int] = None) -> int:
+    """Byte offset where the last ``lines`` lines before ``end`` start.
+
+    The file is memory-mapped and searched backwards for newlines, so only
+    the pages holding those lines are touched, however big the file is.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if end == 0 or lines <= 0:
+            return end
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # A trailing newline ends the last line, it doesn't start a new one
+            position = end - 1 if mm[end - 1:end] == b'\n' else end
+            for _ in range(lines):
+                position = mm.rfind(b'\n', 0, position)
+                if position == -1:
+                    return 0
+            return position + 1
+
+
+def read_history(path: Path, lines: int, end: Optional[int] = None) -> Tuple[List[str], int]:
+    """The last ``lines`` lines of ``path`` before byte offset ``end``.
+
+    Returns:
+        tuple: (lines, offset where they start) - pass the offset as ``end``
+        to page further back
+    """
+    start = tail_offset(path, lines, end)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read((os.path.getsize(path) if end is None else end) - start)
+    return data.decode('utf-8', errors='replace').splitlines(), start
+
+
+class LogTailer:
+    """Follows the newest session log in ``log_dir``.
+
+    Positions are opaque ``<file name>:<byte offset>`` cursors, so a client
+    that reconnects can resume exactly where it stopped. When the bot starts a
+    new session log, readers still on the old file move to the new one.
+    """
+
+    def __init__(self, log_dir: Path = Path("logs"), pattern: str = "bot_*.log",
+                 initial_lines: int = 100):
+        self.log_dir = Path(log_dir)
+        self.pattern = pattern
+        self.initial_lines = initial_lines
+
+    def latest(self) -> Optional[Path]:
+        try:
+            return max(self.log_dir.glob(self.pattern), key=lambda p: p.stat().st_mtime, default=None)
+        except OSError:
+            return None
+
+    def history(self, lines: int, before: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """Up to ``lines`` lines before ``before`` (default: the end of the newest log).
+
+        Returns:
+            tuple: (lines, cursor of the first returned line)
+        """
+        name, offset = parse_cursor(before)
+        if name and (Path(name).name != name or not fnmatch.fnmatch(name, self.pattern)):
+            # Cursors come from clients; never let them point outside our logs
+            return [], None
+        path = self.log_dir / name if name else self.latest()
+        if path is None or not path.exists():
+            return [], None
+        try:
+            found, start = read_history(path, lines, offset if name else None)
+        except (OSError, ValueError):
+            return [], None
+        return found, f"{path.name}:{start}"
+
+    def read(self, cursor: Optional[str] = None, max_bytes: int = 64 * 1024) -> Tuple[List[str], Optional[str]]:
+        """Return the complete lines written after ``cursor`` and the new cursor.
+
+        Without a cursor the last ``initial_lines`` lines are returned.
+        """
+        path = self.latest()
+        if path is None:
+            return [], cursor
+
+        name, offset = parse_cursor(cursor)
+        try:
+            size = path.stat().st_size
+            if name is None:
+                offset = tail_offset(path, self.initial_lines)
+            elif name != path.name or offset > size:
+                # New session log, or the file was truncated
+                offset = 0
+            if offset >= size:
+                return [], f"{path.name}:{offset}"
+
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(max_bytes)
+        except OSError:
+            return [], cursor
+
+        # Only hand out complete lines; a partial one is picked up next time
+        end = data.rfind(b'\n')
+        if end != -1:
+            data = data[:end + 1]
+        elif len(data) < max_bytes:
+            return [], f"{path.name}:{offset}"
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        return lines, f"{path.name}:{offset + len(data)}"
@@ -0,0 +1,131 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from log_handlers import CompressedRotatingFileHandler, RingBufferHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, for machine ingestion"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock ``prepare`` formats the record on the calling thread so it can be
+    pickled; our queue never leaves the process, so the record is passed as is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def _file_handler(path: Path, prune_pattern: str) -> CompressedRotatingFileHandler:
+    return CompressedRotatingFileHandler(
+        path,
+        max_bytes=int(float(os.getenv('LOG_MAX_MB', 10)) * 1024 * 1024),
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+        max_age_days=float(os.getenv('LOG_MAX_AGE_DAYS', 14)),
+        prune_pattern=prune_pattern
+    )
+
+
+def setup_logging(log_dir: Path = Path('logs'),
+                  log_buffer: Optional[RingBufferHandler] = None) -> logging.Logger:
+    """Configure the root logger once for the whole process.
+
+    Log calls only put the record on a queue; a QueueListener thread formats
+    it and does the file/console I/O. Handlers:
+
+    - ``logs/bot_<timestamp>.log``, rotated, compressed and pruned by age
+    - the console
+    - ``logs/bot_<timestamp>.jsonl`` with one JSON object per record, if LOG_JSON=true
+    - ``log_buffer``, if given (the dashboard's in-memory tail)
+
+    The level comes from LOG_LEVEL (default INFO).
+    """
+    global _listener
+    stop_logging()
+
+    log_dir = Path(log_dir)
+    log_dir.mkdir(exist_ok=True)
+    # Create a unique log file for each session
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+
+    try:
+        file_handler = _file_handler(log_dir / f'bot_{timestamp}.log', 'bot_*.log*')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except Exception as e:
+        print(f"Warning: Failed to set up file logging: {e}")
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+
+    if os.getenv('LOG_JSON', 'false').lower() == 'true':
+        try:
+            json_handler = _file_handler(log_dir / f'bot_{timestamp}.jsonl', 'bot_*.jsonl*')
+            json_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(json_handler)
+        except Exception as e:
+            print(f"Warning: Failed to set up JSON logging: {e}")
+
+    if log_buffer is not None:
+        log_buffer.setFormatter(formatter)
+        handlers.append(log_buffer)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger()
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    # Clear any existing handlers
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    return logger
+
+
+def stop_logging():
+    """Drain the queue and close the handlers"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        try:
+            handler.flush()
+            handler.close()
+        except Exception as e:
+            print(f"Error cleaning up logging handler: {e}")
+
+
+atexit.register(stop_logging)
@@ -3,11 +3,9 @@ import sys
 import io
 import time
 import logging
-import atexit
 from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
-from instagram_poster import InstagramPoster
 
 # Set console encoding to UTF-8
 if sys.platform == 'win32':
@@ -20,69 +18,33 @@ if sys.platform == 'win32':
 # Import our modules
 from instagram_scraper import InstagramScraper
 from ai_commenter import AICommenter
-from instagram_poster import InstagramPoster
+from comment_cache import CommentCache
+from pipeline import CommentPipeline
+from poster_session import PosterSession
 from scheduler import BotScheduler
+from session_broker import SessionBroker
+from log_handlers import RingBufferHandler
+from logging_setup import setup_logging
+from metrics import REGISTRY, start_http_server
+from bot_api import start_bot_api_server
+from profiling import profile_call
 
-def setup_logging():
-    """Set up logging with file and console handlers"""
-    # Create logs directory if it doesn't exist
-    log_dir = Path('logs')
-    log_dir.mkdir(exist_ok=True)
-    
-    # Create a unique log file for each session
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = log_dir / f'bot_{timestamp}.log'
-    
-    # Configure root logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Clear any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # File handler
-    try:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    except Exception as e:
-        print(f"Warning: Failed to set up file logging: {e}")
-    
-    # Console handler
-    try:
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-    except Exception as e:
-        print(f"Warning: Failed to set up console logging: {e}")
-    
-    # Ensure all handlers are properly closed on exit
-    def cleanup():
-        for handler in logger.handlers[:]:
-            try:
-                handler.flush()
-                handler.close()
-                logger.removeHandler(handler)
-            except Exception as e:
-                print(f"Error cleaning up logging handler: {e}")
-    
-    atexit.register(cleanup)
-    return logger
+# Recent log records in memory, served to the dashboard through the bot API (BOT_API_PORT)
+log_buffer = RingBufferHandler(int(os.getenv('LOG_BUFFER_LINES', 1000)))
 
 # Initialize logging
-logger = setup_logging()
+setup_logging(log_buffer=log_buffer)
+logger = logging.getLogger(__name__)
 logger.info("Starting Instagram Bot")
 
+CYCLE_SECONDS = REGISTRY.histogram('bot_cycle_seconds', 'Duration of process_new_posts', ['result'])
+
 # Load environment variables
 try:
     load_dotenv()
     logger.info("Environment variables loaded successfully")
 except Exception as e:
-    logger.error(f"Failed to load environment variables: {e}")
+    logger.error("Failed to load environment variables: %s", e)
     raise
 
 class InstaCommentBot:
@@ -91,18 +53,45 @@ class InstaCommentBot:
         from dotenv import load_dotenv
         load_dotenv(override=True)
         
-        # Initialize components
-        self.scraper = InstagramScraper()
-        self.ai_commenter = AICommenter(os.getenv('OPENAI_API_KEY'))
-        self.poster = InstagramPoster(headless=False)  # Set to True for production
+        # Initialize components; scraper and poster share one login session
+        self.session_broker = SessionBroker.default()
+        self.scraper = InstagramScraper(session_broker=self.session_broker)
+        self.comment_cache = CommentCache(
+            Path('data') / 'comment_cache.db',
+            ttl_seconds=float(os.getenv('COMMENT_CACHE_TTL_HOURS', 72)) * 3600,
+            max_entries=int(os.getenv('COMMENT_CACHE_MAX_ENTRIES', 1000)),
+            variants=int(os.getenv('COMMENT_CACHE_VARIANTS', 1))
+        )
+        self.ai_commenter = AICommenter(os.getenv('OPENAI_API_KEY'), cache=self.comment_cache)
+        self.poster = PosterSession(headless=False, session_broker=self.session_broker)  # Set to True for production
         self.scheduler = BotScheduler()
         
         # Load config with reloaded environment variables
         self.max_comments_per_day = int(os.getenv('MAX_COMMENTS_PER_DAY', 5))
+        self.pipeline = CommentPipeline(
+            self.scraper, self.ai_commenter, self.poster, self.scheduler,
+            self.max_comments_per_day,
+            queue_size=int(os.getenv('PIPELINE_QUEUE_SIZE', 5))
+        )
         self.check_interval_hours = int(os.getenv('COMMENT_FREQUENCY_HOURS', 24))
+        self._retry_job = None
+        
+        # Optional Prometheus scrape endpoint for the bot process
+        self.metrics_server = None
+        metrics_port = int(os.getenv('METRICS_PORT', 0))
+        if metrics_port:
+            self.metrics_server = start_http_server(metrics_port)
+            logger.info("Serving metrics on port %s", metrics_port)
         
-        logger.info(f"Bot initialized with settings: {self.max_comments_per_day} max comments/day, "
-                  f"check every {self.check_interval_hours} hours")
+        # Lets the dashboard (a separate process) read the scheduler's state and log lines from memory
+        self.bot_api_server = None
+        bot_api_port = int(os.getenv('BOT_API_PORT', 0))
+        if bot_api_port:
+            self.bot_api_server = start_bot_api_server(bot_api_port, self.scheduler, log_buffer)
+            logger.info("Serving the bot API on port %s", bot_api_port)
+        
+        logger.info("Bot initialized with settings: %s max comments/day, check every %s hours",
+                    self.max_comments_per_day, self.check_interval_hours)
     
     def login(self) -> bool:
         """Log in to Instagram"""
@@ -114,104 +103,60 @@ class InstaCommentBot:
             return False
             
         logger.info("Logging in to Instagram...")
-        return self.poster.login(username, password)
+        if not self.poster.login(username, password):
+            return False
+        # The browser login was published to the broker, so this reuses it
+        if not self.scraper.login(username, password):
+            logger.warning("Scraper could not use the shared session, continuing anonymously")
+        return True
     
     def process_new_posts(self):
         """Check for new posts and comment on them"""
-        import random
-        import time
         from datetime import datetime
         
+        metrics_before = REGISTRY.snapshot()
+        started = time.perf_counter()
+        result = 'error'
         try:
             logger.info("\n" + "="*50)
-            logger.info(f"Starting post processing at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info("Starting post processing at %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
             
             # Check if we can post a comment
             logger.info("Checking if we can post a comment...")
             if not self.scheduler.can_post_comment(self.max_comments_per_day):
                 logger.info("Cannot post comment right now (rate limited or daily limit reached)")
+                self._schedule_retry()
+                result = 'blocked'
                 return False
             
-            # Get new posts
+            # Scraping, comment generation and posting run as a pipeline
             logger.info("\nFetching new posts from target accounts...")
-            try:
-                posts = self.scraper.get_new_posts()
-                if not posts:
-                    logger.info("No new posts found to comment on.")
-                    return False
-                    
-                logger.info(f"\nFound {len(posts)} new post(s) to process")
-                
-                # Process each post
-                for idx, post in enumerate(posts, 1):
-                    try:
-                        logger.info("\n" + "-"*50)
-                        logger.info(f"Processing post {idx}/{len(posts)} from @{post['account']}")
-                        logger.info(f"URL: {post['url']}")
-                        logger.info(f"Age: {post.get('age_hours', 'N/A'):.1f} hours old")
-                        logger.info(f"Likes: {post.get('likes', 'N/A')}")
-                        logger.info(f"Caption preview: {post.get('caption', 'No caption')[:150]}...")
-                        
-                        # Generate comment
-                        logger.info("\nGenerating comment...")
-                        try:
-                            comment = self.ai_commenter.generate_comment(post.get('caption', ''))
-                            if not comment or not isinstance(comment, str):
-                                logger.error("Failed to generate comment: Invalid comment returned")
-                                continue
-                                
-                            logger.info(f"Generated comment: {comment}")
-                            
-                            if not self.ai_commenter.is_comment_appropriate(comment):
-                                logger.warning("Skipping comment: Generated comment was not appropriate")
-                                continue
-                                
-                        except Exception as e:
-                            logger.error(f"Error generating comment: {str(e)}", exc_info=True)
-                            continue
-                        
-                        # Post the comment
-                        logger.info("\nAttempting to post comment...")
-                        try:
-                            if self.poster.post_comment(post['url'], comment):
-                                self.scraper.process_post(post)
-                                self.scheduler.record_comment_posted()
-                                logger.info("✅ Successfully posted comment")
-                                
-                                # Random delay between comments to mimic human behavior (longer delay after success)
-                                delay = random.uniform(120, 300)  # 2-5 minutes
-                                logger.info(f"Waiting {delay/60:.1f} minutes before next action...")
-                                time.sleep(delay)
-                                
-                                return True  # Successfully posted a comment
-                            else:
-                                logger.error("❌ Failed to post comment")
-                                # Shorter delay after failure
-                                time.sleep(random.uniform(30, 60))
-                                continue
-                                
-                        except Exception as e:
-                            logger.error(f"Error posting comment: {str(e)}", exc_info=True)
-                            time.sleep(random.uniform(30, 60))
-                            continue
-                            
-                    except Exception as e:
-                        logger.error(f"Unexpected error processing post: {str(e)}", exc_info=True)
-                        time.sleep(10)
-                        continue
-                
+            posted = self.pipeline.run_cycle()
+            if self.pipeline.blocked:
+                # The limits stopped the cycle early; come back as soon as they allow
+                self._schedule_retry()
+            if not posted:
                 logger.warning("Processed all posts but couldn't post any comments")
+                result = 'none_posted'
                 return False
-                
-            except Exception as e:
-                logger.error(f"Error fetching posts: {str(e)}", exc_info=True)
-                return False
+            result = 'posted'
+            return True
                 
         except Exception as e:
-            logger.error(f"Critical error in process_new_posts: {str(e)}", exc_info=True)
+            logger.error("Critical error in process_new_posts: %s", str(e), exc_info=True)
             return False
-        except Exception as e:
-            logger.error(f"Error processing posts: {e}", exc_info=True)
+        finally:
+            CYCLE_SECONDS.observe(time.perf_counter() - started, result=result)
+            logger.info("Cycle metrics: %s", REGISTRY.summary(metrics_before))
+    
+    def _schedule_retry(self):
+        """Come back exactly when the rate limiter frees the next slot"""
+        if self._retry_job is not None:
+            self.scheduler.cancel(self._retry_job)
+        self._retry_job = self.scheduler.run_at(
+            self.process_new_posts,
+            self.scheduler.next_allowed_at(self.max_comments_per_day)
+        )
     
     def run(self, run_once: bool = False):
         """Run the bot"""
@@ -235,23 +180,50 @@ class InstaCommentBot:
             if run_once:
                 logger.info("Run once completed. Exiting...")
             else:
-                logger.info(f"Scheduler started. Next check in {self.check_interval_hours} hours.")
-                logger.info(f"Max {self.max_comments_per_day} comments per day.")
+                logger.info("Scheduler started. Next check in %s hours.", self.check_interval_hours)
+                logger.info("Max %s comments per day.", self.max_comments_per_day)
                 self.scheduler.run_continuously()
                 
         except KeyboardInterrupt:
             logger.info("Bot stopped by user")
         except Exception as e:
-            logger.error(f"Error in bot: {e}", exc_info=True)
+            logger.error("Error in bot: %s", e, exc_info=True)
+        finally:
+            self.shutdown()
+    
+    def profile_cycle(self, mode: str = 'sample', out_dir: str = 'profiles', top: int = 20):
+        """Run a single process_new_posts cycle under the profiler and print where the time went"""
+        try:
+            _, _, summary = profile_call(self.process_new_posts, mode, Path(out_dir), top)
+            print(summary)
         finally:
-            self.poster.close()
-            logger.info("Bot stopped")
+            self.shutdown()
+    
+    def shutdown(self):
+        """Stop the scheduler and pipeline and release the browser, databases and servers"""
+        self.scheduler.stop()
+        self.pipeline.stop()
+        self.poster.close()
+        self.scraper.close()
+        self.comment_cache.close()
+        self.scheduler.close()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        if self.bot_api_server is not None:
+            self.bot_api_server.shutdown()
+        logger.info("Bot stopped")
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Instagram Comment Bot')
     parser.add_argument('--once', action='store_true', help='Run once and exit')
     parser.add_argument('--continuous', action='store_true', help='Run in continuous mode (for web interface)')
     parser.add_argument('--config', type=str, help='Path to config file', default=None)
+    parser.add_argument('--profile', nargs='?', const='sample', choices=['sample', 'cprofile'],
+                        help='Profile a single cycle: wall-clock sampling (default) or cProfile')
+    parser.add_argument('--profile-out', type=str, default='profiles',
+                        help='Directory for the .collapsed/.pstats profile output')
+    parser.add_argument('--profile-top', type=int, default=20,
+                        help='Number of functions in the profile summary')
     return parser.parse_args()
 
 def load_config_file(config_path):
@@ -263,11 +235,11 @@ def load_config_file(config_path):
                 # Update environment variables
                 for key, value in config.items():
                     os.environ[key] = str(value)
-                logger.info(f"Loaded config from {config_path}")
-                logger.info(f"Target accounts: {os.getenv('TARGET_ACCOUNTS')}")
-                logger.info(f"Fitness keywords: {os.getenv('FITNESS_KEYWORDS')}")
+                logger.info("Loaded config from %s", config_path)
+                logger.info("Target accounts: %s", os.getenv('TARGET_ACCOUNTS'))
+                logger.info("Fitness keywords: %s", os.getenv('FITNESS_KEYWORDS'))
     except Exception as e:
-        logger.error(f"Error loading config file: {e}")
+        logger.error("Error loading config file: %s", e)
 
 def main():
     args = parse_arguments()
@@ -287,15 +259,18 @@ def main():
         logger.error("Failed to log in to Instagram")
         return
     
-    if args.continuous:
+    if args.profile:
+        logger.info("Profiling one cycle (%s)...", args.profile)
+        bot.profile_cycle(args.profile, args.profile_out, args.profile_top)
+    elif args.continuous:
         logger.info("Running in continuous mode...")
-        logger.info(f"Using target accounts: {os.getenv('TARGET_ACCOUNTS', '')}")
-        logger.info(f"Using fitness keywords: {os.getenv('FITNESS_KEYWORDS', '')}")
+        logger.info("Using target accounts: %s", os.getenv('TARGET_ACCOUNTS', ''))
+        logger.info("Using fitness keywords: %s", os.getenv('FITNESS_KEYWORDS', ''))
         bot.run(run_once=False)
     else:
         logger.info("Running once...")
-        logger.info(f"Using target accounts: {os.getenv('TARGET_ACCOUNTS', '')}")
-        logger.info(f"Using fitness keywords: {os.getenv('FITNESS_KEYWORDS', '')}")
+        logger.info("Using target accounts: %s", os.getenv('TARGET_ACCOUNTS', ''))
+        logger.info("Using fitness keywords: %s", os.getenv('FITNESS_KEYWORDS', ''))
         bot.run(run_once=args.once)
 
 if __name__ == "__main__":
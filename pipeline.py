@@ -0,0 +1,208 @@
+import logging
+import queue
+import random
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class CommentPipeline:
+    """Scrape -> generate -> post, as stages connected by bounded queues.
+
+    The scraper and comment generator run in background threads and work
+    ahead of the poster, so by the time ``BotScheduler.can_post_comment``
+    allows a post there is usually a validated comment waiting. Queue sizes
+    bound how far the producers can get ahead (backpressure). The poster runs
+    in the calling thread, since the Selenium driver is not thread-safe.
+    """
+
+    def __init__(self, scraper, ai_commenter, poster, scheduler, max_comments_per_day: int,
+                 queue_size: int = 5, batch_size: Optional[int] = None):
+        self.scraper = scraper
+        self.ai_commenter = ai_commenter
+        self.poster = poster
+        self.scheduler = scheduler
+        self.max_comments_per_day = max_comments_per_day
+        self.queue_size = max(1, queue_size)
+        self.batch_size = batch_size or getattr(ai_commenter, 'batch_size', 1)
+        # Set when the last cycle ended because the rate limits stopped it
+        self.blocked = False
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Ask all stages to finish their current item and exit"""
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up when the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE when the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _produce(self, posts: queue.Queue):
+        """Scraper stage: stream new posts into the posts queue"""
+        try:
+            for post in self.scraper.iter_new_posts():
+                if not self._put(posts, post):
+                    break
+        except Exception as e:
+            logger.error("Error fetching posts: %s", str(e), exc_info=True)
+        finally:
+            self._put(posts, _DONE)
+
+    def _generate(self, posts: queue.Queue, ready: queue.Queue):
+        """Generation stage: batch whatever posts are waiting, then validate"""
+        done = False
+        try:
+            while not done:
+                post = self._get(posts)
+                if post is _DONE:
+                    break
+                batch = [post]
+                while len(batch) < self.batch_size:
+                    try:
+                        post = posts.get_nowait()
+                    except queue.Empty:
+                        break
+                    if post is _DONE:
+                        done = True
+                        break
+                    batch.append(post)
+
+                logger.info("Generating comments for %s post(s)...", len(batch))
+                comments = self.ai_commenter.generate_comments([p.get('caption', '') for p in batch])
+                for post, comment in zip(batch, comments):
+                    if not comment or not isinstance(comment, str):
+                        logger.error("Failed to generate comment for %s: Invalid comment returned", post['url'])
+                        continue
+                    if not self.ai_commenter.is_comment_appropriate(comment):
+                        logger.warning("Skipping %s: Generated comment was not appropriate", post['url'])
+                        continue
+                    if not self._put(ready, (post, comment)):
+                        return
+        except Exception as e:
+            logger.error("Error generating comments: %s", str(e), exc_info=True)
+        finally:
+            self._put(ready, _DONE)
+
+    def _consume(self, ready: queue.Queue) -> int:
+        """Poster stage: post ready comments for as long as the rate limits allow"""
+        posted = 0
+        attempted = 0
+        while True:
+            item = self._get(ready)
+            if item is _DONE:
+                break
+            post, comment = item
+            attempted += 1
+
+            if not self.scheduler.can_post_comment(self.max_comments_per_day):
+                logger.info("Cannot post comment right now (rate limited or daily limit reached)")
+                self.blocked = True
+                break
+
+            logger.info("\n" + "-"*50)
+            logger.info("Processing post %s from @%s", attempted, post['account'])
+            logger.info("URL: %s", post['url'])
+            if post.get('age_hours') is not None:
+                logger.info("Age: %.1f hours old", post['age_hours'])
+            logger.info("Likes: %s", post.get('likes', 'N/A'))
+            logger.info("Caption preview: %s...", post.get('caption', 'No caption')[:150])
+            logger.info("Generated comment: %s", comment)
+
+            logger.info("\nAttempting to post comment...")
+            try:
+                if self.poster.post_comment(post['url'], comment):
+                    self.scraper.process_post(post)
+                    self.scheduler.record_comment_posted()
+                    posted += 1
+                    logger.info("✅ Successfully posted comment")
+
+                    # No point waiting if that was the last comment the limits allow
+                    if not self.scheduler.can_post_comment(self.max_comments_per_day):
+                        logger.info("Rate limit reached, ending the cycle")
+                        self.blocked = True
+                        break
+
+                    # Random delay between comments to mimic human behavior (longer delay after success);
+                    # scraping and generation keep working in the background meanwhile
+                    delay = random.uniform(120, 300)  # 2-5 minutes
+                    logger.info("Waiting %.1f minutes before next action...", delay/60)
+                    self._stop.wait(delay)
+                else:
+                    logger.error("❌ Failed to post comment")
+                    # Shorter delay after failure
+                    self._stop.wait(random.uniform(30, 60))
+            except Exception as e:
+                logger.error("Error posting comment: %s", str(e), exc_info=True)
+                self._stop.wait(random.uniform(30, 60))
+        return posted
+
+    def _drain(self, q: queue.Queue) -> int:
+        """Empty a queue so producers blocked on put() can notice the stop flag"""
+        dropped = 0
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                return dropped
+            if item is not _DONE:
+                dropped += 1
+
+    def run_cycle(self) -> int:
+        """Run one scrape/generate/post cycle.
+
+        ``blocked`` tells whether the rate limits cut the cycle short.
+
+        Returns:
+            int: Number of comments posted
+        """
+        self._stop.clear()
+        self.blocked = False
+        posts = queue.Queue(maxsize=self.queue_size)
+        ready = queue.Queue(maxsize=self.queue_size)
+        stages = [
+            threading.Thread(target=self._produce, args=(posts,), name="pipeline-scrape", daemon=True),
+            threading.Thread(target=self._generate, args=(posts, ready), name="pipeline-generate", daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+
+        posted = 0
+        try:
+            posted = self._consume(ready)
+        finally:
+            # Graceful drain: stop the producers and let them finish their current item
+            self.stop()
+            dropped = 0
+            for stage in stages:
+                while stage.is_alive():
+                    dropped += self._drain(posts) + self._drain(ready)
+                    stage.join(timeout=0.5)
+            dropped += self._drain(posts) + self._drain(ready)
+            if dropped:
+                logger.info("Discarded %s queued item(s) at the end of the cycle", dropped)
+
+        cache = getattr(self.ai_commenter, 'cache', None)
+        if cache is not None:
+            stats = cache.stats()
+            logger.info("Comment cache: %s hits / %s misses (%.0f%% hit rate, %s tokens saved)",
+                        stats['hits'], stats['misses'], 100 * stats['hit_rate'], stats['saved_tokens'])
+        return posted
@@ -0,0 +1,109 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from instagram_poster import InstagramPoster
+from session_broker import SessionBroker
+
+logger = logging.getLogger(__name__)
+
+
+class PosterSession:
+    """Keeps one warm, logged-in InstagramPoster alive across bot cycles.
+
+    Before every use the driver gets a cheap health check (a ``driver.title``
+    round-trip). A dead session is closed and relaunched transparently, and
+    logged back in from the persisted cookies, so a Chrome crash costs one
+    relaunch instead of the whole run.
+
+    The session exposes the same ``login``/``post_comment``/``close`` methods
+    as InstagramPoster, so it can be used wherever a poster is expected.
+    """
+
+    def __init__(self, headless: bool = True,
+                 poster_factory: Callable[..., InstagramPoster] = InstagramPoster,
+                 session_broker: Optional[SessionBroker] = None):
+        self.headless = headless
+        self.session_broker = session_broker
+        self.poster_factory = poster_factory
+        self.poster: Optional[InstagramPoster] = None
+        self.logged_in = False
+        self.recycles = 0
+        self.timings = {'launch': None, 'login': None, 'recycle': None, 'health_check': None}
+        self._username = None
+        self._password = None
+
+    def is_healthy(self) -> bool:
+        """Return True if the browser still answers WebDriver commands"""
+        if self.poster is None or self.poster.driver is None:
+            return False
+        start = time.perf_counter()
+        try:
+            self.poster.driver.title
+            return True
+        except Exception:
+            return False
+        finally:
+            self.timings['health_check'] = time.perf_counter() - start
+
+    def _start(self):
+        start = time.perf_counter()
+        if self.session_broker is not None:
+            self.poster = self.poster_factory(headless=self.headless, session_broker=self.session_broker)
+        else:
+            self.poster = self.poster_factory(headless=self.headless)
+        self.timings['launch'] = time.perf_counter() - start
+        logger.info("Browser launched in %.2fs", self.timings['launch'])
+        self.logged_in = False
+        if self._username and self._password:
+            self._login()
+
+    def _login(self) -> bool:
+        start = time.perf_counter()
+        self.logged_in = self.poster.login(self._username, self._password)
+        self.timings['login'] = time.perf_counter() - start
+        logger.info("Login %s in %.2fs", 'succeeded' if self.logged_in else 'failed', self.timings['login'])
+        return self.logged_in
+
+    def recycle(self):
+        """Throw away the current browser and start a fresh, logged-in one"""
+        start = time.perf_counter()
+        self._close_poster()
+        self._start()
+        self.recycles += 1
+        self.timings['recycle'] = time.perf_counter() - start
+        logger.info("Browser session recycled in %.2fs (recycle #%s)", self.timings['recycle'], self.recycles)
+
+    def acquire(self) -> InstagramPoster:
+        """Return a healthy poster, launching or recycling the browser if needed"""
+        if self.poster is None:
+            self._start()
+        elif not self.is_healthy():
+            logger.warning("Browser session is dead, recycling...")
+            self.recycle()
+        return self.poster
+
+    def login(self, username: str, password: str) -> bool:
+        self._username = username
+        self._password = password
+        if self.poster is None or not self.is_healthy():
+            # A fresh browser logs in as part of starting up
+            self.acquire()
+            return self.logged_in
+        return self.logged_in or self._login()
+
+    def post_comment(self, post_url: str, comment_text: str) -> bool:
+        return self.acquire().post_comment(post_url, comment_text)
+
+    def _close_poster(self):
+        if self.poster is not None:
+            try:
+                self.poster.close()
+            except Exception as e:
+                logger.error("Error closing browser: %s", e)
+            self.poster = None
+            self.logged_in = False
+
+    def close(self):
+        """Close the browser"""
+        self._close_poster()
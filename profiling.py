@@ -0,0 +1,269 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Package name prefixes per summary group; HTTP clients count towards their caller
+MODULE_GROUPS = [
+    ('instaloader', ('instaloader', 'requests')),
+    ('openai', ('openai', 'httpx', 'httpcore', 'anyio')),
+    ('selenium', ('selenium', 'urllib3', 'webdriver_manager')),
+]
+GROUP_ORDER = ['instaloader', 'openai', 'selenium', 'ours', 'other']
+
+# Innermost frames of a thread that is parked rather than working: lock and
+# condition waits (joins, Event.wait, queue.get with a timeout), idle pool
+# workers, and servers waiting for a connection
+IDLE_FRAMES = {
+    'threading:wait', 'threading:_wait_for_tstate_lock', 'queue:get', 'thread:_worker',
+    'selectors:select', 'socketserver:serve_forever',
+}
+
+
+def classify(filename: str) -> str:
+    """Summary group of a source file: a library group, 'ours' or 'other'"""
+    normalized = filename.replace('\\', '/')
+    if 'site-packages/' in normalized or 'dist-packages/' in normalized:
+        package = normalized.rsplit('-packages/', 1)[1].split('/', 1)[0]
+        for group, prefixes in MODULE_GROUPS:
+            if package.startswith(prefixes):
+                return group
+        return 'other'
+    if os.path.abspath(filename).startswith(PROJECT_DIR + os.sep):
+        return 'ours'
+    return 'other'
+
+
+def _format_groups(totals: Dict[str, float], unit: str) -> str:
+    grand_total = sum(totals.values()) or 1
+    lines = [f"{'group':<12} {unit:>12} {'share':>7}"]
+    for group in GROUP_ORDER:
+        value = totals.get(group, 0)
+        lines.append(f"{group:<12} {value:>12.3f} {value / grand_total:>7.1%}")
+    return '\n'.join(lines)
+
+
+@contextmanager
+def _on_new_threads(callback: Callable[[], None]):
+    """Call ``callback`` first thing in every thread started inside the block"""
+    def hook(frame, event, arg):
+        sys.setprofile(None)
+        callback()
+
+    threading.setprofile(hook)
+    try:
+        yield
+    finally:
+        threading.setprofile(None)
+
+
+class WallClockSampler:
+    """Samples thread stacks at a fixed interval.
+
+    Unlike cProfile this sees time spent blocked (socket reads, waits on the
+    browser), which is where a bot cycle spends most of its wall time.
+    Stacks are kept in the collapsed "frame;frame;frame count" format.
+
+    Only the threads in ``thread_ids`` are sampled (all of them if None), and
+    stacks parked in an idle wait (see IDLE_FRAMES) are skipped, so threads
+    that merely exist, like the log listener or an idle pool worker, don't
+    add their whole lifetime to the totals.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _frame_label(self, frame) -> Tuple[str, str]:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        return f"{module}:{code.co_name}", code.co_filename
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            if self._frame_label(frame)[0] in IDLE_FRAMES:
+                self.idle_samples += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{';'.join(label for label, _ in stack)} {count}"
+                         for stack, count in self.stacks.most_common()) + '\n'
+
+    def group_totals(self) -> Dict[str, float]:
+        """Seconds per group, charged to the innermost frame outside 'other'"""
+        totals: Dict[str, float] = {}
+        for stack, count in self.stacks.items():
+            group = 'other'
+            for _, filename in reversed(stack):
+                group = classify(filename)
+                if group != 'other':
+                    break
+            totals[group] = totals.get(group, 0) + count * self.interval
+        return totals
+
+    def top_functions(self, count: int) -> List[Tuple[str, int, int]]:
+        """(function, self samples, inclusive samples), busiest first"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, samples in self.stacks.items():
+            own[stack[-1][0]] += samples
+            for label in {label for label, _ in stack}:
+                inclusive[label] += samples
+        return [(label, own[label], samples) for label, samples in inclusive.most_common(count)]
+
+    def report(self, top: int) -> str:
+        scope = 'all threads' if self.thread_ids is None else 'threads running the cycle'
+        lines = [f"Wall-clock samples: {self.samples} every {self.interval * 1000:.0f}ms "
+                 f"({scope}, so seconds can exceed elapsed time; "
+                 f"{self.idle_samples * self.interval:.2f}s of idle waits left out)", '',
+                 _format_groups(self.group_totals(), 'seconds'), '',
+                 f"{'self':>8} {'total':>8}  function"]
+        for label, own, inclusive in self.top_functions(top):
+            lines.append(f"{own * self.interval:>7.2f}s {inclusive * self.interval:>7.2f}s  {label}")
+        return '\n'.join(lines)
+
+
+class ThreadedProfile:
+    """cProfile for the calling thread and every thread it starts.
+
+    A cProfile.Profile only sees the thread that enabled it, and a bot cycle
+    does its scraping and comment generation on the pipeline and fetch pool
+    threads. Each thread started during ``runcall`` gets its own profiler and
+    ``stats`` merges them all.
+    """
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _enable(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def runcall(self, func: Callable[[], Any]) -> Any:
+        if sys.version_info >= (3, 12):
+            # cProfile runs on sys.monitoring there, which already sees every
+            # thread and allows only one active profiler
+            profile = self._enable()
+            try:
+                return func()
+            finally:
+                profile.disable()
+        with _on_new_threads(self._enable):
+            profile = self._enable()
+            try:
+                return func()
+            finally:
+                profile.disable()
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+def _cprofile_report(stats: pstats.Stats, top: int) -> str:
+    totals: Dict[str, float] = {}
+    for (filename, _, _), (_, _, own_time, _, _) in stats.stats.items():
+        group = classify(filename)
+        totals[group] = totals.get(group, 0) + own_time
+    output = io.StringIO()
+    stats.stream = output
+    stats.sort_stats('cumulative').print_stats(top)
+    return ("CPU time by module, all threads of the cycle (own time; built-ins such as "
+            "socket reads count as 'other')\n\n"
+            + _format_groups(totals, 'seconds') + '\n' + output.getvalue())
+
+
+def profile_call(func: Callable[[], Any], mode: str = 'sample', out_dir: Path = Path('profiles'),
+                 top: int = 20, interval: float = 0.005) -> Tuple[Any, Path, str]:
+    """Run ``func`` once under a profiler and write the results.
+
+    Args:
+        func: The work to profile, e.g. one bot cycle
+        mode: 'cprofile' (deterministic, CPU) or 'sample' (wall-clock); both
+            cover the calling thread and the threads ``func`` starts
+        out_dir: Where the .pstats / .collapsed file is written
+        top: Number of functions in the printed summary
+        interval: Sampling interval in seconds ('sample' mode)
+
+    Returns:
+        tuple: (func's return value, output file, summary text)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    started = time.perf_counter()
+
+    if mode == 'cprofile':
+        profiler = ThreadedProfile()
+        try:
+            result = profiler.runcall(func)
+        finally:
+            elapsed = time.perf_counter() - started
+            path = out_dir / f"cycle_{stamp}.pstats"
+            stats = profiler.stats()
+            stats.dump_stats(str(path))
+        report = _cprofile_report(stats, top)
+    elif mode == 'sample':
+        thread_ids = {threading.get_ident()}
+        sampler = WallClockSampler(interval, thread_ids)
+        sampler.start()
+        try:
+            with _on_new_threads(lambda: thread_ids.add(threading.get_ident())):
+                result = func()
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            path = out_dir / f"cycle_{stamp}.collapsed"
+            path.write_text(sampler.collapsed(), encoding='utf-8')
+        report = sampler.report(top)
+    else:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    summary = f"Profiled cycle took {elapsed:.2f}s wall time ({mode}), written to {path}\n\n{report}"
+    return result, path, summary
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by concurrent workers.
+
+    Tokens are refilled continuously at ``rate`` per second up to ``capacity``.
+    ``acquire`` blocks the calling thread only, so one slow consumer never
+    stalls the others beyond the shared budget.
+    """
+
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float = 1) -> 'TokenBucket':
+        return cls(rate=requests_per_minute / 60.0, capacity=burst)
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """Block until the requested tokens are available"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+    def penalize(self, seconds: float):
+        """Stop handing out tokens for a while, e.g. after a 429 response"""
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._last = self._paused_until
+
+
+class SlidingWindowLimiter:
+    """Limits events over several sliding windows using a log of their timestamps.
+
+    Each window is ``name -> (seconds, max_events)``; an event is allowed when
+    every window has room for it and, if a ``spacing`` function is given, at
+    least ``spacing(events_in_longest_window)`` seconds have passed since the
+    previous event. A window with a limit of 0 or less allows nothing.
+    Timestamps are dropped only once they are older than the longest window,
+    so changing a limit never forgets events that still count.
+
+    Timestamps are wall-clock (``time.time``) so the log survives restarts.
+    """
+
+    def __init__(self, windows: Dict[str, Tuple[float, int]],
+                 spacing: Optional[Callable[[int], float]] = None,
+                 events: Iterable[float] = (),
+                 clock: Callable[[], float] = time.time):
+        self.windows: Dict[str, Tuple[float, int]] = {}
+        self.spacing = spacing
+        self._clock = clock
+        self._events: Deque[float] = deque(sorted(events))
+        self._lock = threading.Lock()
+        for name, (seconds, max_events) in windows.items():
+            self.windows[name] = (float(seconds), int(max_events))
+
+    def _prune(self, now: float):
+        """Forget events that have slid out of every window"""
+        longest = max((seconds for seconds, _ in self.windows.values()), default=0)
+        while self._events and self._events[0] <= now - longest:
+            self._events.popleft()
+
+    def set_window(self, name: str, seconds: float, max_events: int):
+        """Add or change a window; a limit of 0 or less blocks every event"""
+        with self._lock:
+            self.windows[name] = (float(seconds), int(max_events))
+
+    def events(self) -> List[float]:
+        """The event log, oldest first, for persisting"""
+        with self._lock:
+            return list(self._events)
+
+    def _count(self, seconds: float, now: float) -> int:
+        return sum(1 for ts in self._events if now - seconds < ts <= now)
+
+    def count(self, name: str, now: Optional[float] = None) -> int:
+        """Events inside the named window"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            return self._count(self.windows[name][0], now)
+
+    def next_allowed(self, now: Optional[float] = None) -> Tuple[float, Optional[str]]:
+        """When the next event is allowed, and which limit is in the way.
+
+        Returns:
+            tuple: (timestamp, name of the blocking window or 'spacing', or None if allowed now)
+        """
+        now = self._clock() if now is None else now
+        allowed_at, reason = now, None
+        with self._lock:
+            events = list(self._events)
+            for name, (seconds, max_events) in self.windows.items():
+                if max_events <= 0:
+                    # Nothing is allowed; look again once a window's length has passed
+                    if now + seconds > allowed_at:
+                        allowed_at, reason = now + seconds, name
+                elif len(events) >= max_events:
+                    # The window has room again once its oldest counted event slides out
+                    oldest = events[-max_events]
+                    if oldest + seconds > allowed_at:
+                        allowed_at, reason = oldest + seconds, name
+            if self.spacing and events:
+                longest = max((seconds for seconds, _ in self.windows.values()), default=0)
+                gap_until = events[-1] + self.spacing(self._count(longest, now))
+                if gap_until > allowed_at:
+                    allowed_at, reason = gap_until, 'spacing'
+        return allowed_at, reason
+
+    def next_allowed_at(self, now: Optional[float] = None) -> float:
+        return self.next_allowed(now)[0]
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        now = self._clock() if now is None else now
+        return self.next_allowed_at(now) <= now
+
+    def record(self, timestamp: Optional[float] = None):
+        timestamp = self._clock() if timestamp is None else timestamp
+        with self._lock:
+            self._events.append(timestamp)
+            self._prune(timestamp)
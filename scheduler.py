@@ -1,146 +1,320 @@
 import time
-import schedule
+import heapq
+import itertools
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
 from pathlib import Path
-import json
 import random
 import os
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+from metrics import REGISTRY
+from rate_limiter import SlidingWindowLimiter
+from stats_store import StatsStore
+
 logger = logging.getLogger(__name__)
 
+RATE_CHECKS = REGISTRY.counter(
+    'scheduler_rate_checks_total', 'can_post_comment results; blocked ones by limit', ['result'])
+COMMENTS_RECORDED = REGISTRY.counter('scheduler_comments_recorded_total', 'Comments recorded as posted')
+
+BASE_COMMENT_DELAY_MINUTES = 30
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def comment_delay_seconds(comments_in_window: int, max_per_day: int) -> float:
+    """Required gap after a comment; grows as we approach the daily limit"""
+    scaling_factor = 1 + (comments_in_window / max(max_per_day, 1)) * 2
+    return BASE_COMMENT_DELAY_MINUTES * 60 * scaling_factor
+
+
+def _format_time(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp is not None else None
+
+
+class ScheduledJob:
+    """A job in the scheduler heap; ``interval`` is None for one-shot jobs"""
+    
+    def __init__(self, func: Callable, args: tuple, kwargs: dict,
+                 interval: Optional[float] = None, jitter: float = 0.0):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run: Optional[float] = None
+        self.cancelled = False
+    
+    def next_delay(self) -> float:
+        """Interval until the next run, spread by +/- ``jitter`` (a fraction)"""
+        if not self.jitter:
+            return self.interval
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    def __repr__(self):
+        return f"ScheduledJob({getattr(self.func, '__name__', self.func)!r}, interval={self.interval})"
+
+
 class BotScheduler:
-    def __init__(self):
+    def __init__(self, max_comments_per_day: Optional[int] = None,
+                 clock: Callable[[], float] = time.time):
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
         self.stats_file = self.data_dir / "bot_stats.json"
-        self.stats = self._load_stats()
-    
-    def _load_stats(self) -> dict:
-        """Load bot statistics from file"""
-        if self.stats_file.exists():
-            try:
-                with open(self.stats_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                pass
-        return {
+        
+        # Jobs wait in a heap of (next_run, seq, job); the loop sleeps on the
+        # condition until the earliest one is due or someone calls wake()/stop()
+        self._clock = clock
+        self._jobs: List[Tuple[float, int, ScheduledJob]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._running = False
+        self._last_run: Optional[float] = None
+        self.default_jitter = float(os.getenv('SCHEDULE_JITTER', 0))
+        
+        self.store = StatsStore.from_env(self.stats_file, {
             'comments_posted': 0,
             'last_comment_time': None,
             'comments_today': 0,
-            'last_reset_date': datetime.now().strftime('%Y-%m-%d')
-        }
+            'last_reset_date': datetime.now().strftime('%Y-%m-%d'),
+            'comment_events': []
+        })
+        
+        # Rolling 24h (and optional hourly) limits over a persisted log of comment times
+        if max_comments_per_day is None:
+            max_comments_per_day = int(os.getenv('MAX_COMMENTS_PER_DAY', 5))
+        self.max_comments_per_day = max_comments_per_day
+        self.rate_limiter = SlidingWindowLimiter(
+            {'day': (DAY, self.max_comments_per_day)},
+            spacing=lambda count: comment_delay_seconds(count, self.max_comments_per_day),
+            events=self._load_comment_events()
+        )
+        # MAX_COMMENTS_PER_HOUR=0 (the default) means no hourly limit; a daily
+        # limit of 0 blocks all comments
+        max_per_hour = int(os.getenv('MAX_COMMENTS_PER_HOUR', 0))
+        if max_per_hour > 0:
+            self.rate_limiter.set_window('hour', HOUR, max_per_hour)
+    
+    def _load_comment_events(self) -> list:
+        """Comment timestamps from the stats, seeded from the old daily counters once"""
+        events = self.store.get('comment_events') or []
+        if events:
+            return events
+        last_time = self.store.get('last_comment_time')
+        if last_time and self.store.get('last_reset_date') == datetime.now().strftime('%Y-%m-%d'):
+            # Only the latest time is known; counting today's comments at that
+            # time errs on the safe side
+            return [datetime.fromisoformat(last_time).timestamp()] * self.store.get('comments_today', 0)
+        return []
+    
+    @property
+    def stats(self) -> dict:
+        """Current statistics (a copy, served from memory)"""
+        return self.store.snapshot()
+    
+    def get_stats(self) -> dict:
+        """Read API for the dashboard; doesn't touch the stats file"""
+        return self.store.snapshot()
+    
+    def get_status(self) -> dict:
+        """The stats plus the fields the dashboard shows: status, last_run and next_run"""
+        status = self.get_stats()
+        next_run = self.idle_seconds()
+        with self._cond:
+            running, last_run = self._running, self._last_run
+        status.update(
+            status='running' if running else 'stopped',
+            last_run=_format_time(last_run),
+            next_run=_format_time(None if next_run is None else self._clock() + next_run)
+        )
+        return status
     
     def _save_stats(self):
-        """Save bot statistics to file"""
-        with open(self.stats_file, 'w') as f:
-            json.dump(self.stats, f, indent=2)
-    
-    def _reset_daily_counters(self):
-        """Reset daily counters if it's a new day"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        if self.stats.get('last_reset_date') != today:
-            self.stats['comments_today'] = 0
-            self.stats['last_reset_date'] = today
-            self._save_stats()
+        """Write pending statistics to disk immediately"""
+        self.store.flush()
+    
+    def _set_daily_limit(self, max_per_day: int):
+        if max_per_day != self.max_comments_per_day:
+            self.max_comments_per_day = max_per_day
+            self.rate_limiter.set_window('day', DAY, max_per_day)
+    
+    def next_allowed_at(self, max_per_day: Optional[int] = None) -> datetime:
+        """Earliest time the next comment is allowed (now or in the past if allowed)"""
+        if max_per_day is not None:
+            self._set_daily_limit(max_per_day)
+        return datetime.fromtimestamp(self.rate_limiter.next_allowed_at())
     
     def can_post_comment(self, max_per_day: int) -> bool:
         """Check if we can post another comment based on rate limits"""
-        self._reset_daily_counters()
+        self._set_daily_limit(max_per_day)
+        now = time.time()
+        comments_today = self.rate_limiter.count('day', now)
+        if self.store.get('comments_today') != comments_today:
+            # Old comments slid out of the 24h window
+            self.store.update(comments_today=comments_today)
+        allowed_at, reason = self.rate_limiter.next_allowed(now)
         
-        # Get current stats
-        comments_today = self.stats.get('comments_today', 0)
-        last_time = self.stats.get('last_comment_time')
-        
-        # Check daily limit
-        if comments_today >= max_per_day:
-            logger.warning(f"Daily comment limit reached: {comments_today}/{max_per_day} comments used")
-            next_reset = (datetime.now().replace(hour=0, minute=0, second=0) + timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
-            logger.info(f"Next reset at: {next_reset}")
-            return False
-            
-        # Check time since last comment
-        if last_time:
-            last_time = datetime.fromisoformat(last_time)
-            time_since_last = (datetime.now() - last_time).total_seconds() / 60  # in minutes
-            
-            # Calculate required delay (longer delays as we approach daily limit)
-            base_delay = 30  # minutes
-            scaling_factor = 1 + (comments_today / max_per_day) * 2  # Increases delay as we approach limit
-            required_delay = base_delay * scaling_factor
-            
-            if time_since_last < required_delay:
-                remaining = (required_delay - time_since_last)
-                logger.warning(f"⏳ Rate limited: {time_since_last:.1f} minutes since last comment")
-                logger.info(f"Waiting {remaining:.1f} more minutes (required: {required_delay:.1f} min)")
-                return False
+        RATE_CHECKS.inc(result=reason or 'allowed')
+        if reason is None:
+            logger.info("Can post comment (%s/%s used in the last 24h)", comments_today, max_per_day)
+            return True
         
-        logger.info(f"Can post comment ({comments_today}/{max_per_day} used today)")
-        return True
+        next_slot = datetime.fromtimestamp(allowed_at).strftime('%Y-%m-%d %H:%M')
+        remaining = (allowed_at - now) / 60
+        if reason == 'day':
+            logger.warning("Daily comment limit reached: %s/%s comments in the last 24h", comments_today, max_per_day)
+        elif reason == 'hour':
+            logger.warning("Hourly comment limit reached: %s comments in the last hour", self.rate_limiter.count('hour', now))
+        else:
+            last_time = self.rate_limiter.events()[-1]
+            logger.warning("⏳ Rate limited: %.1f minutes since last comment", (now - last_time) / 60)
+        logger.info("Next allowed comment at %s (in %.1f min)", next_slot, remaining)
+        return False
     
     def record_comment_posted(self):
         """Update stats after posting a comment"""
         now = datetime.now()
+        self.rate_limiter.record(now.timestamp())
+        COMMENTS_RECORDED.inc()
+        comments_today = self.rate_limiter.count('day', now.timestamp())
         
-        # Update stats
-        self.stats['comments_posted'] = self.stats.get('comments_posted', 0) + 1
-        self.stats['comments_today'] = self.stats.get('comments_today', 0) + 1
-        self.stats['last_comment_time'] = now.isoformat()
-        
-        # Calculate time until next allowed comment
-        comments_today = self.stats['comments_today']
-        max_per_day = int(os.getenv('MAX_COMMENTS_PER_DAY', 5))
-        
-        # Save stats
-        self._save_stats()
+        # Update stats (written to disk in the background)
+        self.store.update(
+            comments_posted=self.store.get('comments_posted', 0) + 1,
+            comments_today=comments_today,
+            last_comment_time=now.isoformat(),
+            last_reset_date=now.strftime('%Y-%m-%d'),
+            comment_events=self.rate_limiter.events()
+        )
+        stats = self.stats
+        max_per_day = self.max_comments_per_day
         
         logger.info("\n" + "Comment Statistics " + "="*30)
-        logger.info(f"Comment posted successfully")
-        logger.info(f"Today's comments: {comments_today}/{max_per_day}")
-        logger.info(f"Total comments: {self.stats['comments_posted']}")
-        logger.info(f"Last comment at: {now.strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("Comment posted successfully")
+        logger.info("Comments in the last 24h: %s/%s", comments_today, max_per_day)
+        logger.info("Total comments: %s", stats['comments_posted'])
+        logger.info("Last comment at: %s", now.strftime('%Y-%m-%d %H:%M:%S'))
         
-        # Calculate next available time
-        if comments_today >= max_per_day:
-            next_available = (now.replace(hour=0, minute=0, second=0) + timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
-            logger.info(f"⏳ Next available comment: {next_available} (daily limit reached)")
+        # Same computation can_post_comment uses
+        allowed_at, reason = self.rate_limiter.next_allowed(now.timestamp())
+        next_available = datetime.fromtimestamp(allowed_at)
+        minutes = (allowed_at - now.timestamp()) / 60
+        if reason in ('day', 'hour'):
+            logger.info("⏳ Next available comment: %s (%s limit reached)", next_available.strftime('%Y-%m-%d %H:%M'), reason)
         else:
-            # Calculate delay based on number of comments already made today
-            base_delay = 30  # minutes
-            scaling_factor = 1 + (comments_today / max_per_day) * 2
-            next_available = now + timedelta(minutes=base_delay * scaling_factor)
-            logger.info(f"Next available comment: {next_available.strftime('%Y-%m-%d %H:%M')} (in ~{base_delay * scaling_factor:.0f} min)")
+            logger.info("Next available comment: %s (in ~%.0f min)", next_available.strftime('%Y-%m-%d %H:%M'), minutes)
             
         logger.info("="*50 + "\n")
     
-    def schedule_job(self, job_func, interval_hours: int, *args, **kwargs):
-        """Schedule a job to run at the given interval"""
-        schedule.every(interval_hours).hours.do(job_func, *args, **kwargs)
-        logger.info(f"Scheduled job to run every {interval_hours} hours")
+    def _push(self, job: ScheduledJob, when: float):
+        job.next_run = when
+        with self._cond:
+            heapq.heappush(self._jobs, (when, next(self._seq), job))
+            self._cond.notify_all()
     
-    def run_pending(self):
-        """Run pending scheduled jobs"""
-        schedule.run_pending()
+    def schedule_job(self, job_func, interval_hours: float, *args,
+                     jitter: Optional[float] = None, **kwargs) -> ScheduledJob:
+        """Schedule a job to run at the given interval.
+        
+        Args:
+            job_func: Callable to run
+            interval_hours: Hours between runs
+            jitter: Spread each interval by up to this fraction (defaults to $SCHEDULE_JITTER)
+        """
+        job = ScheduledJob(job_func, args, kwargs, interval=interval_hours * 3600,
+                           jitter=self.default_jitter if jitter is None else jitter)
+        self._push(job, self._clock() + job.next_delay())
+        logger.info("Scheduled job to run every %s hours", interval_hours)
+        return job
+    
+    def run_at(self, job_func, when: datetime, *args, **kwargs) -> ScheduledJob:
+        """Run a job once at the given time"""
+        job = ScheduledJob(job_func, args, kwargs)
+        self._push(job, when.timestamp())
+        logger.info("Scheduled one-off run at %s", when.strftime('%Y-%m-%d %H:%M:%S'))
+        return job
+    
+    def cancel(self, job: ScheduledJob):
+        """Drop a job; it is discarded lazily when it reaches the top of the heap"""
+        with self._cond:
+            job.cancelled = True
+            self._cond.notify_all()
+    
+    def idle_seconds(self) -> Optional[float]:
+        """Seconds until the earliest job is due (<= 0 if overdue), None if no jobs"""
+        with self._cond:
+            while self._jobs and self._jobs[0][2].cancelled:
+                heapq.heappop(self._jobs)
+            if not self._jobs:
+                return None
+            return self._jobs[0][0] - self._clock()
+    
+    def run_pending(self) -> int:
+        """Run every job that is due; returns how many ran"""
+        ran = 0
+        while True:
+            with self._cond:
+                if self._stopped or not self._jobs or self._jobs[0][0] > self._clock():
+                    return ran
+                _, _, job = heapq.heappop(self._jobs)
+            if job.cancelled:
+                continue
+            with self._cond:
+                self._last_run = self._clock()
+            try:
+                job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                logger.error("Scheduled job %r failed: %s", job, e, exc_info=True)
+            ran += 1
+            # Like the old schedule-based loop, the next interval counts from when the job finished
+            if job.interval is not None and not job.cancelled:
+                self._push(job, self._clock() + job.next_delay())
+    
+    def wake(self):
+        """Make the loop re-evaluate its jobs now, e.g. after a config change"""
+        with self._cond:
+            self._cond.notify_all()
+    
+    def stop(self):
+        """Make run_continuously return"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
     
-    def run_continuously(self, interval=1):
-        """Run the scheduler continuously"""
+    def close(self):
+        """Flush pending statistics"""
+        self.store.close()
+    
+    def run_continuously(self, max_sleep: Optional[float] = None):
+        """Run jobs as they come due, sleeping in between until stop() is called.
+        
+        Args:
+            max_sleep: Upper bound on a single sleep in seconds (None: sleep until the next job)
+        """
         logger.info("Starting scheduler...")
+        with self._cond:
+            self._running = True
         try:
             while True:
+                with self._cond:
+                    if self._stopped:
+                        break
+                    wait = self.idle_seconds()
+                    if wait is None or wait > 0:
+                        if max_sleep is not None:
+                            wait = max_sleep if wait is None else min(wait, max_sleep)
+                        self._cond.wait(timeout=wait)
+                        continue
                 self.run_pending()
-                time.sleep(interval)
+            logger.info("Scheduler stopped")
         except KeyboardInterrupt:
             logger.info("Scheduler stopped by user")
         except Exception as e:
-            logger.error(f"Error in scheduler: {e}")
+            logger.error("Error in scheduler: %s", e)
             raise
+        finally:
+            with self._cond:
+                self._running = False
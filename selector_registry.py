@@ -0,0 +1,119 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from selenium.webdriver.common.by import By
+
+Locator = Tuple[str, str]
+
+# Evaluates every candidate in the page and returns [index, element] for the
+# first visible (and, if requested, enabled) match, or null
+_RESOLVE_SCRIPT = """
+const candidates = arguments[0];
+const requireEnabled = arguments[1];
+function usable(el) {
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 && rect.height === 0) return false;
+    if (getComputedStyle(el).visibility === "hidden") return false;
+    if (requireEnabled && (el.disabled || el.getAttribute("aria-disabled") === "true")) return false;
+    return true;
+}
+for (let i = 0; i < candidates.length; i++) {
+    const kind = candidates[i][0];
+    const selector = candidates[i][1];
+    let nodes = [];
+    try {
+        if (kind === "xpath") {
+            const result = document.evaluate(selector, document, null,
+                                             XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let j = 0; j < result.snapshotLength; j++) nodes.push(result.snapshotItem(j));
+        } else {
+            nodes = Array.from(document.querySelectorAll(selector));
+        }
+    } catch (e) {
+        continue;
+    }
+    for (const el of nodes) {
+        if (usable(el)) return [i, el];
+    }
+}
+return null;
+"""
+
+
+def _key(locator: Locator) -> str:
+    return f"{locator[0]}={locator[1]}"
+
+
+class SelectorRegistry:
+    """Remembers which locator last worked for each page element.
+
+    Candidates for a role are tried in learned order: a locator that matches
+    moves to the front, locators tried ahead of it that didn't match are
+    demoted. All candidates are evaluated in the browser by a single
+    ``execute_script`` call, and the learned order is persisted as JSON so it
+    survives restarts.
+    """
+
+    def __init__(self, path: Path, candidates: Dict[str, List[Locator]]):
+        self.path = Path(path)
+        self.candidates = {role: list(locators) for role, locators in candidates.items()}
+        self.scores: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.scores = {role: dict(scores) for role, scores in data.items() if isinstance(scores, dict)}
+        except (FileNotFoundError, json.JSONDecodeError, TypeError, ValueError):
+            self.scores = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.scores, f, indent=2)
+
+    def ordered(self, role: str) -> List[Locator]:
+        """Candidates for ``role``, best first (ties keep the declared order)"""
+        scores = self.scores.get(role, {})
+        locators = self.candidates[role]
+        return sorted(locators, key=lambda loc: (-scores.get(_key(loc), 0), locators.index(loc)))
+
+    def record(self, role: str, ordered: List[Locator], winner: int):
+        """Promote the winning locator and demote the ones tried before it"""
+        with self._lock:
+            scores = self.scores.setdefault(role, {})
+            before = self.ordered(role)
+            best = max(scores.values(), default=0)
+            scores[_key(ordered[winner])] = max(best + 1, scores.get(_key(ordered[winner]), 0))
+            for loser in ordered[:winner]:
+                scores[_key(loser)] = scores.get(_key(loser), 0) - 1
+            if self.ordered(role) != before:
+                self.save()
+
+    def resolve(self, driver, role: str, require_enabled: bool = True):
+        """Find the first usable element for ``role`` in one round-trip.
+
+        Returns:
+            The WebElement, or None if no candidate matched
+        """
+        ordered = self.ordered(role)
+        args = [['xpath' if by == By.XPATH else 'css', selector] for by, selector in ordered]
+        result = driver.execute_script(_RESOLVE_SCRIPT, args, require_enabled)
+        if not result:
+            return None
+        index, element = result
+        index = int(index)
+        if index > 0 or _key(ordered[0]) not in self.scores.get(role, {}):
+            self.record(role, ordered, index)
+        return element
+
+    def condition(self, role: str, require_enabled: bool = True):
+        """WebDriverWait condition resolving ``role`` (falsy until found)"""
+        def condition(driver):
+            return self.resolve(driver, role, require_enabled) or False
+        return condition
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COOKIE_DOMAIN = '.instagram.com'
+
+# Where the cookie file is looked for: data/ first, then the project root
+COOKIE_PATHS = [Path("data/instagram_cookies.json"), Path("instagram_cookies.json")]
+
+Listener = Callable[[List[dict]], None]
+
+
+def cookies_to_dict(cookies: List[dict]) -> Dict[str, str]:
+    """Selenium-style cookie list -> {name: value} as used by instaloader sessions"""
+    return {cookie['name']: cookie['value'] for cookie in cookies if 'name' in cookie}
+
+
+def cookies_from_dict(values: Dict[str, str], known: Optional[List[dict]] = None) -> List[dict]:
+    """{name: value} -> Selenium-style cookie list.
+
+    Attributes (domain, path, expiry, flags) of cookies already in ``known``
+    are kept, so a round-trip through a requests session doesn't lose them.
+    """
+    by_name = {cookie['name']: cookie for cookie in (known or []) if 'name' in cookie}
+    cookies = []
+    for name, value in values.items():
+        cookie = dict(by_name.get(name, {'domain': COOKIE_DOMAIN, 'path': '/', 'secure': True}))
+        cookie['name'] = name
+        cookie['value'] = value
+        cookies.append(cookie)
+    return cookies
+
+
+class SessionBroker:
+    """One Instagram session shared by the instaloader scraper and the Selenium poster.
+
+    The cookies are kept in Selenium's ``get_cookies()`` format and persisted
+    to a single JSON file (the poster's existing cookie file). Whichever side
+    authenticates publishes its cookies here; every other subscriber is then
+    notified so it can pick up the new session instead of logging in again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._cookies: List[dict] = []
+        self._listeners: List[Listener] = []
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def default(cls) -> 'SessionBroker':
+        """Broker on the existing cookie file, or a new one in data/"""
+        for path in COOKIE_PATHS:
+            if path.exists():
+                return cls(path)
+        return cls(COOKIE_PATHS[0])
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                cookies = json.load(f)
+            if isinstance(cookies, list):
+                self._cookies = [c for c in cookies if isinstance(c, dict) and 'name' in c]
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._cookies = []
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cookies, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def cookies(self) -> List[dict]:
+        with self._lock:
+            return [dict(cookie) for cookie in self._cookies]
+
+    def has_session(self) -> bool:
+        """True if a logged-in session cookie is available"""
+        with self._lock:
+            return any(cookie.get('name') == 'sessionid' and cookie.get('value') for cookie in self._cookies)
+
+    def subscribe(self, listener: Listener):
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, cookies: List[dict], source: Optional[Listener] = None) -> bool:
+        """Store a freshly authenticated session and notify the other side.
+
+        Args:
+            cookies: Selenium-style cookie dicts
+            source: The publisher's own listener, which is not notified
+
+        Returns:
+            bool: True if the session changed
+        """
+        with self._lock:
+            if cookies_to_dict(cookies) == cookies_to_dict(self._cookies):
+                return False
+            self._cookies = [dict(cookie) for cookie in cookies]
+            self._save()
+            listeners = [listener for listener in self._listeners if listener != source]
+            snapshot = self.cookies()
+
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error("Error refreshing shared session: %s", e)
+        return True
+
+    # instaloader side
+
+    def publish_from_instaloader(self, loader, source: Optional[Listener] = None) -> bool:
+        """Publish the cookies of an instaloader.Instaloader session"""
+        values = loader.save_session()
+        with self._lock:
+            cookies = cookies_from_dict(values, self._cookies)
+        return self.publish(cookies, source)
+
+    def apply_to_instaloader(self, loader, username: str) -> bool:
+        """Load the shared session into an instaloader.Instaloader instance"""
+        values = cookies_to_dict(self.cookies())
+        if not values.get('sessionid') or 'csrftoken' not in values:
+            return False
+        loader.load_session(username, values)
+        return True
+
+    # Selenium side
+
+    def apply_to_driver(self, driver) -> int:
+        """Add the shared cookies to a driver that is on an instagram.com page.
+
+        Returns:
+            int: Number of cookies the browser accepted
+        """
+        added = 0
+        for cookie in self.cookies():
+            # Selenium rejects sameSite values it doesn't know, and cookies whose
+            # domain doesn't match the current page
+            cookie.pop('sameSite', None)
+            if cookie.get('domain', '').startswith('.instagram.'):
+                cookie['domain'] = 'instagram.com'
+            try:
+                driver.add_cookie(cookie)
+                added += 1
+            except Exception:
+                pass
+        return added
+
+    def publish_from_driver(self, driver, source: Optional[Listener] = None) -> bool:
+        """Publish the cookies of a Selenium driver"""
+        return self.publish(driver.get_cookies(), source)
@@ -0,0 +1,258 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """SQLite-backed store for the scraper's persistent state.
+
+    Processed posts live in a table keyed by shortcode, so marking or looking
+    up a post is an indexed O(1) operation instead of a rewrite of the whole
+    history. The database runs in WAL mode and is safe to share between
+    threads.
+    """
+
+    def __init__(self, db_path: Path, legacy_json: Optional[Path] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if legacy_json is not None:
+            self.migrate_from_json(Path(legacy_json))
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS processed_posts (
+                    shortcode TEXT PRIMARY KEY,
+                    account TEXT,
+                    processed_at TEXT NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS account_state (
+                    account TEXT PRIMARY KEY,
+                    hwm_shortcode TEXT,
+                    hwm_posted_at TEXT,
+                    updated_at TEXT NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS profile_cache (
+                    username TEXT PRIMARY KEY,
+                    userid INTEGER NOT NULL,
+                    full_name TEXT,
+                    followers INTEGER,
+                    fetched_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_profile_cache_last_used ON profile_cache (last_used);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                ) WITHOUT ROWID;
+            """)
+            self._conn.commit()
+
+    def _commit(self):
+        """Commit unless we are inside a batch() block"""
+        if self._batch_depth == 0:
+            self._conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """Group several writes into a single transaction/commit"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.rollback()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.commit()
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """Import the legacy last_checked.json file once.
+
+        The file is renamed to ``*.migrated`` afterwards so the import never
+        runs again.
+
+        Returns:
+            int: Number of processed posts imported
+        """
+        if not json_path.exists():
+            return 0
+
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning("Could not read legacy state file %s: %s", json_path, e)
+            return 0
+
+        shortcodes = data.get('processed_posts', []) if isinstance(data, dict) else []
+        with self.batch():
+            imported = self.mark_processed_many(shortcodes)
+            if isinstance(data, dict) and data.get('last_shortcode'):
+                self.set_meta('last_shortcode', data['last_shortcode'])
+                self.set_meta('last_checked', data.get('last_checked') or datetime.now().isoformat())
+
+        json_path.replace(json_path.with_name(json_path.name + '.migrated'))
+        logger.info("Migrated %s processed posts from %s to %s", imported, json_path, self.db_path)
+        return imported
+
+    def is_processed(self, shortcode: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed_posts WHERE shortcode = ?", (shortcode,)
+            ).fetchone()
+        return row is not None
+
+    def __contains__(self, shortcode: str) -> bool:
+        return self.is_processed(shortcode)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed_posts").fetchone()[0]
+
+    def mark_processed(self, shortcode: str, account: Optional[str] = None) -> bool:
+        """Mark a post as processed.
+
+        Outside a batch() block this commits right away: the mark is what stops
+        us commenting on the same post twice, so it has to be durable before
+        the next comment goes out. Posts are marked one at a time, minutes
+        apart, so the per-insert commit costs nothing measurable.
+
+        Returns:
+            bool: True if the post was newly inserted, False if it was already known
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO processed_posts (shortcode, account, processed_at) VALUES (?, ?, ?)",
+                (shortcode, account, datetime.now().isoformat())
+            )
+            self._commit()
+        return cursor.rowcount > 0
+
+    def mark_processed_many(self, shortcodes: Iterable[str], account: Optional[str] = None) -> int:
+        """Mark several posts as processed in a single transaction"""
+        now = datetime.now().isoformat()
+        rows = [(shortcode, account, now) for shortcode in shortcodes if shortcode]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_posts (shortcode, account, processed_at) VALUES (?, ?, ?)",
+                rows
+            )
+            inserted = self._conn.total_changes - before
+            self._commit()
+        return inserted
+
+    def get_high_water_mark(self, account: str) -> Optional[dict]:
+        """Return the newest fully-settled post for an account, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hwm_shortcode, hwm_posted_at FROM account_state WHERE account = ?",
+                (account,)
+            ).fetchone()
+        if not row or not row[0]:
+            return None
+        return {
+            'shortcode': row[0],
+            'posted_at': datetime.fromisoformat(row[1]) if row[1] else None
+        }
+
+    def set_high_water_mark(self, account: str, shortcode: str, posted_at: datetime):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO account_state (account, hwm_shortcode, hwm_posted_at, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET hwm_shortcode = excluded.hwm_shortcode, "
+                "hwm_posted_at = excluded.hwm_posted_at, updated_at = excluded.updated_at",
+                (account, shortcode, posted_at.isoformat(), datetime.now().isoformat())
+            )
+            self._commit()
+
+    def get_cached_profile(self, username: str, ttl_seconds: float) -> Optional[dict]:
+        """Return cached profile metadata if it is younger than ``ttl_seconds``.
+
+        Read only; call touch_profile() to record the use for LRU eviction.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT userid, full_name, followers, fetched_at FROM profile_cache WHERE username = ?",
+                (username,)
+            ).fetchone()
+        if not row or time.time() - row[3] > ttl_seconds:
+            return None
+        return {'username': username, 'userid': row[0], 'full_name': row[1],
+                'followers': row[2], 'fetched_at': row[3]}
+
+    def touch_profile(self, username: str):
+        """Mark a cached profile as recently used"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE profile_cache SET last_used = ? WHERE username = ?", (time.time(), username)
+            )
+            self._commit()
+
+    def cache_profile(self, username: str, userid: int, full_name: Optional[str] = None,
+                      followers: Optional[int] = None, max_entries: int = 500):
+        """Store profile metadata, evicting the least recently used entries beyond ``max_entries``"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO profile_cache (username, userid, full_name, followers, fetched_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET userid = excluded.userid, full_name = excluded.full_name, "
+                "followers = excluded.followers, fetched_at = excluded.fetched_at, last_used = excluded.last_used",
+                (username, userid, full_name, followers, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM profile_cache WHERE username IN ("
+                "SELECT username FROM profile_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            )
+            self._commit()
+
+    def invalidate_profile(self, username: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM profile_cache WHERE username = ?", (username,))
+            self._commit()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+            self._commit()
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,125 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('never', 'always')
+
+
+class StatsStore:
+    """Bot statistics kept in memory and persisted to JSON in the background.
+
+    Updates only touch the in-memory dict and arm a debounce timer, so a burst
+    of changes costs a single write. The file is written to a temp file and
+    swapped in with ``os.replace``, so readers (and a crash) only ever see a
+    complete file. Pending changes are flushed on ``close`` and at exit.
+
+    With ``fsync='always'`` the temp file and its directory are fsynced before
+    and after the swap; ``'never'`` leaves it to the OS.
+    """
+
+    def __init__(self, path: Path, defaults: Optional[dict] = None,
+                 debounce_seconds: float = 5.0, fsync: str = 'never'):
+        self.path = Path(path)
+        self.debounce_seconds = debounce_seconds
+        self.fsync = fsync if fsync in FSYNC_POLICIES else 'never'
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._data = copy.deepcopy(defaults or {})
+        self._data.update(self._load())
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls, path: Path, defaults: Optional[dict] = None) -> 'StatsStore':
+        return cls(
+            path,
+            defaults,
+            debounce_seconds=float(os.getenv('STATS_DEBOUNCE_SECONDS', 5)),
+            fsync=os.getenv('STATS_FSYNC', 'never').lower(),
+        )
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return copy.deepcopy(self._data.get(key, default))
+
+    def snapshot(self) -> dict:
+        """A copy of the current stats; never reads the file"""
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def update(self, changes: Optional[dict] = None, **kwargs):
+        """Apply changes in memory and schedule a write"""
+        with self._lock:
+            self._data.update(changes or {}, **kwargs)
+            self._dirty = True
+            if self.debounce_seconds > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.debounce_seconds, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Write pending changes now"""
+        # The write lock keeps concurrent flushes (timer vs. shutdown) in order
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                payload = json.dumps(self._data, indent=2)
+                self._dirty = False
+            try:
+                self._write(payload)
+            except OSError as e:
+                logger.error("Error saving stats to %s: %s", self.path, e)
+                with self._lock:
+                    self._dirty = True
+
+    def _write(self, payload: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(payload)
+                if self.fsync == 'always':
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self.fsync == 'always' and os.name != 'nt':
+            # Make the rename itself durable
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
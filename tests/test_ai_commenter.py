@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ai_commenter import FALLBACK_COMMENT, AICommenter, BaseAICommenter
+from comment_cache import CommentCache
+
+CAPTIONS = ['Leg day: squats and lunges', 'Meal prep Sunday', 'New deadlift PR']
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; answers from a list of replies"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+                               usage=SimpleNamespace(total_tokens=30))
+
+
+def batch_reply(*items) -> str:
+    return json.dumps({'comments': [{'id': idx, 'comment': comment} for idx, comment in items]})
+
+
+@pytest.fixture
+def make_commenter(tmp_path):
+    caches = []
+
+    def make(replies, cache: bool = False, batch_size: int = 5):
+        comment_cache = None
+        if cache:
+            comment_cache = CommentCache(tmp_path / f'cache{len(caches)}.db')
+            caches.append(comment_cache)
+        commenter = AICommenter(api_key='test', batch_size=batch_size, cache=comment_cache)
+        commenter.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(replies)))
+        return commenter
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def requests_made(commenter):
+    return commenter.client.chat.completions.requests
+
+
+def test_one_request_for_the_whole_batch(make_commenter):
+    commenter = make_commenter([batch_reply((0, 'Strong legs!'), (1, '"Looks tasty"'), (2, 'Huge PR!'))])
+    assert commenter.generate_comments(CAPTIONS) == ['Strong legs!', 'Looks tasty', 'Huge PR!']
+    assert len(requests_made(commenter)) == 1
+    assert requests_made(commenter)[0]['response_format'] == {'type': 'json_object'}
+
+
+def test_unparseable_json_falls_back_to_single_requests(make_commenter):
+    commenter = make_commenter(['Sure! Here are your comments:', 'One', 'Two', 'Three'])
+    assert commenter.generate_comments(CAPTIONS) == ['One', 'Two', 'Three']
+    assert len(requests_made(commenter)) == 4
+
+
+@pytest.mark.parametrize('reply', [
+    json.dumps({'comments': [{'comment': 'no id'}, {'id': 'first', 'comment': 'bad id'},
+                             {'id': 1, 'comment': 'Looks tasty'}, {'id': 7, 'comment': 'out of range'}]}),
+    json.dumps([{'id': '1', 'comment': 'Looks tasty'}, 'not an object', {'id': 2, 'comment': '   '}]),
+])
+def test_partial_batches_fill_the_gaps_one_by_one(make_commenter, reply):
+    commenter = make_commenter([reply, 'One', 'Three'])
+    assert commenter.generate_comments(CAPTIONS) == ['One', 'Looks tasty', 'Three']
+    # The batch, then one request per missing caption
+    singles = [request['messages'][-1]['content'] for request in requests_made(commenter)[1:]]
+    assert len(singles) == 2
+    assert CAPTIONS[0] in singles[0] and CAPTIONS[2] in singles[1]
+
+
+def test_failed_batch_request_falls_back(make_commenter):
+    commenter = make_commenter([RuntimeError('boom'), 'One', 'Two', RuntimeError('boom')])
+    assert commenter.generate_comments(CAPTIONS) == ['One', 'Two', FALLBACK_COMMENT]
+
+
+def test_cache_hits_skip_the_request(make_commenter):
+    commenter = make_commenter([batch_reply((0, 'Strong legs!'), (1, 'Looks tasty'), (2, 'Huge PR!')),
+                                'Another comment'], cache=True)
+    commenter.generate_comments(CAPTIONS)
+
+    # Everything cached: no request at all
+    assert commenter.generate_comments(CAPTIONS) == ['Strong legs!', 'Looks tasty', 'Huge PR!']
+    assert len(requests_made(commenter)) == 1
+
+    # Only the uncached caption is sent, on its own
+    assert commenter.generate_comments(CAPTIONS[:2] + ['Rest day']) == ['Strong legs!', 'Looks tasty',
+                                                                       'Another comment']
+    assert len(requests_made(commenter)) == 2
+    assert 'response_format' not in requests_made(commenter)[1]
+
+
+def test_batches_are_split_by_batch_size(make_commenter):
+    commenter = make_commenter([batch_reply((0, 'Strong legs!'), (1, 'Looks tasty')), 'Huge PR!'],
+                               batch_size=2)
+    assert commenter.generate_comments(CAPTIONS) == ['Strong legs!', 'Looks tasty', 'Huge PR!']
+    assert len(requests_made(commenter)) == 2
+
+
+def test_base_class_needs_a_client():
+    class Incomplete(BaseAICommenter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(api_key='test')
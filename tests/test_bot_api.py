@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from flask import Flask
+
+from bot_api import BotAPIClient, start_bot_api_server
+from dashboard_api import bot_api_status, create_dashboard_blueprint, stats_file_status
+from metrics import CONTENT_TYPE, MetricsRegistry
+
+
+@pytest.fixture
+def stats():
+    return {'comments_posted': 3, 'comments_today': 1, 'comment_events': [1.0]}
+
+
+class FakeScheduler:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return dict(self.stats)
+
+    def get_status(self):
+        return dict(self.stats, status='running', last_run=None, next_run='2026-01-02 03:04:05')
+
+
+@pytest.fixture
+def client(stats):
+    server = start_bot_api_server(0, FakeScheduler(stats))
+    yield BotAPIClient(f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+def test_stats_are_served_from_memory(client, stats):
+    assert client.stats() == stats
+    stats['comments_posted'] = 4
+    assert client.stats()['comments_posted'] == 4
+
+
+def test_unknown_path_is_an_error(client):
+    with pytest.raises(OSError):
+        client.get('/nope')
+
+
+def test_status_provider_uses_the_bot_then_the_file(client, tmp_path):
+    stats_file = tmp_path / 'bot_stats.json'
+    stats_file.write_text(json.dumps({'comments_posted': 1}))
+    provider = bot_api_status(client, fallback=stats_file_status(stats_file))
+    assert provider() == {'comments_posted': 3, 'comments_today': 1, 'status': 'running',
+                          'last_run': None, 'next_run': '2026-01-02 03:04:05'}
+
+    stopped = bot_api_status(BotAPIClient('http://127.0.0.1:9', timeout=0.5),
+                             fallback=stats_file_status(stats_file))
+    assert stopped() == {'comments_posted': 1, 'status': 'stopped', 'next_run': None}
+
+
+def test_metrics_are_proxied_from_the_bot_process(stats):
+    registry = MetricsRegistry()
+    registry.counter('comments_total', 'Comments', ['result']).inc(result='posted')
+    server = start_bot_api_server(0, FakeScheduler(stats), metrics_registry=registry)
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(create_dashboard_blueprint(
+            status_provider=dict, bot_api=BotAPIClient(f"http://127.0.0.1:{server.server_address[1]}")))
+        response = app.test_client().get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type == CONTENT_TYPE
+        assert 'comments_total{result="posted"} 1' in response.get_data(as_text=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stopped = Flask(__name__)
+    stopped.register_blueprint(create_dashboard_blueprint(
+        status_provider=dict, bot_api=BotAPIClient('http://127.0.0.1:9', timeout=0.5)))
+    assert stopped.test_client().get('/metrics').status_code == 503
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+from flask import Flask
+
+from bot_api import BotAPIClient, RemoteLogBuffer, start_bot_api_server
+from dashboard_api import create_dashboard_blueprint
+from log_handlers import RingBufferHandler
+from log_stream import LogTailer
+
+
+def log_lines(buffer: RingBufferHandler, *messages):
+    for message in messages:
+        buffer.handle(logging.makeLogRecord({'msg': message}))
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    (tmp_path / 'bot_1.log').write_text('from the file 1\nfrom the file 2\n')
+    return tmp_path
+
+
+@pytest.fixture
+def buffer():
+    return RingBufferHandler(capacity=3)
+
+
+def make_client(log_dir, log_buffer):
+    app = Flask(__name__)
+    app.register_blueprint(create_dashboard_blueprint(
+        LogTailer(log_dir), status_provider=dict, log_buffer=log_buffer, bot_api=BotAPIClient('http://unused')))
+    return app.test_client()
+
+
+def test_logs_after_pages_forward(log_dir, buffer):
+    client = make_client(log_dir, buffer)
+    log_lines(buffer, 'one', 'two', 'three')
+
+    page = client.get('/logs?after=0&limit=2').get_json()
+    assert page == {'logs': ['one', 'two'], 'next': 2, 'truncated': False}
+    page = client.get(f"/logs?after={page['next']}&limit=2").get_json()
+    assert page == {'logs': ['three'], 'next': 3, 'truncated': False}
+    assert client.get('/logs?after=3').get_json() == {'logs': [], 'next': 3, 'truncated': False}
+
+
+def test_stale_cursor_returns_buffered_lines_without_duplicates(log_dir, buffer):
+    client = make_client(log_dir, buffer)
+    log_lines(buffer, 'one', 'two', 'three', 'four', 'five')
+
+    page = client.get('/logs?after=1').get_json()
+    # 'two' was dropped from memory; no file tail is mixed in
+    assert page == {'logs': ['three', 'four', 'five'], 'next': 5, 'truncated': True}
+
+
+def test_remote_buffer_serves_the_bot_process_lines(log_dir, buffer):
+    server = start_bot_api_server(0, scheduler=None, log_buffer=buffer)
+    remote = RemoteLogBuffer(BotAPIClient(f"http://127.0.0.1:{server.server_address[1]}"))
+    try:
+        client = make_client(log_dir, remote)
+        log_lines(buffer, 'one', 'two')
+        assert remote.last_seq == 2
+        assert remote.tail(1) == [(2, 'two')]
+        assert client.get('/logs?after=1').get_json() == {'logs': ['two'], 'next': 2, 'truncated': False}
+
+        assert not remote.wait(2, timeout=0.1)
+        log_lines(buffer, 'three')
+        assert remote.wait(2, timeout=0.1)
+
+        # A cursor from before the bot restarted starts over at the buffer
+        assert remote.after(50) == ([(1, 'one'), (2, 'two'), (3, 'three')], True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_logs_fall_back_to_the_file_while_the_bot_is_down(log_dir):
+    remote = RemoteLogBuffer(BotAPIClient('http://127.0.0.1:9', timeout=0.5))
+    client = make_client(log_dir, remote)
+    page = client.get('/logs?after=3').get_json()
+    assert page['logs'] == ['from the file 1', 'from the file 2']
+    assert page['next'] is None
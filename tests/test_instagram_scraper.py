@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from instagram_scraper import InstagramScraper
+
+
+class FakePost:
+    def __init__(self, shortcode, date_utc, caption):
+        self.shortcode = shortcode
+        self.date_utc = date_utc
+        self.caption = caption
+        self.is_pinned = False
+        self.likes = 0
+        self.comments = 0
+
+
+class FakeProfile:
+    userid = 42
+    full_name = 'Fixture Account'
+    followers = 1000
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.pages = 0
+
+    def get_posts(self):
+        for post in self.posts:
+            self.pages += 1
+            yield post
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TARGET_ACCOUNTS', 'fixture_account')
+    monkeypatch.setenv('FITNESS_KEYWORDS', 'squat')
+    monkeypatch.setenv('MAX_POSTS_SCANNED', '10')
+    scraper = InstagramScraper()
+    yield scraper
+    scraper.close()
+
+
+def recent_posts(count, caption='coffee and a sunset'):
+    now = datetime.utcnow()
+    return [FakePost(f"post{i}", now - timedelta(minutes=10 * (i + 1)), caption) for i in range(count)]
+
+
+def test_high_water_mark_advances_when_the_scan_limit_is_hit(scraper, monkeypatch):
+    # More posts inside the window than MAX_POSTS_SCANNED, none of them a candidate
+    profile = FakeProfile(recent_posts(12))
+    monkeypatch.setattr(scraper, '_fetch_profile', lambda account: (profile, False))
+
+    assert scraper._fetch_account_posts('fixture_account', 24) == []
+    assert profile.pages == 10
+    assert scraper.state.get_high_water_mark('fixture_account')['shortcode'] == 'post0'
+
+    # The next cycle stops at the mark instead of scanning the same posts again
+    profile.pages = 0
+    scraper._fetch_account_posts('fixture_account', 24)
+    assert profile.pages == 1
+
+
+def test_high_water_mark_stays_behind_unprocessed_candidates(scraper, monkeypatch):
+    posts = recent_posts(12)
+    posts[4].caption = 'squat day'
+    profile = FakeProfile(posts)
+    monkeypatch.setattr(scraper, '_fetch_profile', lambda account: (profile, False))
+
+    found = scraper._fetch_account_posts('fixture_account', 24)
+    assert [post['id'] for post in found] == ['post4']
+    assert scraper.state.get_high_water_mark('fixture_account')['shortcode'] == 'post5'
+
+    # Once the candidate is processed the mark moves past it
+    scraper.process_post(found[0])
+    scraper._fetch_account_posts('fixture_account', 24)
+    assert scraper.state.get_high_water_mark('fixture_account')['shortcode'] == 'post0'
@@ -0,0 +1,97 @@
+import logging
+import time
+
+import pytest
+
+from pipeline import CommentPipeline
+
+
+class FakeScraper:
+    def __init__(self, posts):
+        self.posts = posts
+        self.processed = []
+
+    def iter_new_posts(self):
+        yield from self.posts
+
+    def process_post(self, post):
+        self.processed.append(post['id'])
+
+
+class FakeCommenter:
+    batch_size = 2
+
+    def generate_comments(self, captions):
+        return [f"Nice one: {caption}" for caption in captions]
+
+    def is_comment_appropriate(self, comment):
+        return True
+
+
+class FakePoster:
+    def __init__(self):
+        self.posted = []
+
+    def post_comment(self, url, comment):
+        self.posted.append(url)
+        return True
+
+
+class FakeScheduler:
+    """Allows ``allowed`` comments, then blocks"""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.recorded = 0
+
+    def can_post_comment(self, max_per_day):
+        return self.recorded < self.allowed
+
+    def record_comment_posted(self):
+        self.recorded += 1
+
+
+def make_posts(count):
+    return [{'id': f'post{i}', 'url': f'https://www.instagram.com/p/post{i}', 'account': 'fixture_account',
+             'caption': f'squat day {i}'} for i in range(count)]
+
+
+@pytest.fixture
+def make_pipeline():
+    def make(posts, allowed):
+        scraper, poster, scheduler = FakeScraper(posts), FakePoster(), FakeScheduler(allowed)
+        pipeline = CommentPipeline(scraper, FakeCommenter(), poster, scheduler, max_comments_per_day=5)
+        return pipeline, scraper, poster
+    return make
+
+
+def test_last_allowed_comment_ends_the_cycle_without_waiting(make_pipeline, monkeypatch, caplog):
+    monkeypatch.setattr('pipeline.random.uniform', lambda low, high: high)
+    pipeline, scraper, poster = make_pipeline(make_posts(3), allowed=1)
+
+    started = time.monotonic()
+    with caplog.at_level(logging.INFO, logger='pipeline'):
+        assert pipeline.run_cycle() == 1
+    assert time.monotonic() - started < 5
+    assert scraper.processed == ['post0']
+    # Posts without an age are logged without one instead of breaking the log call
+    for record in caplog.records:
+        record.getMessage()
+    assert not any('Age:' in record.getMessage() for record in caplog.records)
+
+
+def test_cycle_posts_nothing_when_blocked(make_pipeline):
+    pipeline, scraper, poster = make_pipeline(make_posts(2), allowed=0)
+    assert pipeline.run_cycle() == 0
+    assert poster.posted == []
+
+
+def test_cycle_reports_when_the_limits_stopped_it(make_pipeline, monkeypatch):
+    monkeypatch.setattr('pipeline.random.uniform', lambda low, high: 0)
+    pipeline, scraper, poster = make_pipeline(make_posts(3), allowed=1)
+    assert pipeline.run_cycle() == 1
+    assert pipeline.blocked
+
+    pipeline, scraper, poster = make_pipeline(make_posts(2), allowed=5)
+    assert pipeline.run_cycle() == 2
+    assert not pipeline.blocked
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import ThreadedProfile, WallClockSampler, profile_call
+
+
+def busy(n: int = 200_000) -> int:
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+def threaded_cycle():
+    stage = threading.Thread(target=lambda: [busy() for _ in range(2)])
+    stage.start()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda _: busy(), range(3)))
+    stage.join()
+
+
+def test_cprofile_covers_the_threads_the_call_starts():
+    profiler = ThreadedProfile()
+    profiler.runcall(threaded_cycle)
+    calls = {function: stats[1] for (_, _, function), stats in profiler.stats().stats.items()}
+    assert calls['busy'] == 5
+
+
+def test_sampler_skips_threads_outside_the_cycle(tmp_path):
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            busy(1000)
+
+    bystander = threading.Thread(target=spin, daemon=True)
+    bystander.start()
+    try:
+        _, path, summary = profile_call(threaded_cycle, 'sample', tmp_path, interval=0.001)
+    finally:
+        stop.set()
+        bystander.join()
+    collapsed = path.read_text()
+    assert 'test_profiling:busy' in collapsed
+    assert 'test_profiling:spin' not in collapsed
+    assert 'threads running the cycle' in summary
+
+
+def test_sampler_leaves_out_idle_waits():
+    stop = threading.Event()
+    waiter = threading.Thread(target=stop.wait, daemon=True)
+    waiter.start()
+    sampler = WallClockSampler(interval=0.001, thread_ids={waiter.ident})
+    sampler.start()
+    threading.Event().wait(0.05)
+    sampler.stop()
+    stop.set()
+    assert not sampler.stacks
+    assert sampler.idle_samples > 0
@@ -0,0 +1,59 @@
+import pytest
+
+from rate_limiter import SlidingWindowLimiter
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def test_windows_block_until_the_oldest_event_slides_out():
+    limiter = SlidingWindowLimiter({'day': (DAY, 2), 'hour': (HOUR, 1)}, clock=lambda: 0.0)
+    assert limiter.next_allowed(0) == (0, None)
+
+    limiter.record(100)
+    assert limiter.next_allowed(200) == (100 + HOUR, 'hour')
+    limiter.record(100 + HOUR)
+    assert limiter.next_allowed(100 + HOUR) == (100 + DAY, 'day')
+    assert limiter.count('day', 100 + DAY) == 1
+    assert limiter.allow(100 + DAY + HOUR)
+
+
+def test_spacing_uses_the_longest_window():
+    limiter = SlidingWindowLimiter({'day': (DAY, 10)}, spacing=lambda count: count * 60, events=[0, 10])
+    assert limiter.next_allowed(20) == (10 + 2 * 60, 'spacing')
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_zero_limit_blocks_everything(limit):
+    limiter = SlidingWindowLimiter({'day': (DAY, limit)})
+    assert limiter.next_allowed(1000) == (1000 + DAY, 'day')
+    assert not limiter.allow(1000)
+    assert limiter.count('day', 1000) == 0
+
+
+def test_lowering_a_limit_to_zero_keeps_the_window():
+    limiter = SlidingWindowLimiter({'day': (DAY, 5)}, events=[100])
+    limiter.set_window('day', DAY, 0)
+    assert limiter.count('day', 200) == 1
+    assert limiter.next_allowed(200) == (200 + DAY, 'day')
+
+    limiter.set_window('day', DAY, 5)
+    assert limiter.allow(200)
+
+
+@pytest.mark.parametrize('lowered', [0, 2])
+def test_lowering_and_restoring_a_limit_keeps_every_event(lowered):
+    limiter = SlidingWindowLimiter({'day': (DAY, 5)})
+    for ts in range(100, 600, 100):
+        limiter.record(ts)
+    limiter.set_window('day', DAY, lowered)
+    limiter.set_window('day', DAY, 5)
+
+    assert limiter.count('day', 1000) == 5
+    assert limiter.next_allowed(1000) == (100 + DAY, 'day')
+
+
+def test_events_older_than_every_window_are_dropped():
+    limiter = SlidingWindowLimiter({'day': (DAY, 5), 'hour': (HOUR, 1)}, events=[100, 200])
+    limiter.record(200 + DAY)
+    assert limiter.events() == [200 + DAY]
@@ -0,0 +1,208 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from scheduler import HOUR, BotScheduler
+
+
+class FakeClock:
+    """Scheduler clock that only moves when told to, and counts how often it is read"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+        self.reads = 0
+
+    def __call__(self) -> float:
+        self.reads += 1
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch, clock):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SCHEDULE_JITTER', '0')
+    scheduler = BotScheduler(max_comments_per_day=5, clock=clock)
+    yield scheduler
+    scheduler.stop()
+    scheduler.close()
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_idle_seconds_tracks_the_earliest_job(scheduler, clock):
+    assert scheduler.idle_seconds() is None
+    scheduler.schedule_job(lambda: None, 24)
+    scheduler.schedule_job(lambda: None, 1)
+    assert scheduler.idle_seconds() == HOUR
+
+    clock.advance(HOUR + 5)
+    assert scheduler.idle_seconds() == -5
+
+
+def test_run_pending_runs_due_jobs_in_order(scheduler, clock):
+    ran = []
+    scheduler.schedule_job(ran.append, 2, 'every 2h')
+    scheduler.schedule_job(ran.append, 1, 'every 1h')
+
+    assert scheduler.run_pending() == 0
+    clock.advance(HOUR)
+    assert scheduler.run_pending() == 1
+    clock.advance(HOUR)
+    assert scheduler.run_pending() == 2
+    # Jobs due at the same time run in the order they were (re)scheduled
+    assert ran == ['every 1h', 'every 2h', 'every 1h']
+    # Intervals count from when the job ran
+    assert scheduler.idle_seconds() == HOUR
+
+
+def test_jitter_spreads_the_interval(scheduler, clock, monkeypatch):
+    monkeypatch.setattr('scheduler.random.uniform', lambda low, high: high)
+    job = scheduler.schedule_job(lambda: None, 10, jitter=0.1)
+    assert job.next_run == clock.now + 11 * HOUR
+
+    monkeypatch.setattr('scheduler.random.uniform', lambda low, high: low)
+    clock.advance(11 * HOUR)
+    scheduler.run_pending()
+    assert job.next_run == clock.now + 9 * HOUR
+
+
+def test_one_off_and_cancelled_jobs(scheduler, clock):
+    ran = []
+    scheduler.run_at(ran.append, datetime.fromtimestamp(clock.now + 60), 'once')
+    cancelled = scheduler.schedule_job(ran.append, 1, 'cancelled')
+    scheduler.cancel(cancelled)
+
+    assert scheduler.idle_seconds() == 60
+    clock.advance(2 * HOUR)
+    assert scheduler.run_pending() == 1
+    assert ran == ['once']
+    assert scheduler.idle_seconds() is None
+
+
+def test_failing_job_is_rescheduled(scheduler, clock):
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        raise RuntimeError("boom")
+
+    scheduler.schedule_job(flaky, 1)
+    clock.advance(HOUR)
+    assert scheduler.run_pending() == 1
+    assert scheduler.idle_seconds() == HOUR
+    clock.advance(HOUR)
+    scheduler.run_pending()
+    assert len(calls) == 2
+
+
+def test_run_continuously_sleeps_until_woken(scheduler, clock):
+    ran = threading.Event()
+    scheduler.schedule_job(ran.set, 24)
+    loop = threading.Thread(target=scheduler.run_continuously, daemon=True)
+    loop.start()
+
+    # Nothing is due: the loop waits on the condition instead of polling
+    time.sleep(0.3)
+    assert not ran.is_set()
+    reads_while_idle = clock.reads
+    time.sleep(0.3)
+    assert clock.reads == reads_while_idle
+
+    # The job comes due; a wake-up (e.g. a config change) makes the loop notice
+    clock.advance(24 * HOUR)
+    scheduler.wake()
+    assert ran.wait(2)
+
+    scheduler.stop()
+    loop.join(2)
+    assert not loop.is_alive()
+
+
+def test_new_earlier_job_wakes_the_loop(scheduler, clock):
+    scheduler.schedule_job(lambda: None, 24)
+    loop = threading.Thread(target=scheduler.run_continuously, daemon=True)
+    loop.start()
+    time.sleep(0.1)
+
+    ran = []
+    scheduler.run_at(ran.append, datetime.fromtimestamp(clock.now), 'now')
+    assert wait_for(lambda: ran == ['now'])
+
+    scheduler.stop()
+    loop.join(2)
+    assert not loop.is_alive()
+
+
+def test_stop_returns_immediately_with_far_away_jobs(scheduler):
+    scheduler.schedule_job(lambda: None, 24)
+    loop = threading.Thread(target=scheduler.run_continuously, daemon=True)
+    loop.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    scheduler.stop()
+    loop.join(2)
+    assert not loop.is_alive()
+    assert time.monotonic() - started < 1
+
+
+def test_daily_limit_of_zero_blocks_comments(scheduler):
+    assert not scheduler.can_post_comment(0)
+
+
+def test_lowering_the_daily_limit_to_zero_blocks_comments(scheduler):
+    assert scheduler.can_post_comment(5)
+    assert not scheduler.can_post_comment(0)
+    assert scheduler.next_allowed_at(0) > datetime.now()
+    assert scheduler.can_post_comment(5)
+
+
+def test_status_reports_running_and_run_times(scheduler, clock):
+    assert scheduler.get_status()['status'] == 'stopped'
+    scheduler.schedule_job(lambda: None, 1)
+    status = scheduler.get_status()
+    assert status['next_run'] == datetime.fromtimestamp(clock.now + HOUR).strftime('%Y-%m-%d %H:%M:%S')
+    assert status['last_run'] is None
+    assert status['comments_posted'] == 0
+
+    loop = threading.Thread(target=scheduler.run_continuously, daemon=True)
+    loop.start()
+    assert wait_for(lambda: scheduler.get_status()['status'] == 'running')
+    ran_at = clock.now + HOUR
+    clock.advance(HOUR)
+    scheduler.wake()
+    assert wait_for(lambda: scheduler.get_status()['last_run'] is not None)
+    assert scheduler.get_status()['last_run'] == datetime.fromtimestamp(ran_at).strftime('%Y-%m-%d %H:%M:%S')
+
+    scheduler.stop()
+    loop.join(2)
+    assert scheduler.get_status()['status'] == 'stopped'
+
+
+@pytest.mark.parametrize('lowered', [0, 2])
+def test_restoring_the_daily_limit_still_counts_earlier_comments(scheduler, lowered):
+    for _ in range(5):
+        scheduler.record_comment_posted()
+    assert not scheduler.can_post_comment(lowered)
+    assert not scheduler.can_post_comment(5)
+    assert scheduler.rate_limiter.next_allowed()[1] == 'day'
+
+    scheduler.record_comment_posted()
+    assert len(scheduler.store.get('comment_events')) == 6
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+import requests
+
+from session_broker import SessionBroker, cookies_from_dict, cookies_to_dict
+
+
+class FakeLoader:
+    """Stands in for instaloader.Instaloader: a requests cookie jar behind save/load_session"""
+
+    def __init__(self, cookies=None):
+        self.jar = requests.cookies.cookiejar_from_dict(cookies or {})
+        self.username = None
+
+    def save_session(self):
+        return requests.utils.dict_from_cookiejar(self.jar)
+
+    def load_session(self, username, session_data):
+        self.jar = requests.cookies.cookiejar_from_dict(session_data)
+        self.username = username
+
+
+class FakeDriver:
+    """Stands in for a Selenium driver on an instagram.com page"""
+
+    def __init__(self, cookies=None):
+        self.jar = {cookie['name']: dict(cookie) for cookie in cookies or []}
+
+    def get_cookies(self):
+        return [dict(cookie) for cookie in self.jar.values()]
+
+    def add_cookie(self, cookie):
+        if 'sameSite' in cookie:
+            raise AssertionError("Selenium rejects unknown sameSite values")
+        if not cookie.get('domain', 'instagram.com').endswith('instagram.com'):
+            raise ValueError("invalid cookie domain")
+        self.jar[cookie['name']] = dict(cookie)
+
+
+BROWSER_COOKIES = [
+    {'name': 'sessionid', 'value': 'browser-session', 'domain': '.instagram.com', 'path': '/',
+     'secure': True, 'httpOnly': True, 'expiry': 1999999999, 'sameSite': 'Lax'},
+    {'name': 'csrftoken', 'value': 'browser-csrf', 'domain': '.instagram.com', 'path': '/',
+     'secure': True, 'expiry': 1999999999},
+    {'name': 'ds_user_id', 'value': '42', 'domain': '.instagram.com', 'path': '/'},
+]
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return SessionBroker(tmp_path / 'data' / 'instagram_cookies.json')
+
+
+def test_cookie_conversion_keeps_known_attributes():
+    values = cookies_to_dict(BROWSER_COOKIES)
+    assert values == {'sessionid': 'browser-session', 'csrftoken': 'browser-csrf', 'ds_user_id': '42'}
+
+    values['sessionid'] = 'refreshed'
+    values['mid'] = 'new-cookie'
+    cookies = {cookie['name']: cookie for cookie in cookies_from_dict(values, BROWSER_COOKIES)}
+    assert cookies['sessionid']['value'] == 'refreshed'
+    assert cookies['sessionid']['expiry'] == 1999999999
+    assert cookies['sessionid']['httpOnly'] is True
+    assert cookies['mid'] == {'name': 'mid', 'value': 'new-cookie', 'domain': '.instagram.com',
+                              'path': '/', 'secure': True}
+
+
+def test_publish_persists_and_reloads(broker):
+    assert not broker.has_session()
+    assert broker.publish(BROWSER_COOKIES)
+    assert broker.has_session()
+
+    with open(broker.path) as f:
+        assert json.load(f) == BROWSER_COOKIES
+    assert not broker.path.with_suffix('.json.tmp').exists()
+    assert SessionBroker(broker.path).cookies() == BROWSER_COOKIES
+
+
+def test_corrupt_cookie_file_is_ignored(tmp_path):
+    path = tmp_path / 'instagram_cookies.json'
+    path.write_text('{not json')
+    assert SessionBroker(path).cookies() == []
+
+
+def test_driver_to_instaloader_round_trip(broker):
+    driver = FakeDriver(BROWSER_COOKIES)
+    loader = FakeLoader()
+
+    broker.publish_from_driver(driver)
+    assert broker.apply_to_instaloader(loader, 'bot_account')
+    assert loader.username == 'bot_account'
+    assert loader.save_session() == cookies_to_dict(BROWSER_COOKIES)
+
+
+def test_instaloader_to_driver_round_trip(broker):
+    broker.publish(BROWSER_COOKIES)
+    loader = FakeLoader({'sessionid': 'scraper-session', 'csrftoken': 'scraper-csrf', 'ds_user_id': '42'})
+    broker.publish_from_instaloader(loader)
+
+    driver = FakeDriver()
+    assert broker.apply_to_driver(driver) == 3
+    assert cookies_to_dict(driver.get_cookies()) == loader.save_session()
+    session = driver.jar['sessionid']
+    # Attributes the browser gave the cookie survive the trip through the requests jar
+    assert session['expiry'] == 1999999999
+    assert session['domain'] == 'instagram.com'
+    assert 'sameSite' not in session
+
+
+def test_apply_to_instaloader_needs_a_session(broker):
+    loader = FakeLoader()
+    assert not broker.apply_to_instaloader(loader, 'bot_account')
+
+    broker.publish([cookie for cookie in BROWSER_COOKIES if cookie['name'] != 'csrftoken'])
+    assert not broker.apply_to_instaloader(loader, 'bot_account')
+    assert loader.username is None
+
+
+def test_publish_notifies_the_other_side_only(broker):
+    scraper_calls, poster_calls = [], []
+
+    def scraper(cookies):
+        scraper_calls.append(cookies)
+
+    def poster(cookies):
+        poster_calls.append(cookies)
+
+    broker.subscribe(scraper)
+    broker.subscribe(poster)
+    broker.subscribe(poster)  # subscribing twice doesn't notify twice
+
+    assert broker.publish_from_driver(FakeDriver(BROWSER_COOKIES), source=poster)
+    assert poster_calls == []
+    assert len(scraper_calls) == 1
+    assert cookies_to_dict(scraper_calls[0]) == cookies_to_dict(BROWSER_COOKIES)
+
+    # Same cookie values again: nothing changed, nobody is told
+    assert not broker.publish(BROWSER_COOKIES)
+    assert len(scraper_calls) == 1
+
+    loader = FakeLoader({'sessionid': 'scraper-session', 'csrftoken': 'scraper-csrf'})
+    assert broker.publish_from_instaloader(loader, source=scraper)
+    assert len(scraper_calls) == 1
+    assert len(poster_calls) == 1
+
+    broker.unsubscribe(poster)
+    broker.publish([{'name': 'sessionid', 'value': 'third'}])
+    assert len(poster_calls) == 1
+    assert len(scraper_calls) == 2
+
+
+def test_failing_listener_does_not_stop_the_others(broker):
+    calls = []
+
+    def broken(cookies):
+        raise RuntimeError("browser went away")
+
+    broker.subscribe(broken)
+    broker.subscribe(calls.append)
+    assert broker.publish(BROWSER_COOKIES)
+    assert len(calls) == 1
+
+
+def test_default_prefers_an_existing_cookie_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert SessionBroker.default().path.as_posix() == 'data/instagram_cookies.json'
+
+    (tmp_path / 'instagram_cookies.json').write_text(json.dumps(BROWSER_COOKIES))
+    broker = SessionBroker.default()
+    assert broker.path.as_posix() == 'instagram_cookies.json'
+    assert broker.has_session()